@@ -0,0 +1,146 @@
+"""
+Precomputed rating analytics.
+
+Every insert/delete of a ``Feedback`` row adjusts a per-day, per-rating
+count in ``feedback_rating_rollup`` inside the same transaction. Stats
+queries read only the rollup rows for the requested range, so their cost is
+proportional to the number of buckets rather than the number of feedback rows.
+"""
+from collections import Counter
+from datetime import date, timedelta
+
+from app import db
+from app.models import Feedback, FeedbackRatingRollup
+
+UNRATED = 0
+RATINGS = (1, 2, 3, 4, 5)
+BUCKETS = ('day', 'week')
+
+_rollup_table = FeedbackRatingRollup.__table__
+
+
+def _bucket_key(submitted_at, rating):
+    return submitted_at.date(), UNRATED if rating is None else rating
+
+
+def _upsert(connection, day, rating, delta):
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(_rollup_table).values(day=day, rating=rating, count=delta)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['day', 'rating'],
+            set_={'count': _rollup_table.c.count + stmt.excluded.count}
+        ))
+        return
+
+    updated = connection.execute(
+        _rollup_table.update()
+        .where(_rollup_table.c.day == day, _rollup_table.c.rating == rating)
+        .values(count=_rollup_table.c.count + delta)
+    ).rowcount
+    if not updated:
+        connection.execute(_rollup_table.insert().values(day=day, rating=rating, count=delta))
+
+
+def record_ratings(connection, rows, sign=1):
+    """
+    Apply ``(submitted_at, rating)`` pairs to the rollup on ``connection``.
+
+    Args:
+        connection: Connection of the transaction that wrote the rows
+        rows: Iterable of (submitted_at, rating) pairs
+        sign: +1 for inserted rows, -1 for deleted rows
+    """
+    deltas = Counter()
+    for submitted_at, rating in rows:
+        deltas[_bucket_key(submitted_at, rating)] += sign
+    for (day, rating), delta in deltas.items():
+        if delta:
+            _upsert(connection, day, rating, delta)
+
+
+@db.event.listens_for(Feedback, 'after_insert')
+def _feedback_inserted(mapper, connection, target):
+    record_ratings(connection, [(target.submitted_at, target.rating)])
+
+
+@db.event.listens_for(Feedback, 'after_delete')
+def _feedback_deleted(mapper, connection, target):
+    if target.deleted_at is None:
+        record_ratings(connection, [(target.submitted_at, target.rating)], sign=-1)
+
+
+def backfill_rollups():
+    """Rebuild the rollup table from ``feedback`` with one GROUP BY scan."""
+    day = db.func.date(Feedback.submitted_at)
+    grouped = (db.session.query(day, Feedback.rating, db.func.count(Feedback.id))
+               .group_by(day, Feedback.rating)
+               .all())
+
+    db.session.execute(_rollup_table.delete())
+    rows = [
+        {'day': date.fromisoformat(str(bucket_day)),
+         'rating': UNRATED if rating is None else rating,
+         'count': count}
+        for bucket_day, rating, count in grouped
+    ]
+    if rows:
+        db.session.execute(_rollup_table.insert(), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def rating_stats(bucket='day', start=None, end=None):
+    """
+    Return rating histograms and averages per time bucket.
+
+    Args:
+        bucket: 'day' or 'week' (weeks start on Monday)
+        start: First day to include (date, inclusive)
+        end: Last day to include (date, inclusive)
+
+    Returns:
+        Dict with overall totals and a list of per-bucket stats, oldest first
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f'Unknown bucket: {bucket!r}')
+
+    query = FeedbackRatingRollup.query.filter(FeedbackRatingRollup.count != 0)
+    if start is not None:
+        query = query.filter(FeedbackRatingRollup.day >= start)
+    if end is not None:
+        query = query.filter(FeedbackRatingRollup.day <= end)
+
+    histograms = {}
+    for row in query.order_by(FeedbackRatingRollup.day):
+        key = _bucket_start(row.day, bucket)
+        histograms.setdefault(key, Counter())[row.rating] += row.count
+
+    buckets = [_summarize(histogram, start=key.isoformat())
+               for key, histogram in histograms.items()]
+    overall = _summarize(sum(histograms.values(), Counter()))
+    return {'bucket': bucket, 'overall': overall, 'buckets': buckets}
+
+
+def _summarize(histogram, **extra):
+    rated = sum(histogram[rating] for rating in RATINGS)
+    total = rated + histogram[UNRATED]
+    weighted = sum(rating * histogram[rating] for rating in RATINGS)
+    summary = dict(extra)
+    summary.update({
+        'count': total,
+        'rated': rated,
+        'average': round(weighted / rated, 3) if rated else None,
+        'histogram': {str(rating): histogram[rating] for rating in RATINGS},
+    })
+    return summary
@@ -0,0 +1,118 @@
+"""
+JSON REST API for feedback.
+
+Responses are built from the storage backend's records (``to_dict``) with
+optional ``fields=`` projection (only the requested columns are loaded),
+keyset cursors for pagination, and strong ETags derived from the backend's
+feedback generation, so a conditional GET from a polling client is answered
+with 304 after a single key lookup, without querying or serializing
+feedback.
+"""
+import hashlib
+import json
+
+from flask import Blueprint, jsonify, request, current_app
+from app.models import Feedback
+from app.pagination import InvalidCursor
+from app.storage import get_storage
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+
+class APIError(Exception):
+    """Client error reported as a JSON body."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api_bp.errorhandler(APIError)
+def handle_api_error(error):
+    return jsonify(error=error.message), error.status
+
+
+def parse_fields(raw):
+    """Parse a comma separated ``fields`` value into a tuple of field names."""
+    if not raw:
+        return Feedback.FIELDS
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in Feedback.FIELDS]
+    if unknown or not fields:
+        raise APIError(f"Unknown fields: {', '.join(unknown)}" if unknown else 'No fields requested')
+    return fields
+
+
+def _etag(*parts):
+    """Strong ETag for the current generation and the request parameters."""
+    generation = get_storage().generation()
+    digest = hashlib.sha1(json.dumps(parts).encode('utf-8')).hexdigest()[:16]
+    return f'g{generation}-{digest}'
+
+
+def _not_modified(etag):
+    # If-None-Match uses weak comparison (RFC 9110); '*' matches any entry
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
+
+
+def _with_etag(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@api_bp.route('/feedback')
+def list_feedback():
+    """List feedback newest first with cursor pagination and projection."""
+    fields = parse_fields(request.args.get('fields'))
+    max_per_page = current_app.config.get('API_MAX_PER_PAGE', 100)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), max_per_page)
+    after = request.args.get('after')
+    before = request.args.get('before')
+
+    etag = _etag('list', fields, per_page, after, before)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    try:
+        page = get_storage().page(after=after, before=before, per_page=per_page,
+                                  fields=fields)
+    except InvalidCursor as e:
+        raise APIError(str(e))
+
+    return _with_etag(jsonify(
+        items=[feedback.to_dict(fields) for feedback in page.items],
+        per_page=per_page,
+        has_next=page.has_next,
+        has_prev=page.has_prev,
+        next_cursor=page.next_cursor,
+        prev_cursor=page.prev_cursor
+    ), etag)
+
+
+@api_bp.route('/feedback/<id>')
+def get_feedback(id):
+    """Return one feedback entry."""
+    fields = parse_fields(request.args.get('fields'))
+    storage = get_storage()
+    try:
+        feedback_id = storage.parse_id(id)
+    except ValueError:
+        raise APIError('Feedback not found', status=404)
+
+    etag = _etag('item', id, fields)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    feedback = storage.get(feedback_id, fields=fields)
+    if feedback is None:
+        raise APIError('Feedback not found', status=404)
+    return _with_etag(jsonify(feedback.to_dict(fields)), etag)
@@ -30,16 +30,82 @@ def create_app(config_name=None):
     from config import config
     app.config.from_object(config[config_name])
 
+    # Client address from trusted proxies, so rate limits key on the real client
+    if app.config.get('PROXY_FIX_HOPS'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    # Structured logging through a background queue listener
+    if app.config.get('LOG_FORMAT') == 'json':
+        from app.logs import configure_logging
+        configure_logging(app)
+
     # Initialize extensions with app
     db.init_app(app)
     migrate.init_app(app, db)
 
+    # Register mapper events that keep the summary tables in sync
+    from app import counters, analytics  # noqa: F401
+
     # Register blueprints
-    from app.routes import main_bp
-    app.register_blueprint(main_bp)
+    if app.config.get('LAZY_VIEWS'):
+        from app.lazy import create_lazy_blueprint
+        app.register_blueprint(create_lazy_blueprint())
+    else:
+        from app.routes import main_bp
+        app.register_blueprint(main_bp)
+
+    from app.api import api_bp
+    app.register_blueprint(api_bp)
+
+    # Register CLI commands
+    from app.cli import feedback_cli, init_db_command
+    app.cli.add_command(feedback_cli)
+    app.cli.add_command(init_db_command)
 
-    # Create database tables
     with app.app_context():
-        db.create_all()
+        # Pragmas must be in place before the first connection is opened
+        from app.sqlite import configure_sqlite
+        configure_sqlite(app, db.engine)
+
+        # Create database tables (disabled in production: use `flask db upgrade`
+        # or `flask init-db` so worker boots issue no schema queries)
+        if app.config.get('AUTO_CREATE_TABLES', True):
+            db.create_all()
+
+        from app.pool import instrument_pool
+        instrument_pool(app, db.engine)
+
+        from app.logs import instrument_logging
+        instrument_logging(app, db.engine)
+
+        if app.config.get('METRICS_ENABLED', True):
+            from app.metrics import instrument_app
+            instrument_app(app, db.engine)
+
+    # MongoDB store: connect and create its indexes
+    if app.config.get('STORAGE_BACKEND') == 'mongo':
+        if app.config.get('WRITE_BEHIND'):
+            # The spool flushes into the SQL database, which Mongo mode never reads
+            raise ValueError('WRITE_BEHIND requires STORAGE_BACKEND=sqlalchemy')
+        from app.models_mongo import init_mongo
+        with app.app_context():
+            init_mongo(app)
+
+    # Background flusher for write-behind submissions, started by each
+    # worker's first request: a thread started here would stay behind in
+    # the master under `gunicorn --preload`
+    if app.config.get('WRITE_BEHIND') and app.config.get('WRITE_QUEUE_WORKER', True):
+        from app.write_queue import start_flush_worker
+
+        @app.before_request
+        def ensure_flush_worker():
+            start_flush_worker(app)
+
+    # Background hard-deletion of soft-deleted feedback
+    if app.config.get('PURGE_INTERVAL'):
+        from app.deletion import start_purge_worker
+        start_purge_worker(app)
 
     return app
@@ -0,0 +1,272 @@
+"""
+Load benchmark for the feedback endpoints.
+
+Seeds a database to each requested size in turn (10k, 1M, 10M rows by
+default; the same database grows between sizes) and drives the endpoints
+below with a pool of client threads, reporting throughput and p50/p99
+latency per endpoint as JSON:
+
+    index              GET  /
+    submit_feedback    POST /feedback/submit (unique content per request)
+    view_shallow       GET  /feedback/view?page=1
+    view_deep_offset   GET  /feedback/view?page=<middle>
+    view_deep_keyset   GET  /feedback/view?after=<cursor of the middle row>
+    delete_feedback    POST /feedback/delete/<id> (a different visible row each time)
+
+Requests go through the Flask test client in this process unless
+``--base-url`` points at a running server (then the database URL must be
+the one that server uses). Pass ``--compare`` with an earlier report to
+print the change in p50, p99 and throughput per endpoint.
+
+Usage:
+    python bench_endpoints.py --rows 10000 --requests 200 --output bench.json
+    python bench_endpoints.py --database-url postgresql://localhost/feedback_bench \\
+        --rows 10000 --rows 1000000 --rows 10000000 --concurrency 8
+    python bench_endpoints.py --rows 10000 --compare previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import sqlalchemy
+
+from app import create_app, db
+from app.models import Feedback
+from app.pagination import encode_cursor
+from bench_query_plans import seed
+from config import config, TestingConfig
+
+DEFAULT_SIZES = (10000, 1000000, 10000000)
+ENDPOINTS = ('index', 'submit_feedback', 'view_shallow', 'view_deep_offset',
+             'view_deep_keyset', 'delete_feedback')
+
+
+class InProcessClient:
+    """Sends requests through one Flask test client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, data=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client.open(path, method=method, data=data).status_code
+
+
+class HTTPClient:
+    """Sends requests to a running server."""
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self._opener = urllib.request.build_opener(self._NoRedirect)
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode('ascii') if data is not None else None
+        try:
+            with self._opener.open(urllib.request.Request(
+                    self.base_url + path, data=body, method=method)) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+def build_requests(name, count, rows, per_page, rng, context):
+    """Return ``count`` (method, path, form data) tuples for endpoint ``name``."""
+    if name == 'index':
+        return [('GET', '/', None)] * count
+    if name == 'submit_feedback':
+        return [('POST', '/feedback/submit', {
+            'name': 'Bench User',
+            'email': f'bench{rows}-{i}@example.com',
+            'feedback_text': f'Benchmark submission {rows}-{i} with sufficient length.',
+            'rating': str(rng.randint(1, 5)),
+        }) for i in range(count)]
+    if name == 'view_shallow':
+        return [('GET', f'/feedback/view?page=1&per_page={per_page}', None)] * count
+    if name == 'view_deep_offset':
+        page = max(1, rows // per_page // 2)
+        return [('GET', f'/feedback/view?page={page}&per_page={per_page}', None)] * count
+    if name == 'view_deep_keyset':
+        return [('GET', f"/feedback/view?after={context['middle_cursor']}&per_page={per_page}",
+                 None)] * count
+    if name == 'delete_feedback':
+        return [('POST', f'/feedback/delete/{row_id}', None)
+                for row_id in context['delete_ids'][:count]]
+    raise ValueError(f'Unknown endpoint: {name!r}')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_endpoint(client, requests, concurrency, warmup):
+    """Issue ``requests`` with ``concurrency`` threads and summarize latency."""
+    for method, path, data in requests[:warmup]:
+        if method == 'GET':
+            client.request(method, path, data)
+
+    def timed(item):
+        method, path, data = item
+        started = time.perf_counter()
+        status = client.request(method, path, data)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, requests))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'throughput_rps': round(len(results) / wall, 1) if wall else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+        'mean_ms': round(statistics.fmean(latencies), 3) if latencies else None,
+        'max_ms': round(latencies[-1], 3) if latencies else None,
+    }
+
+
+def sample_visible_ids(count, rng):
+    """Pick up to ``count`` random ids of rows that are not soft-deleted."""
+    min_id, max_id = db.session.query(db.func.min(Feedback.id), db.func.max(Feedback.id)).one()
+    if min_id is None:
+        return []
+    population = range(min_id, max_id + 1)
+    picked, tried = [], set()
+    # Earlier sizes deleted some of these ids: draw candidates in rounds
+    # and keep the ones still visible
+    while len(picked) < count and len(tried) < len(population):
+        wanted = min(2 * (count - len(picked)), len(population) - len(tried))
+        candidates = [row_id for row_id in rng.sample(population, wanted) if row_id not in tried]
+        tried.update(candidates)
+        visible = {row_id for row_id, in db.session.query(Feedback.id)
+                   .filter(Feedback.id.in_(candidates))}
+        picked.extend(row_id for row_id in candidates if row_id in visible)
+    return picked[:count]
+
+
+def seed_context(rows, deletes, rng):
+    """The middle-row cursor and the ids the deep page and delete requests need."""
+    middle = (db.session.query(Feedback.submitted_at, Feedback.id)
+              .order_by(Feedback.submitted_at.desc(), Feedback.id.desc())
+              .offset(rows // 2).limit(1).one())
+    return {
+        'middle_cursor': encode_cursor(middle.submitted_at, middle.id),
+        'delete_ids': sample_visible_ids(deletes, rng),
+    }
+
+
+def _revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], check=True,
+                              capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print per-endpoint changes against ``baseline`` to stderr."""
+    for size, endpoints in report['sizes'].items():
+        previous = baseline.get('sizes', {}).get(size)
+        if previous is None:
+            continue
+        for name, result in endpoints.items():
+            before = previous.get(name)
+            if not before:
+                continue
+            changes = []
+            for key in ('p50_ms', 'p99_ms', 'throughput_rps'):
+                if before.get(key) and result.get(key) is not None:
+                    changes.append(f'{key} {(result[key] / before[key] - 1) * 100:+.1f}%')
+            print(f'{size:>10} {name:<18} ' + '  '.join(changes), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, action='append',
+                        help='Table size to measure at (repeatable; default 10k, 1M, 10M).')
+    parser.add_argument('--database-url', default='sqlite:///feedback_bench.db')
+    parser.add_argument('--base-url', help='Benchmark a running server instead of in process.')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--endpoint', action='append', choices=ENDPOINTS,
+                        help='Only measure these endpoints (repeatable).')
+    parser.add_argument('--page-cache', default='memory', choices=('memory', ''),
+                        help="Rendered list cache for the in-process app ('' disables).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--compare', type=argparse.FileType('r'),
+                        help='Earlier report to compare against.')
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': args.database_url,
+        'RATE_LIMIT': '',
+        'PAGE_CACHE': args.page_cache,
+        'FEEDBACK_COUNT_MAX_AGE': 5,
+        'PAGE_CACHE_GENERATION_TTL': 1.0,
+    })
+    app = create_app('benchmark')
+    client = HTTPClient(args.base_url) if args.base_url else InProcessClient(app)
+    rng = random.Random(args.seed)
+    endpoints = args.endpoint or ENDPOINTS
+
+    report = {
+        'revision': _revision(),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'database': args.database_url.split(':', 1)[0],
+        'target': args.base_url or 'in-process',
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'per_page': args.per_page,
+        'sizes': {},
+    }
+    for size in sorted(args.rows or DEFAULT_SIZES):
+        with app.app_context():
+            rows = seed(size, rng)
+            context = seed_context(rows, args.requests, rng)
+            db.session.remove()
+
+        results = {}
+        for name in endpoints:
+            requests = build_requests(name, args.requests, rows, args.per_page, rng, context)
+            results[name] = run_endpoint(client, requests, args.concurrency, args.warmup)
+        report['sizes'][str(size)] = results
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+    if args.compare:
+        compare(report, json.load(args.compare))
+
+
+if __name__ == '__main__':
+    main()
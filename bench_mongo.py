@@ -0,0 +1,124 @@
+"""
+Pagination benchmark for the MongoDB feedback collection.
+
+Seeds the collection to ``--rows`` documents (1M by default) and, at a range
+of depths, times fetching one page with ``FeedbackMongo.find_all`` (sort,
+skip, limit) and with ``FeedbackMongo.find_page`` (range scan after a
+``(submitted_at, _id)`` cursor). Each is measured with only the default
+``_id`` index and again after ``FeedbackMongo.ensure_indexes()``; the JSON
+report gives the median latency and the keys and documents the server
+examined (from ``explain``).
+
+Usage:
+    python bench_mongo.py --rows 1000000 --output mongo.json
+    python bench_mongo.py --mongo-uri mongodb://db.internal:27017/feedback_bench --repeat 20
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pymongo
+from flask import Flask
+
+from app.models_mongo import (mongo, init_mongo, encode_cursor, keyset_query, PAGE_ORDER,
+                              FeedbackMongo)
+
+DEPTHS = (0.0, 0.1, 0.5, 0.9)
+SEED_BATCH = 10000
+
+
+def seed(collection, rows, rng):
+    """Grow ``collection`` to ``rows`` documents; returns the final count."""
+    existing = collection.estimated_document_count()
+    start = datetime(2020, 1, 1)
+    batch = []
+    for i in range(existing, rows):
+        batch.append({
+            'name': f'User {i}',
+            'email': f'user{i % 50000}@example.com',
+            'feedback_text': f'Seeded feedback number {i} for the pagination benchmark.',
+            'rating': rng.randint(1, 5),
+            # Whole seconds, so neighbouring documents share timestamps
+            'submitted_at': start + timedelta(seconds=i // 3),
+        })
+        if len(batch) == SEED_BATCH:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    return collection.estimated_document_count()
+
+
+def _examined(cursor):
+    stats = cursor.explain().get('executionStats', {})
+    return {'keys_examined': stats.get('totalKeysExamined'),
+            'docs_examined': stats.get('totalDocsExamined')}
+
+
+def _median_ms(fetch, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fetch()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def measure(collection, rows, per_page, repeat):
+    """Time skip and keyset pages at every depth in DEPTHS."""
+    results = {}
+    for depth in DEPTHS:
+        page = int(rows * depth) // per_page + 1
+        skip = (page - 1) * per_page
+        after = None
+        if skip:
+            previous = next(collection.find({}, {'submitted_at': 1}).sort(PAGE_ORDER)
+                            .skip(skip - 1).limit(1))
+            after = encode_cursor(previous['submitted_at'], previous['_id'])
+
+        results[f'page_{page}'] = {
+            'skip': {
+                'median_ms': _median_ms(lambda: FeedbackMongo.find_all(page, per_page), repeat),
+                **_examined(collection.find().sort('submitted_at', -1).skip(skip).limit(per_page)),
+            },
+            'keyset': {
+                'median_ms': _median_ms(lambda: FeedbackMongo.find_page(after, per_page), repeat),
+                **_examined(collection.find(keyset_query(after)).sort(PAGE_ORDER)
+                            .limit(per_page + 1)),
+            },
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/feedback_bench')
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=10, help='Timed fetches per page.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    app.config.update(MONGO_URI=args.mongo_uri, MONGO_ENSURE_INDEXES=False)
+    init_mongo(app)
+    collection = mongo.db[FeedbackMongo.collection_name]
+    rows = seed(collection, args.rows, random.Random(args.seed))
+
+    report = {'rows': rows, 'per_page': args.per_page, 'pymongo': pymongo.version}
+    collection.drop_indexes()
+    report['without_indexes'] = measure(collection, rows, args.per_page, args.repeat)
+    FeedbackMongo.ensure_indexes()
+    report['with_indexes'] = measure(collection, rows, args.per_page, args.repeat)
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
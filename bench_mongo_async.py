@@ -0,0 +1,142 @@
+"""
+Concurrent submission benchmark: sync FeedbackMongo vs AsyncFeedbackMongo.
+
+Within one process (one gunicorn worker), stores ``--submissions`` feedback
+documents at each ``--concurrency`` level, twice:
+
+    sync   FeedbackMongo.create on a thread pool with one thread per
+           in-flight submission
+    async  AsyncFeedbackMongo.create from a single event loop, at most
+           ``concurrency`` awaiting at once
+
+and reports, per level and mode, throughput, p50/p99 latency and the
+threads the process used as JSON. The collection is emptied between runs.
+
+Usage:
+    python bench_mongo_async.py --submissions 5000 --output mongo_async.json
+    python bench_mongo_async.py --mongo-uri mongodb://db.internal:27017/feedback_bench --concurrency 256
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pymongo
+from flask import Flask
+
+from app.models_mongo import mongo, init_mongo, FeedbackMongo, COUNTERS_COLLECTION
+from app.models_mongo_async import AsyncFeedbackMongo, get_mongo_loop
+
+CONCURRENCY = (1, 8, 32, 128)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def submission(i):
+    return {
+        'name': 'Bench User',
+        'email': f'user{i}@example.com',
+        'feedback_text': f'Concurrent benchmark submission {i} of sufficient length.',
+        'rating': i % 5 + 1,
+    }
+
+
+def summarize(latencies, wall, threads):
+    latencies = sorted(latencies)
+    return {
+        'submissions': len(latencies),
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'threads': threads,
+    }
+
+
+def run_sync(app, submissions, concurrency):
+    peak = threading.active_count()
+
+    def submit(i):
+        nonlocal peak
+        with app.app_context():
+            started = time.perf_counter()
+            FeedbackMongo.create(**submission(i))
+            peak = max(peak, threading.active_count())
+            return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(submit, range(submissions)))
+    return summarize(latencies, time.perf_counter() - started, peak)
+
+
+def run_async(app, submissions, concurrency):
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def submit(i):
+            async with slots:
+                started = time.perf_counter()
+                await AsyncFeedbackMongo.create(**submission(i))
+                return (time.perf_counter() - started) * 1000
+
+        return await asyncio.gather(*(submit(i) for i in range(submissions)))
+
+    with app.app_context():
+        started = time.perf_counter()
+        latencies = asyncio.run(main())
+        wall = time.perf_counter() - started
+    return summarize(latencies, wall, threading.active_count())
+
+
+def reset(app):
+    with app.app_context():
+        mongo.db[FeedbackMongo.collection_name].delete_many({})
+        mongo.db[COUNTERS_COLLECTION].delete_many({})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--submissions', type=int, default=2000, help='Documents per run.')
+    parser.add_argument('--concurrency', type=int, action='append',
+                        help=f'In-flight submissions (repeatable; default {CONCURRENCY}).')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/feedback_bench')
+    parser.add_argument('--count-strategy', default='estimated',
+                        choices=('exact', 'estimated', 'counter'))
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    app.config.update(MONGO_URI=args.mongo_uri, MONGO_COUNT_STRATEGY=args.count_strategy)
+    levels = args.concurrency or CONCURRENCY
+    # One async connection per in-flight submission, like the sync threads
+    app.config.update(MONGO_ASYNC_POOL_SIZE=max(levels))
+    init_mongo(app)
+    get_mongo_loop(app)
+
+    report = {'submissions': args.submissions, 'pymongo': pymongo.version, 'concurrency': {}}
+    for concurrency in levels:
+        reset(app)
+        sync = run_sync(app, args.submissions, concurrency)
+        reset(app)
+        report['concurrency'][concurrency] = {
+            'sync': sync,
+            'async': run_async(app, args.submissions, concurrency),
+        }
+    reset(app)
+    app.extensions['mongo_async'].stop()
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
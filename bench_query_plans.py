@@ -0,0 +1,178 @@
+"""
+Query plan benchmark for the feedback table indexes.
+
+Seeds a database with feedback rows, then captures the plan and median
+latency of the queries behind ``index`` and ``view_feedback`` with the hot
+column indexes dropped ("before") and created ("after").
+
+Usage:
+    python bench_query_plans.py --rows 1000000
+    python bench_query_plans.py --database-url postgresql://localhost/feedback_bench
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app import create_app, db
+from app.models import Feedback
+from app.counters import sync_feedback_count
+from config import config, TestingConfig
+
+SEED_CHUNK = 50000
+
+# The app's listings and lookups go through Feedback.query, whose soft
+# delete hook (app.models) adds ``deleted_at IS NULL``; the raw statements
+# carry the same predicate so their plans match what the routes run.
+VISIBLE = 'deleted_at IS NULL'
+
+QUERIES = {
+    'index_count_scan':
+        f'SELECT count(feedback.id) FROM feedback WHERE {VISIBLE}',
+    'index_counter_lookup':
+        "SELECT value FROM feedback_counter WHERE name = 'feedback'",
+    'view_first_page':
+        f'SELECT * FROM feedback WHERE {VISIBLE} ORDER BY submitted_at DESC, id DESC LIMIT 10',
+    'view_deep_page_offset':
+        f'SELECT * FROM feedback WHERE {VISIBLE} ORDER BY submitted_at DESC, id DESC '
+        'LIMIT 10 OFFSET :offset',
+    'view_deep_page_keyset':
+        f'SELECT * FROM feedback WHERE {VISIBLE} AND (submitted_at, id) < (:submitted_at, :id) '
+        'ORDER BY submitted_at DESC, id DESC LIMIT 10',
+    'email_lookup':
+        f'SELECT * FROM feedback WHERE {VISIBLE} AND email = :email',
+    'rating_count':
+        f'SELECT count(*) FROM feedback WHERE {VISIBLE} AND rating = 5',
+}
+
+
+def seed(rows, rng):
+    """
+    Grow the table to ``rows`` feedback rows spread over the last two years.
+
+    Soft-deleted rows count towards the size, so a database that earlier
+    runs deleted from is not topped up past ``rows``.
+    """
+    existing = (db.session.query(db.func.count(Feedback.id))
+                .execution_options(include_deleted=True).scalar())
+    if existing >= rows:
+        return existing
+
+    start = datetime.utcnow() - timedelta(days=730)
+    span = 730 * 24 * 3600
+    table = Feedback.__table__
+    for offset in range(existing, rows, SEED_CHUNK):
+        batch = []
+        for i in range(offset, min(offset + SEED_CHUNK, rows)):
+            batch.append({
+                'name': f'User {i}',
+                'email': f'user{i % 50000}@example.com',
+                'feedback_text': f'Benchmark feedback number {i} with sufficient length.',
+                'rating': rng.choice((None, 1, 2, 3, 4, 5)),
+                'submitted_at': start + timedelta(seconds=rng.randrange(span)),
+            })
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+    sync_feedback_count()
+    return rows
+
+
+def _statement(sql):
+    statement = db.text(sql)
+    if ':submitted_at' in sql:
+        statement = statement.bindparams(db.bindparam('submitted_at', type_=db.DateTime))
+    return statement
+
+
+def explain(sql, params):
+    """Return the query plan as a list of text lines."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) '
+    elif dialect == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    result = db.session.execute(_statement(prefix + sql), params)
+    return [' '.join(str(col) for col in row) for row in result]
+
+
+def time_query(sql, params, repeat):
+    """Return the median wall time of ``sql`` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.session.execute(_statement(sql), params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def measure(params, repeat):
+    results = {}
+    for name, sql in QUERIES.items():
+        results[name] = {
+            'plan': explain(sql, params),
+            'median_ms': time_query(sql, params, repeat),
+        }
+    return results
+
+
+def set_indexes(enabled):
+    """Drop or create the hot column indexes on ``feedback``."""
+    for index in Feedback.__table__.indexes:
+        if enabled:
+            index.create(db.engine, checkfirst=True)
+        else:
+            index.drop(db.engine, checkfirst=True)
+    if db.engine.dialect.name in ('postgresql', 'sqlite'):
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--database-url', default='sqlite:///feedback_bench.db')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+
+    config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': args.database_url,
+    })
+    app = create_app('benchmark')
+
+    with app.app_context():
+        rows = seed(args.rows, random.Random(args.seed))
+        middle = (db.session.query(Feedback.submitted_at, Feedback.id)
+                  .order_by(Feedback.submitted_at.desc(), Feedback.id.desc())
+                  .offset(rows // 2).limit(1).one())
+        params = {
+            'offset': rows // 2,
+            'submitted_at': middle.submitted_at,
+            'id': middle.id,
+            'email': 'user4242@example.com',
+        }
+
+        set_indexes(False)
+        before = measure(params, args.repeat)
+        set_indexes(True)
+        after = measure(params, args.repeat)
+
+    report = {
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'rows': rows,
+        'repeat': args.repeat,
+        'before': before,
+        'after': after,
+    }
+    json.dump(report, args.output, indent=2, default=str)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Multi-worker write benchmark for the SQLite engine profiles.
+
+Starts ``--workers`` separate processes (like gunicorn workers), each with
+``--threads`` threads posting unique submissions to ``/feedback/submit``
+against one SQLite file, once per profile:
+
+    default      SQLite defaults (rollback journal, no busy timeout)
+    production   SQLITE_PROFILE=production (WAL, synchronous=NORMAL, mmap,
+                 busy timeout, one writer per process)
+
+and reports, per profile, accepted and failed submissions ("database is
+locked" and similar errors re-render the form instead of redirecting),
+rows actually stored, throughput and p50/p99 latency as JSON.
+
+Usage:
+    python bench_sqlite.py --workers 4 --threads 4 --requests 200 --output sqlite.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROFILES = {
+    'default': {'SQLITE_PROFILE': ''},
+    'production': {'SQLITE_PROFILE': 'production'},
+}
+
+WORKER = '''
+import json, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from config import config, TestingConfig
+overrides, worker, threads, requests, start_at = json.loads(sys.argv[1])
+config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), overrides)
+from app import create_app
+app = create_app('benchmark')
+local = threading.local()
+
+def submit(i):
+    client = getattr(local, 'client', None)
+    if client is None:
+        client = local.client = app.test_client()
+    started = time.perf_counter()
+    response = client.post('/feedback/submit', data={
+        'name': 'Bench User',
+        'email': f'worker{worker}-{i}@example.com',
+        'feedback_text': f'Concurrent benchmark submission {worker}-{i} of sufficient length.',
+        'rating': str(i % 5 + 1),
+    })
+    return (time.perf_counter() - started) * 1000, response.status_code == 302
+
+time.sleep(max(0, start_at - time.time()))
+started = time.time()
+with ThreadPoolExecutor(max_workers=threads) as pool:
+    results = list(pool.map(submit, range(requests)))
+print(json.dumps({'started': started, 'finished': time.time(),
+                  'latencies': [ms for ms, _ in results],
+                  'accepted': sum(1 for _, ok in results if ok)}))
+'''
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_profile(path, overrides, workers, threads, requests):
+    """Run every worker against a fresh database at ``path``."""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    overrides = dict(overrides, SQLALCHEMY_DATABASE_URI=f'sqlite:///{path}',
+                     RATE_LIMIT='', PAGE_CACHE='', LOG_FORMAT='text')
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    # Create the schema once so the workers only race on inserts
+    subprocess.run([sys.executable, '-c', WORKER, json.dumps([overrides, 0, 1, 0, 0])],
+                   check=True, capture_output=True, cwd=cwd)
+
+    start_at = time.time() + 2.0  # let every worker finish booting
+    processes = [
+        subprocess.Popen([sys.executable, '-c', WORKER,
+                          json.dumps([overrides, worker, threads, requests, start_at])],
+                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, cwd=cwd)
+        for worker in range(1, workers + 1)
+    ]
+    samples = [json.loads(process.communicate()[0].strip().splitlines()[-1])
+               for process in processes]
+
+    with sqlite3.connect(path) as connection:
+        stored = connection.execute('SELECT COUNT(*) FROM feedback').fetchone()[0]
+
+    latencies = sorted(ms for s in samples for ms in s['latencies'])
+    accepted = sum(s['accepted'] for s in samples)
+    wall = max(s['finished'] for s in samples) - min(s['started'] for s in samples)
+    return {
+        'submissions': len(latencies),
+        'accepted': accepted,
+        'failed': len(latencies) - accepted,
+        'stored': stored,
+        'throughput_rps': round(accepted / wall, 1) if wall else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'max_ms': round(latencies[-1], 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker.')
+    parser.add_argument('--requests', type=int, default=200, help='Submissions per worker.')
+    parser.add_argument('--profile', action='append', choices=PROFILES,
+                        help='Only run these profiles (repeatable).')
+    parser.add_argument('--database', help='SQLite file to use (default: a temporary file).')
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+
+    path = os.path.abspath(args.database or os.path.join(tempfile.mkdtemp(), 'feedback_bench.db'))
+    report = {
+        'workers': args.workers,
+        'threads': args.threads,
+        'requests_per_worker': args.requests,
+        'sqlite': sqlite3.sqlite_version,
+        'profiles': {},
+    }
+    for name in args.profile or PROFILES:
+        report['profiles'][name] = run_profile(path, PROFILES[name], args.workers,
+                                               args.threads, args.requests)
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Start-up time benchmark for the app factory.
+
+Each sample runs in a fresh interpreter (like a gunicorn worker boot) and
+measures importing the package plus ``create_app()``, and the first request
+that follows, for each start-up mode:
+
+    eager_create_all   routes imported at boot, db.create_all() on boot
+    eager              routes imported at boot, schema managed by migrations
+    lazy               views imported on first request, no schema queries
+
+Usage:
+    python bench_startup.py --runs 20 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODES = {
+    'eager_create_all': {'AUTO_CREATE_TABLES': True, 'LAZY_VIEWS': False},
+    'eager': {'AUTO_CREATE_TABLES': False, 'LAZY_VIEWS': False},
+    'lazy': {'AUTO_CREATE_TABLES': False, 'LAZY_VIEWS': True},
+}
+
+SAMPLE = '''
+import json, sys, time
+started = time.perf_counter()
+from config import config, TestingConfig
+config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), json.loads(sys.argv[1]))
+from app import create_app
+app = create_app('benchmark')
+booted = time.perf_counter()
+app.test_client().get('/feedback/submit')
+served = time.perf_counter()
+print(json.dumps({'boot_ms': (booted - started) * 1000, 'first_request_ms': (served - booted) * 1000}))
+'''
+
+
+def sample(overrides):
+    """Boot one fresh interpreter with ``overrides`` and return its timings."""
+    output = subprocess.run(
+        [sys.executable, '-c', SAMPLE, json.dumps(overrides)],
+        check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(values):
+    return {
+        'median_ms': round(statistics.median(values), 2),
+        'min_ms': round(min(values), 2),
+        'max_ms': round(max(values), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--database-url', default='sqlite:///feedback_bench.db')
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+
+    # Make sure the schema exists so every mode serves the same request
+    sample({'SQLALCHEMY_DATABASE_URI': args.database_url, 'AUTO_CREATE_TABLES': True})
+
+    report = {'runs': args.runs, 'modes': {}}
+    for mode, overrides in MODES.items():
+        overrides = dict(overrides, SQLALCHEMY_DATABASE_URI=args.database_url)
+        samples = [sample(overrides) for _ in range(args.runs)]
+        report['modes'][mode] = {
+            'boot': summarize([s['boot_ms'] for s in samples]),
+            'first_request': summarize([s['first_request_ms'] for s in samples]),
+        }
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Throughput benchmark for the feedback storage backends.
+
+Runs the same write-heavy workload through ``get_storage()`` against each
+backend (or only those given with ``--backend``):
+
+    create        ``--records`` single submissions
+    create_many   the same number again in ``--batch-size`` batches
+    page          a walk over the first ``--pages`` cursor pages
+    count         ``--records`` home page totals
+    delete        half of the single submissions, one at a time
+    delete_many   the other half with one id list
+
+and reports, per backend and operation, throughput and p50/p99 latency of
+each call as JSON. Each backend starts from an empty store.
+
+Usage:
+    python bench_storage.py --records 2000 --output storage.json
+    python bench_storage.py --backend mongo --mongo-uri mongodb://db.internal:27017/feedback_bench
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app import create_app
+from app.storage import get_storage
+from config import config, TestingConfig
+
+BACKENDS = ('sqlalchemy', 'mongo')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies, operations):
+    """Throughput over ``operations`` records and latency per call."""
+    latencies = sorted(latencies)
+    total = sum(latencies) / 1000
+    return {
+        'calls': len(latencies),
+        'ops_per_s': round(operations / total, 1) if total else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+    }
+
+
+def timed(call, *args, **kwargs):
+    started = time.perf_counter()
+    result = call(*args, **kwargs)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def submission(i, prefix):
+    return {
+        'name': f'Bench User {i}',
+        'email': f'{prefix}{i}@example.com',
+        'feedback_text': f'Storage benchmark submission {prefix}-{i} of sufficient length.',
+        'rating': i % 5 + 1,
+        'submitted_at': datetime(2024, 1, 1) + timedelta(seconds=i // 3),
+    }
+
+
+def reset(storage):
+    """Empty the backend's store."""
+    if storage.name == 'mongo':
+        from app.models_mongo import mongo, FeedbackMongo, COUNTERS_COLLECTION
+
+        mongo.db[FeedbackMongo.collection_name].drop()
+        mongo.db[COUNTERS_COLLECTION].drop()
+        FeedbackMongo.ensure_indexes()
+    else:
+        from app import db
+
+        db.drop_all()
+        db.create_all()
+
+
+def run_workload(storage, records, batch_size, pages, per_page):
+    """Run every operation once against ``storage``."""
+    results = {}
+
+    samples = [timed(storage.create, submission(i, 'single')) for i in range(records)]
+    ids = [feedback_id for _, feedback_id in samples]
+    results['create'] = summarize([ms for ms, _ in samples], records)
+
+    rows = [submission(i, 'bulk') for i in range(records)]
+    samples = [timed(storage.create_many, rows[i:i + batch_size])
+               for i in range(0, records, batch_size)]
+    results['create_many'] = summarize([ms for ms, _ in samples], records)
+
+    latencies, after = [], None
+    for _ in range(pages):
+        ms, page = timed(storage.page, after=after, per_page=per_page)
+        latencies.append(ms)
+        if not page.has_next:
+            break
+        after = page.next_cursor
+    results['page'] = summarize(latencies, len(latencies) * per_page)
+
+    results['count'] = summarize([timed(storage.count)[0] for _ in range(records)], records)
+
+    half = len(ids) // 2
+    results['delete'] = summarize([timed(storage.delete, i)[0] for i in ids[:half]], half)
+    ms, _ = timed(storage.delete_matching, ids=ids[half:])
+    results['delete_many'] = summarize([ms], len(ids) - half)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--backend', action='append', choices=BACKENDS,
+                        help='Only run these backends (repeatable).')
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=50)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--database-url',
+                        help='SQLAlchemy URL (default: a temporary SQLite file).')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/feedback_bench')
+    parser.add_argument('--output', type=argparse.FileType('w'), default=sys.stdout)
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(),
+                                                                      'feedback_bench.db')
+    report = {'records': args.records, 'batch_size': args.batch_size, 'backends': {}}
+    for backend in args.backend or BACKENDS:
+        config['benchmark'] = type('BenchmarkConfig', (TestingConfig,), {
+            'STORAGE_BACKEND': backend,
+            'SQLALCHEMY_DATABASE_URI': database_url,
+            'MONGO_URI': args.mongo_uri,
+            'MONGO_ENSURE_INDEXES': False,
+            'PAGE_CACHE': '',
+            'LOG_FORMAT': 'text',
+        })
+        app = create_app('benchmark')
+        with app.app_context():
+            storage = get_storage(app)
+            reset(storage)
+            report['backends'][backend] = run_workload(storage, args.records, args.batch_size,
+                                                       args.pages, args.per_page)
+
+    json.dump(report, args.output, indent=2)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Command line interface for the Feedback Application (``flask feedback ...``
+and ``flask init-db``).
+"""
+import json
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+from app import db
+from app.export import stream_export, parse_timestamp, FORMATS
+from app.analytics import backfill_rollups
+
+feedback_cli = AppGroup('feedback', help='Feedback data management commands.')
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create all tables and mark the database as migrated to head."""
+    db.create_all()
+    click.echo('Created database tables.')
+
+    if os.path.isdir(current_app.extensions['migrate'].directory):
+        from flask_migrate import stamp
+        stamp()
+
+
+def _parse_timestamp_option(ctx, param, value):
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        raise click.BadParameter('expected an ISO 8601 date or datetime')
+
+
+@feedback_cli.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['auto', 'json', 'ndjson']), default='auto',
+              help='Input format; auto picks by file extension.')
+@click.option('--chunk-size', type=int, default=None,
+              help='Rows per INSERT (defaults to BULK_INSERT_CHUNK_SIZE).')
+def import_feedback(source, fmt, chunk_size):
+    """Import feedback rows from a JSON array or NDJSON file."""
+    # Deferred: pulls in the WTForms form used for validation
+    from app.ingest import bulk_insert, iter_ndjson
+
+    if fmt == 'auto':
+        fmt = 'json' if source.name.endswith('.json') else 'ndjson'
+
+    if fmt == 'json':
+        rows = json.load(source)
+        if isinstance(rows, dict):
+            rows = rows.get('items', [])
+    else:
+        rows = iter_ndjson(source)
+
+    result = bulk_insert(rows, chunk_size=chunk_size)
+
+    for error in result['errors']:
+        click.echo(f"row {error['row']}: {json.dumps(error['errors'])}", err=True)
+    click.echo(f"Imported {result['inserted']} rows, {result['failed']} failed.")
+
+
+@feedback_cli.command('export')
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv',
+              help='Output format.')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-',
+              help='Output file (defaults to stdout).')
+@click.option('--start', callback=_parse_timestamp_option,
+              help='Only rows submitted at or after this ISO date/time.')
+@click.option('--end', callback=_parse_timestamp_option,
+              help='Only rows submitted before this ISO date/time.')
+@click.option('--min-rating', type=click.IntRange(1, 5), default=None)
+@click.option('--max-rating', type=click.IntRange(1, 5), default=None)
+def export_feedback(fmt, output, start, end, min_rating, max_rating):
+    """Stream feedback rows to a CSV or NDJSON file."""
+    for chunk in stream_export(fmt, start=start, end=end,
+                               min_rating=min_rating, max_rating=max_rating):
+        output.write(chunk)
+
+
+@feedback_cli.command('backfill-stats')
+def backfill_stats():
+    """Rebuild the rating rollup table from existing feedback."""
+    buckets = backfill_rollups()
+    click.echo(f'Rebuilt {buckets} rating buckets.')
+
+
+@feedback_cli.command('flush-queue')
+def flush_queue():
+    """Write all pending write-behind submissions to the database."""
+    from app.write_queue import drain
+
+    click.echo(f'Flushed {drain()} queued submissions.')
+
+
+@feedback_cli.command('purge')
+@click.option('--retention', type=int, default=None,
+              help='Seconds a deleted row is kept (defaults to PURGE_RETENTION).')
+@click.option('--batch-size', type=int, default=None,
+              help='Rows per DELETE (defaults to PURGE_BATCH_SIZE).')
+def purge(retention, batch_size):
+    """Hard-delete feedback that was soft-deleted longer ago than the retention."""
+    from app.deletion import purge_deleted
+
+    click.echo(f'Purged {purge_deleted(retention=retention, batch_size=batch_size)} deleted rows.')
+
+
+def _feedback_mongo():
+    """Return FeedbackMongo connected to the current app."""
+    try:
+        from app.models_mongo import mongo, init_mongo, FeedbackMongo
+    except ImportError as e:
+        raise click.ClickException('MongoDB support requires: pip install pymongo flask-pymongo') from e
+
+    if mongo.db is None:
+        init_mongo(current_app)
+    return FeedbackMongo
+
+
+@feedback_cli.command('mongo-indexes')
+def mongo_indexes():
+    """Create the indexes of the MongoDB feedback collection."""
+    click.echo(f"Ensured indexes: {', '.join(_feedback_mongo().ensure_indexes())}.")
+
+
+@feedback_cli.command('mongo-sync-count')
+def mongo_sync_count():
+    """Reset the MongoDB feedback counter document from a full count."""
+    click.echo(f'Feedback count: {_feedback_mongo().sync_count()}.')
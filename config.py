@@ -5,6 +5,53 @@ Supports development, testing, and production environments.
 import os
 from datetime import timedelta
 
+
+def env_bool(name, default):
+    """Read a boolean environment variable ('1', 'true', 'yes' or 'on' is true)."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def build_engine_options(database_url):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for a pooled PostgreSQL deployment.
+
+    Pool sizes are per process; the defaults fit ``gunicorn --workers 4
+    --threads 2`` (one connection per thread plus a small overflow). With
+    DB_PGBOUNCER enabled pooling is left to PgBouncer: SQLAlchemy opens a
+    fresh connection per checkout and no startup options are sent, so set
+    statement_timeout on the database role instead.
+
+    Other databases (e.g. a small SQLite deployment) keep SQLAlchemy's
+    defaults, since the pool sizes and startup options are PostgreSQL's.
+    """
+    from sqlalchemy.engine import make_url
+
+    if not database_url or make_url(database_url).get_backend_name() != 'postgresql':
+        return {}
+
+    if env_bool('DB_PGBOUNCER', False):
+        from sqlalchemy.pool import NullPool
+        return {
+            'poolclass': NullPool,
+            'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+        }
+
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 2)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 2)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', True),
+    }
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    if statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
 class Config:
     """Base configuration."""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -12,11 +59,101 @@ class Config:
     # SQLAlchemy Configuration
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Start-up: create missing tables on boot, and defer importing views
+    AUTO_CREATE_TABLES = env_bool('AUTO_CREATE_TABLES', True)
+    LAZY_VIEWS = env_bool('LAZY_VIEWS', False)
+
     # Session Configuration
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
 
+    # Feedback store: 'sqlalchemy' (SQLALCHEMY_DATABASE_URI) or 'mongo'
+    # (MONGO_URI and the other settings in config_mongo.MongoConfig)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sqlalchemy')
+
+    # SQLite deployments: 'production' enables WAL, synchronous=NORMAL, mmap,
+    # a busy timeout and one writer per process ('' keeps SQLite defaults)
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'production')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
     # Pagination
-    ITEMS_PER_PAGE = 10
+    ITEMS_PER_PAGE = int(os.environ.get('ITEMS_PER_PAGE', 10))
+    # Larger per_page requests are clamped to this
+    MAX_ITEMS_PER_PAGE = int(os.environ.get('MAX_ITEMS_PER_PAGE', 500))
+    # Pages above this size are streamed to the client instead of buffered
+    STREAM_PAGE_THRESHOLD = int(os.environ.get('STREAM_PAGE_THRESHOLD', 100))
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 100))
+    API_MAX_PER_PAGE = 100
+    # 'offset' (numbered pages) or 'keyset' (cursor-based, no COUNT(*))
+    PAGINATION_MODE = os.environ.get('PAGINATION_MODE', 'offset')
+
+    # Home page counter: seconds a cached feedback count may be served
+    FEEDBACK_COUNT_MAX_AGE = int(os.environ.get('FEEDBACK_COUNT_MAX_AGE', 5))
+
+    # Bulk ingestion: rows per INSERT statement, and the largest request
+    # body /feedback/bulk accepts
+    BULK_INSERT_CHUNK_SIZE = int(os.environ.get('BULK_INSERT_CHUNK_SIZE', 1000))
+    BULK_INGEST_MAX_BYTES = int(os.environ.get('BULK_INGEST_MAX_BYTES', 10 * 1024 * 1024))
+
+    # Export: rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+    # Full-text search: 'auto' (by database dialect), 'postgres', 'sqlite' or 'like'
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'auto')
+
+    # Write-behind submissions: spool locally, flush to the database in batches
+    WRITE_BEHIND = env_bool('WRITE_BEHIND', False)
+    WRITE_QUEUE_PATH = os.environ.get('WRITE_QUEUE_PATH')  # defaults to instance/feedback_queue.db
+    WRITE_QUEUE_WORKER = env_bool('WRITE_QUEUE_WORKER', True)
+    WRITE_QUEUE_BATCH_SIZE = int(os.environ.get('WRITE_QUEUE_BATCH_SIZE', 500))
+    WRITE_QUEUE_FLUSH_INTERVAL = float(os.environ.get('WRITE_QUEUE_FLUSH_INTERVAL', 0.5))
+    WRITE_QUEUE_LEASE = int(os.environ.get('WRITE_QUEUE_LEASE', 30))
+    WRITE_QUEUE_RETENTION = int(os.environ.get('WRITE_QUEUE_RETENTION', 3600))
+    WRITE_QUEUE_MAX_ATTEMPTS = int(os.environ.get('WRITE_QUEUE_MAX_ATTEMPTS', 5))
+
+    # Duplicate detection: seconds within which a repeated (email, text) is
+    # rejected (0 = off), and the size of each worker's Bloom filter index
+    DEDUP_WINDOW = int(os.environ.get('DEDUP_WINDOW', 3600))
+    DEDUP_INDEX_CAPACITY = int(os.environ.get('DEDUP_INDEX_CAPACITY', 100000))
+    DEDUP_ERROR_RATE = float(os.environ.get('DEDUP_ERROR_RATE', 0.001))
+
+    # Submission rate limit per client IP and per email: 'memory', 'redis' or '' (off)
+    RATE_LIMIT = os.environ.get('RATE_LIMIT', 'memory')
+    RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', 6))
+    RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 5))
+    RATE_LIMIT_MEMORY_SIZE = int(os.environ.get('RATE_LIMIT_MEMORY_SIZE', 10000))
+    RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto
+    # headers are trusted for the client address (0 = use the socket peer)
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 0))
+
+    # Logging: 'json' (one object per line via a background queue) or 'text'
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    # Log this share of SQL statements slower than SLOW_QUERY_MS
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 0.1))
+
+    # Request/SQL/template timing at /metrics and in Server-Timing headers
+    METRICS_ENABLED = env_bool('METRICS_ENABLED', True)
+    SERVER_TIMING = env_bool('SERVER_TIMING', True)
+
+    # Moderation: bulk delete access and limits, and purging of soft-deleted rows
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')  # unset = bulk import and delete disabled
+    BULK_DELETE_MAX_IDS = int(os.environ.get('BULK_DELETE_MAX_IDS', 10000))
+    BULK_DELETE_MAX_DAYS = int(os.environ.get('BULK_DELETE_MAX_DAYS', 31))
+    PURGE_RETENTION = int(os.environ.get('PURGE_RETENTION', 7 * 24 * 3600))
+    PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 500))
+    PURGE_INTERVAL = float(os.environ.get('PURGE_INTERVAL', 0))  # 0 = no background thread
+
+    # Rendered feedback list cache: 'memory', 'redis' or '' (off)
+    PAGE_CACHE = os.environ.get('PAGE_CACHE', 'memory')
+    PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', 256))
+    PAGE_CACHE_GENERATION_TTL = float(os.environ.get('PAGE_CACHE_GENERATION_TTL', 1.0))
+    PAGE_CACHE_REDIS_URL = os.environ.get('PAGE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
 
     # CSRF Protection
     WTF_CSRF_ENABLED = True
@@ -34,6 +171,10 @@ class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
     SQLALCHEMY_DATABASE_URI = 'sqlite:///feedback_test.db'
+    SQLITE_PROFILE = ''
+    SEARCH_BACKEND = 'sqlite'
+    FEEDBACK_COUNT_MAX_AGE = 0
+    PAGE_CACHE_GENERATION_TTL = 0
 
 class ProductionConfig(Config):
     """Production configuration."""
@@ -44,6 +185,21 @@ class ProductionConfig(Config):
     if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith("postgres://"):
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace("postgres://", "postgresql://", 1)
 
+    SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'postgres')
+
+    # Behind the platform router (Heroku, Render), one proxy hop
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 1))
+
+    # Structured logs for the platform's log drain
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+
+    # Schema is managed by `flask db upgrade`; workers only import what they serve
+    AUTO_CREATE_TABLES = env_bool('AUTO_CREATE_TABLES', False)
+    LAZY_VIEWS = env_bool('LAZY_VIEWS', True)
+
+    # Connection pool sizing, pre-ping and statement timeout (PostgreSQL)
+    SQLALCHEMY_ENGINE_OPTIONS = build_engine_options(SQLALCHEMY_DATABASE_URI)
+
 config = {
     'development': DevelopmentConfig,
     'testing': TestingConfig,
@@ -4,6 +4,25 @@ To use this, set MONGO_URI environment variable
 """
 import os
 
+from config import env_bool
+
 class MongoConfig:
     """MongoDB configuration."""
     MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://localhost:27017/feedback_db'
+
+    # Create the feedback indexes when the app starts (or run
+    # `flask feedback mongo-indexes` once and turn this off)
+    MONGO_ENSURE_INDEXES = env_bool('MONGO_ENSURE_INDEXES', True)
+
+    # Bulk writes: documents per insert_many/bulk_write request, and the
+    # write concern 'w' (a number of members or 'majority')
+    MONGO_BULK_BATCH_SIZE = int(os.environ.get('MONGO_BULK_BATCH_SIZE', 1000))
+    MONGO_WRITE_CONCERN = os.environ.get('MONGO_WRITE_CONCERN', '1')
+
+    # Home page total: 'estimated' (collection metadata), 'counter' (a
+    # document kept with $inc by every write) or 'exact' (count_documents)
+    MONGO_COUNT_STRATEGY = os.environ.get('MONGO_COUNT_STRATEGY', 'estimated')
+
+    # Async client (models_mongo_async): connections shared by every
+    # in-flight operation of a worker process
+    MONGO_ASYNC_POOL_SIZE = int(os.environ.get('MONGO_ASYNC_POOL_SIZE', 100))
@@ -0,0 +1,131 @@
+"""
+Incrementally maintained feedback counter.
+
+The total number of feedback rows is kept in the ``feedback_counter`` summary
+table, updated in the same transaction as every ORM insert/delete of a
+``Feedback`` row. Readers fetch it by primary key and cache it in-process for
+``FEEDBACK_COUNT_MAX_AGE`` seconds, so the home page never scans ``feedback``.
+
+The same table holds a ``generation`` number bumped by every write, which
+readers use to validate cached responses (ETags) without querying feedback.
+"""
+import time
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Feedback, FeedbackCounter
+
+FEEDBACK_COUNTER = 'feedback'
+FEEDBACK_GENERATION = 'generation'
+
+_counter_table = FeedbackCounter.__table__
+
+
+def adjust_feedback_count(connection, delta):
+    """
+    Add ``delta`` to the stored feedback count on ``connection``.
+
+    Writers that bypass the ORM (bulk inserts/deletes) must call this inside
+    their own transaction to keep the counter exact.
+    """
+    if not delta:
+        return
+    # One statement updates the count and bumps the generation
+    connection.execute(
+        _counter_table.update()
+        .where(_counter_table.c.name.in_((FEEDBACK_COUNTER, FEEDBACK_GENERATION)))
+        .values(value=_counter_table.c.value + db.case(
+            (_counter_table.c.name == FEEDBACK_COUNTER, delta), else_=1))
+    )
+
+
+def bump_feedback_generation(connection):
+    """Mark feedback as changed without altering the count (e.g. updates)."""
+    connection.execute(
+        _counter_table.update()
+        .where(_counter_table.c.name == FEEDBACK_GENERATION)
+        .values(value=_counter_table.c.value + 1)
+    )
+
+
+@db.event.listens_for(Feedback, 'after_insert')
+def _feedback_inserted(mapper, connection, target):
+    adjust_feedback_count(connection, 1)
+
+
+@db.event.listens_for(Feedback, 'after_delete')
+def _feedback_deleted(mapper, connection, target):
+    # Soft-deleted rows were already subtracted when they were hidden
+    if target.deleted_at is None:
+        adjust_feedback_count(connection, -1)
+
+
+def sync_feedback_count():
+    """Recompute the stored counter from the ``feedback`` table (one scan)."""
+    total = db.session.query(db.func.count(Feedback.id)).scalar()
+    counter = db.session.get(FeedbackCounter, FEEDBACK_COUNTER)
+    if counter is None:
+        db.session.add(FeedbackCounter(name=FEEDBACK_COUNTER, value=total))
+    else:
+        counter.value = total
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker seeded the counter first; its count is as fresh
+        db.session.rollback()
+        total = db.session.query(FeedbackCounter.value).filter_by(name=FEEDBACK_COUNTER).scalar()
+    invalidate_feedback_count()
+    return total
+
+
+def _cache():
+    return current_app.extensions.setdefault('feedback_counter', {})
+
+
+def invalidate_feedback_count():
+    """Drop the in-process cached value so the next read hits the counter row."""
+    _cache().clear()
+
+
+def get_feedback_count():
+    """
+    Return the total number of feedback entries.
+
+    Served from the in-process cache while it is younger than
+    ``FEEDBACK_COUNT_MAX_AGE`` seconds, otherwise from a primary key lookup
+    on the summary table. The table is seeded on first use.
+    """
+    cache = _cache()
+    max_age = current_app.config.get('FEEDBACK_COUNT_MAX_AGE', 5)
+    now = time.monotonic()
+
+    if 'value' in cache and now - cache['fetched_at'] < max_age:
+        return cache['value']
+
+    value = db.session.query(FeedbackCounter.value).filter_by(name=FEEDBACK_COUNTER).scalar()
+    if value is None:
+        value = sync_feedback_count()
+
+    cache['value'] = value
+    cache['fetched_at'] = now
+    return value
+
+
+def get_feedback_generation():
+    """
+    Return the current feedback generation (one primary key lookup).
+
+    The number changes whenever feedback is written, so it can key caches
+    and ETags across all workers. The row is created on first use.
+    """
+    value = db.session.query(FeedbackCounter.value).filter_by(name=FEEDBACK_GENERATION).scalar()
+    if value is None:
+        db.session.add(FeedbackCounter(name=FEEDBACK_GENERATION, value=0))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created it first
+            db.session.rollback()
+        value = db.session.query(FeedbackCounter.value).filter_by(name=FEEDBACK_GENERATION).scalar()
+    return value
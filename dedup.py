@@ -0,0 +1,172 @@
+"""
+Duplicate submission detection.
+
+A submission is identified by a SHA-256 digest of its normalized
+``(email, feedback_text)``. Each stored row carries ``dedup_hash``, the
+digest combined with its ``DEDUP_WINDOW`` time bucket, under a unique
+index, so the database itself rejects a repeat within the same bucket.
+
+Each worker also keeps a pair of rotating Bloom filters of the digests it
+has seen in the last one to two windows. A digest the filter has never seen
+cannot be a local repeat, so the common case is decided without a query;
+only possible repeats are confirmed against the database. Repeats that
+reach another worker in the same bucket are caught by the unique index.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from app import db
+from app.models import Feedback
+
+
+def content_digest(email, feedback_text):
+    """Digest of a submission's normalized email and text."""
+    email = (email or '').strip().lower()
+    text = ' '.join((feedback_text or '').split()).casefold()
+    return hashlib.sha256(f'{email}\0{text}'.encode('utf-8')).digest()
+
+
+def dedup_hash(digest, submitted_at, window):
+    """Value stored in ``Feedback.dedup_hash`` for a digest and submission time."""
+    # Timestamps are naive UTC
+    bucket = int(submitted_at.replace(tzinfo=timezone.utc).timestamp() // window)
+    return hashlib.sha256(digest + bucket.to_bytes(8, 'big', signed=True)).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 32-byte digests."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest):
+        # Double hashing: two independent 64-bit slices of the digest
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(digest))
+
+
+class RecentIndex:
+    """Digests seen in the last one to two windows, in bounded memory."""
+
+    def __init__(self, window, capacity=100000, error_rate=0.001):
+        self.window = window
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(capacity, error_rate)
+        self._rotated_at = time.monotonic()
+
+    def _rotate(self):
+        if time.monotonic() - self._rotated_at >= self.window:
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = time.monotonic()
+
+    def add(self, digest):
+        with self._lock:
+            self._rotate()
+            self._current.add(digest)
+
+    def __contains__(self, digest):
+        with self._lock:
+            self._rotate()
+            return digest in self._current or digest in self._previous
+
+
+def get_recent_index(app=None):
+    """Return the app's RecentIndex, or None when ``DEDUP_WINDOW`` is 0."""
+    app = app or current_app._get_current_object()
+    if 'dedup_index' not in app.extensions:
+        window = app.config.get('DEDUP_WINDOW', 0)
+        app.extensions['dedup_index'] = RecentIndex(
+            window,
+            capacity=app.config.get('DEDUP_INDEX_CAPACITY', 100000),
+            error_rate=app.config.get('DEDUP_ERROR_RATE', 0.001)
+        ) if window else None
+    return app.extensions['dedup_index']
+
+
+def is_duplicate(email, feedback_text, now=None):
+    """
+    Return True when the same submission was stored within ``DEDUP_WINDOW``.
+
+    Rows hidden by moderation still count, so deleted spam cannot be resent.
+    """
+    index = get_recent_index()
+    if index is None:
+        return False
+    digest = content_digest(email, feedback_text)
+    if digest not in index:
+        return False
+
+    now = now or datetime.utcnow()
+    window = index.window
+    hashes = [dedup_hash(digest, now - timedelta(seconds=offset), window)
+              for offset in (0, window)]
+    # Deferred: app.storage imports this module
+    from app.storage import get_storage
+    return get_storage().has_dedup_hash(hashes, now - timedelta(seconds=window))
+
+
+def remember(email, feedback_text):
+    """Record a stored submission in this worker's index."""
+    index = get_recent_index()
+    if index is not None:
+        index.add(content_digest(email, feedback_text))
+
+
+def assign_dedup_hashes(rows):
+    """Set ``dedup_hash`` on column dicts; returns False when dedup is off."""
+    window = current_app.config.get('DEDUP_WINDOW', 0)
+    if not window:
+        return False
+    for row in rows:
+        digest = content_digest(row['email'], row['feedback_text'])
+        row['dedup_hash'] = dedup_hash(digest, row['submitted_at'], window)
+    return True
+
+
+def partition_duplicates(rows):
+    """
+    Set ``dedup_hash`` on column dicts and split out repeats.
+
+    A row repeats when an earlier row in ``rows`` or a stored row has the same
+    hash. Stored rows are looked up with one IN query.
+
+    Returns:
+        Tuple of (positions of fresh rows, positions of duplicates)
+    """
+    if not assign_dedup_hashes(rows):
+        return list(range(len(rows))), []
+
+    hashes = {row['dedup_hash'] for row in rows}
+    seen = set(db.session.execute(
+        db.select(Feedback.dedup_hash)
+        .where(Feedback.dedup_hash.in_(hashes))
+        .execution_options(include_deleted=True)
+    ).scalars())
+
+    fresh, duplicates = [], []
+    for position, row in enumerate(rows):
+        if row['dedup_hash'] in seen:
+            duplicates.append(position)
+        else:
+            seen.add(row['dedup_hash'])
+            fresh.append(position)
+    return fresh, duplicates
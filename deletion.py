@@ -0,0 +1,169 @@
+"""
+Soft deletion and purging of feedback.
+
+Moderation hides rows by setting ``deleted_at`` with one set-based UPDATE;
+ORM queries filter hidden rows out (see ``models._hide_deleted_feedback``).
+The counter, rating rollup and page cache generation are adjusted in the
+same transaction, exactly as for a hard delete.
+
+Hidden rows are hard-deleted by :func:`purge_deleted` once they are older
+than ``PURGE_RETENTION`` seconds, in batches of ``PURGE_BATCH_SIZE`` rows with
+a commit after each, so no single statement holds locks on a large range.
+It runs from ``flask feedback purge`` or, with ``PURGE_INTERVAL`` set, in a
+background thread.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from app import db
+from app.models import Feedback
+from app.counters import adjust_feedback_count, invalidate_feedback_count
+from app.analytics import record_ratings
+from app.page_cache import invalidate_pages
+
+_feedback_table = Feedback.__table__
+
+
+def build_delete_criteria(ids=None, email=None, start=None, end=None,
+                          min_rating=None, max_rating=None):
+    """
+    Build WHERE clauses selecting the rows to delete.
+
+    Args:
+        ids: Iterable of feedback ids
+        email: Exact submitter email
+        start: Only rows submitted at or after this datetime
+        end: Only rows submitted before this datetime
+        min_rating: Minimum rating (inclusive)
+        max_rating: Maximum rating (inclusive)
+
+    Raises:
+        ValueError: When no criterion is given
+    """
+    c = _feedback_table.c
+    criteria = []
+    if ids is not None:
+        criteria.append(c.id.in_(list(ids)))
+    if email is not None:
+        criteria.append(c.email == email)
+    if start is not None:
+        criteria.append(c.submitted_at >= start)
+    if end is not None:
+        criteria.append(c.submitted_at < end)
+    if min_rating is not None:
+        criteria.append(c.rating >= min_rating)
+    if max_rating is not None:
+        criteria.append(c.rating <= max_rating)
+    if not criteria:
+        raise ValueError('Refusing to delete without ids or filters')
+    return criteria
+
+
+def soft_delete(**filters):
+    """
+    Hide the visible rows matching ``filters`` with one UPDATE.
+
+    Accepts the keyword arguments of :func:`build_delete_criteria`.
+
+    Returns:
+        Number of rows hidden
+    """
+    c = _feedback_table.c
+    criteria = build_delete_criteria(**filters) + [c.deleted_at.is_(None)]
+    stmt = _feedback_table.update().where(*criteria).values(deleted_at=datetime.utcnow())
+
+    connection = db.session.connection()
+    try:
+        if connection.dialect.update_returning:
+            rows = connection.execute(stmt.returning(c.submitted_at, c.rating)).all()
+        else:
+            rows = connection.execute(
+                db.select(c.submitted_at, c.rating).where(*criteria).with_for_update()
+            ).all()
+            connection.execute(stmt)
+        adjust_feedback_count(connection, -len(rows))
+        record_ratings(connection, rows, sign=-1)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if rows:
+        invalidate_feedback_count()
+        invalidate_pages()
+    return len(rows)
+
+
+def purge_deleted(retention=None, batch_size=None, max_batches=None):
+    """
+    Hard-delete rows hidden for longer than ``retention`` seconds.
+
+    Args:
+        retention: Seconds a hidden row is kept (defaults to ``PURGE_RETENTION``)
+        batch_size: Rows per DELETE (defaults to ``PURGE_BATCH_SIZE``)
+        max_batches: Stop after this many batches (default: until done)
+
+    Returns:
+        Number of rows deleted
+    """
+    config = current_app.config
+    if retention is None:
+        retention = config.get('PURGE_RETENTION', 7 * 24 * 3600)
+    if batch_size is None:
+        batch_size = config.get('PURGE_BATCH_SIZE', 500)
+
+    c = _feedback_table.c
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    select_batch = (db.select(c.id)
+                    .where(c.deleted_at.is_not(None), c.deleted_at < cutoff)
+                    .order_by(c.deleted_at)
+                    .limit(batch_size)
+                    .execution_options(include_deleted=True))
+
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(select_batch).scalars().all()
+        if not ids:
+            break
+        # Counters were adjusted when the rows were hidden
+        db.session.execute(_feedback_table.delete().where(c.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
+        batches += 1
+    return total
+
+
+class PurgeWorker(threading.Thread):
+    """Daemon thread that purges hidden feedback every ``PURGE_INTERVAL`` seconds."""
+
+    def __init__(self, app):
+        super().__init__(name='feedback-purge', daemon=True)
+        self.app = app
+        self.interval = app.config['PURGE_INTERVAL']
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    purge_deleted()
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.error('Feedback purge failed: %s', e)
+                finally:
+                    db.session.remove()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_purge_worker(app):
+    """Start the background purge thread for ``app`` (once per process)."""
+    worker = app.extensions.get('purge_worker')
+    if worker is None or not worker.is_alive():
+        worker = PurgeWorker(app)
+        app.extensions['purge_worker'] = worker
+        worker.start()
+    return worker
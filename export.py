@@ -0,0 +1,104 @@
+"""
+Streaming feedback export.
+
+Rows are read through a server-side cursor (``yield_per``) as plain column
+tuples and serialized chunk by chunk, so exporting the whole table uses
+constant memory in both the web worker and the CLI.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+from flask import current_app
+from app import db
+from app.models import Feedback
+
+COLUMNS = ('id', 'name', 'email', 'feedback_text', 'rating', 'submitted_at')
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 date or datetime (None passes through).
+
+    A value with a UTC offset is converted to naive UTC, the form stored in
+    ``submitted_at``, so it compares correctly with the column and with
+    values given without an offset.
+    """
+    if value in (None, ''):
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def build_export_query(start=None, end=None, min_rating=None, max_rating=None):
+    """
+    Build the export SELECT with optional filters.
+
+    Args:
+        start: Only rows submitted at or after this datetime
+        end: Only rows submitted before this datetime
+        min_rating: Minimum rating (inclusive)
+        max_rating: Maximum rating (inclusive)
+    """
+    stmt = db.select(*(getattr(Feedback, column) for column in COLUMNS))
+    if start is not None:
+        stmt = stmt.where(Feedback.submitted_at >= start)
+    if end is not None:
+        stmt = stmt.where(Feedback.submitted_at < end)
+    if min_rating is not None:
+        stmt = stmt.where(Feedback.rating >= min_rating)
+    if max_rating is not None:
+        stmt = stmt.where(Feedback.rating <= max_rating)
+    return stmt.order_by(Feedback.id)
+
+
+def iter_batches(stmt, batch_size=None):
+    """Yield lists of row tuples fetched through a server-side cursor."""
+    if batch_size is None:
+        batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield partition
+
+
+def _format_timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value is not None else None
+
+
+def iter_csv(batches):
+    """Serialize row batches as CSV text chunks, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(row[:-1] + (_format_timestamp(row[-1]),) for row in batch)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(batches):
+    """Serialize row batches as newline-delimited JSON text chunks."""
+    for batch in batches:
+        yield ''.join(
+            json.dumps(dict(zip(COLUMNS, row[:-1] + (_format_timestamp(row[-1]),)))) + '\n'
+            for row in batch
+        )
+
+
+def stream_export(fmt, **filters):
+    """Return a generator of text chunks exporting feedback in ``fmt``."""
+    batches = iter_batches(build_export_query(**filters))
+    if fmt == 'csv':
+        return iter_csv(batches)
+    return iter_ndjson(batches)
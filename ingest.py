@@ -0,0 +1,138 @@
+"""
+Bulk feedback ingestion.
+
+Rows are validated with the same rules as ``FeedbackForm`` and written with
+one ``create_many`` call per chunk on the storage backend (a multi-row
+``INSERT`` for SQLAlchemy, unordered ``insert_many`` requests for MongoDB).
+Invalid rows are reported individually and never abort the rest of the batch.
+"""
+import json
+from datetime import datetime
+from itertools import islice
+
+from flask import current_app
+from werkzeug.datastructures import MultiDict
+from app import db
+from app.models import Feedback
+from app.forms import FeedbackForm
+from app.counters import adjust_feedback_count
+from app.analytics import record_ratings
+from app.storage import get_storage
+from app.export import parse_timestamp
+
+FIELDS = ('name', 'email', 'feedback_text', 'rating')
+
+
+class MalformedRow:
+    """Placeholder for an input line that could not be parsed."""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def iter_ndjson(lines):
+    """Parse newline-delimited JSON, yielding a MalformedRow for bad lines."""
+    for line in lines:
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+        except UnicodeDecodeError as e:
+            yield MalformedRow(f'Invalid UTF-8: {e}')
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield MalformedRow(f'Invalid JSON: {e}')
+
+
+def validate_row(row):
+    """
+    Validate one input row against ``FeedbackForm``.
+
+    Returns:
+        Tuple of (column values or None, errors dict)
+    """
+    if isinstance(row, MalformedRow):
+        return None, {'row': [row.message]}
+    if not isinstance(row, dict):
+        return None, {'row': ['Row must be a JSON object']}
+
+    formdata = MultiDict(
+        (field, '' if row.get(field) is None else str(row[field])) for field in FIELDS
+    )
+    form = FeedbackForm(formdata=formdata, meta={'csrf': False})
+    if not form.validate():
+        errors = {k: v for k, v in form.errors.items() if k != 'submit'}
+        if errors:
+            return None, errors
+
+    values = {field: getattr(form, field).data for field in FIELDS}
+
+    submitted_at = row.get('submitted_at')
+    if submitted_at is not None:
+        try:
+            values['submitted_at'] = parse_timestamp(str(submitted_at))
+        except ValueError:
+            return None, {'submitted_at': ['Must be an ISO 8601 timestamp']}
+    else:
+        values['submitted_at'] = datetime.utcnow()
+
+    return values, {}
+
+
+def insert_rows(rows):
+    """
+    Insert already validated column dicts with one executemany INSERT.
+
+    Keeps the feedback counter and rating rollup in step within the current
+    transaction; the caller commits.
+    """
+    connection = db.session.connection()
+    connection.execute(Feedback.__table__.insert(), rows)
+    adjust_feedback_count(connection, len(rows))
+    record_ratings(connection, ((row['submitted_at'], row['rating']) for row in rows))
+
+
+def bulk_insert(rows, chunk_size=None):
+    """
+    Validate and insert ``rows`` in chunks.
+
+    Args:
+        rows: Iterable of dicts (or MalformedRow placeholders)
+        chunk_size: Rows per INSERT; defaults to ``BULK_INSERT_CHUNK_SIZE``
+
+    Returns:
+        Dict with ``inserted``, ``failed`` and per-row ``errors``
+    """
+    if chunk_size is None:
+        chunk_size = current_app.config.get('BULK_INSERT_CHUNK_SIZE', 1000)
+
+    result = {'inserted': 0, 'failed': 0, 'errors': []}
+    indexed = enumerate(rows)
+
+    while True:
+        chunk = list(islice(indexed, chunk_size))
+        if not chunk:
+            break
+
+        batch = []
+        for index, row in chunk:
+            values, errors = validate_row(row)
+            if errors:
+                result['errors'].append({'row': index, 'errors': errors})
+            else:
+                batch.append((index, values))
+
+        if not batch:
+            continue
+
+        outcome = get_storage().create_many([values for _, values in batch])
+        result['inserted'] += outcome['inserted']
+        for error in outcome['errors']:
+            result['errors'].append({'row': batch[error['index']][0], 'errors': error['errors']})
+
+    result['failed'] = len(result['errors'])
+    return result
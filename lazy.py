@@ -0,0 +1,61 @@
+"""
+Lazily loaded views for fast worker start-up.
+
+With ``LAZY_VIEWS`` enabled the app factory registers the URL rules below
+with placeholder views; ``app.routes`` (and with it the forms, WTForms
+validators and feature modules) is imported on the first request that needs
+it instead of at process start. ``app.routes`` registers ``main_bp`` from
+the same table, so the two cannot drift apart.
+"""
+from flask import Blueprint
+from werkzeug.utils import cached_property, import_string
+
+ROUTES_MODULE = 'app.routes'
+
+# (rule, view function name in app.routes, methods)
+URL_RULES = (
+    ('/', 'index', ['GET']),
+    ('/feedback/submit', 'submit_feedback', ['GET', 'POST']),
+    ('/feedback/queue', 'write_queue_status', ['GET']),
+    ('/feedback/queue/<token>', 'submission_status', ['GET']),
+    ('/feedback/bulk', 'bulk_submit_feedback', ['POST']),
+    ('/feedback/view', 'view_feedback', ['GET']),
+    ('/feedback/search', 'search', ['GET']),
+    ('/feedback/export', 'export_feedback', ['GET']),
+    ('/feedback/stats', 'feedback_stats', ['GET']),
+    ('/feedback/delete', 'bulk_delete_feedback', ['POST']),
+    ('/feedback/delete/<id>', 'delete_feedback', ['POST']),
+    ('/metrics', 'metrics', ['GET']),
+    ('/metrics/pool', 'pool_status', ['GET']),
+)
+
+ERROR_HANDLERS = (
+    (404, 'not_found_error'),
+    (500, 'internal_error'),
+)
+
+
+class LazyView:
+    """View placeholder that imports the real function on first call."""
+
+    def __init__(self, import_name):
+        self.__module__, self.__name__ = import_name.rsplit('.', 1)
+        self.import_name = import_name
+
+    @cached_property
+    def view(self):
+        return import_string(self.import_name)
+
+    def __call__(self, *args, **kwargs):
+        return self.view(*args, **kwargs)
+
+
+def create_lazy_blueprint():
+    """Build a ``main`` blueprint whose views load ``app.routes`` on demand."""
+    blueprint = Blueprint('main', __name__)
+    for rule, name, methods in URL_RULES:
+        blueprint.add_url_rule(rule, endpoint=name, methods=methods,
+                               view_func=LazyView(f'{ROUTES_MODULE}.{name}'))
+    for code, name in ERROR_HANDLERS:
+        blueprint.register_error_handler(code, LazyView(f'{ROUTES_MODULE}.{name}'))
+    return blueprint
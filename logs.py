@@ -0,0 +1,172 @@
+"""
+Structured, non-blocking logging.
+
+Records from ``app.logger`` and the ``app.*`` module loggers are written as
+one JSON object per line. Request threads only put the record on a bounded
+in-memory queue (``QueueHandler``); a ``QueueListener`` thread formats and
+writes it, so a slow or blocked stderr never stalls a request. When the
+queue is full the record is dropped and counted instead of blocking.
+
+Every request gets an id, taken from a well-formed incoming ``X-Request-ID``
+header or generated, which is attached to its log records and echoed in the
+response. SQL statements slower than ``SLOW_QUERY_MS`` are logged with
+probability ``SLOW_QUERY_SAMPLE_RATE``.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, request, has_request_context
+from flask.logging import default_handler
+from app.metrics import observe_queries
+
+_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# LogRecord attributes that are not user supplied ``extra`` fields
+_RECORD_FIELDS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the id of the request that emitted them."""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, on the emitting thread, but
+        # leave formatting to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """Queue listener whose ``stop`` waits for room in a full queue."""
+
+    def enqueue_sentinel(self):
+        # The queue may be full of records still being written; the base
+        # put_nowait would raise queue.Full instead of stopping
+        self.queue.put(self._sentinel)
+
+
+def stop_logging(app):
+    """Stop the app's log listener once it has written every queued record."""
+    listener = app.extensions.pop('log_listener', None)
+    if listener is not None:
+        listener.stop()
+
+
+def configure_logging(app, stream=None):
+    """
+    Route ``app.logger`` through a bounded queue to a JSON stream handler.
+
+    Each app owns its listener (``app.extensions['log_listener']``), so
+    configuring one app leaves the others' logging running.
+
+    Args:
+        app: Flask application
+        stream: Output stream for the listener (defaults to stderr)
+    """
+    logger = app.logger
+    logger.removeHandler(default_handler)
+    for handler in [h for h in logger.handlers if isinstance(h, DroppingQueueHandler)]:
+        logger.removeHandler(handler)
+    stop_logging(app)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JSONFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(app.config.get('LOG_QUEUE_SIZE', 10000)))
+    handler.addFilter(RequestIdFilter())
+    logger.addHandler(handler)
+    logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    logger.propagate = False
+
+    listener = DrainingQueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    app.extensions['log_listener'] = listener
+    app.extensions['log_handler'] = handler
+    atexit.register(stop_logging, app)
+    return handler
+
+
+def _assign_request_id():
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+
+def _echo_request_id(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+def instrument_logging(app, engine):
+    """Install request id propagation and sampled slow-query logging."""
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
+
+    threshold = app.config.get('SLOW_QUERY_MS')
+    if threshold is None:
+        return
+    sample_rate = app.config.get('SLOW_QUERY_SAMPLE_RATE', 1.0)
+
+    def query_finished(statement, executemany, elapsed):
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= threshold and random.random() < sample_rate:
+            app.logger.warning('Slow query', extra={
+                'duration_ms': round(elapsed_ms, 3),
+                'statement': statement[:1000],
+                'executemany': executemany,
+            })
+
+    observe_queries(engine, query_finished)
@@ -0,0 +1,239 @@
+"""
+Request, SQL and template instrumentation.
+
+Each request records its wall time, the number and total time of the SQL
+statements it executed (engine cursor events) and the time spent rendering
+templates (Flask template signals). The totals are
+
+* added to per-endpoint histograms exposed in the Prometheus text format
+  at ``/metrics``, and
+* returned to the client as a ``Server-Timing`` header
+  (``app``, ``db`` and ``tpl`` entries) when ``SERVER_TIMING`` is on.
+
+Series are kept per process; with several gunicorn workers each worker
+reports its own counts, so scrape them through a per-worker port or sum
+them in the dashboard.
+"""
+import bisect
+import threading
+import time
+import weakref
+
+from flask import (g, request, current_app, has_app_context, template_rendered,
+                   before_render_template)
+from app import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Per engine: callbacks run after each statement with its duration
+_query_observers = weakref.WeakKeyDictionary()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Cumulative histogram with labels."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One slot per bucket plus +Inf, then the sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labelnames + ('le',), labels + (bound,)), cumulative)
+            yield f'{self.name}_sum', _format_labels(self.labelnames, labels), series[-1]
+            yield f'{self.name}_count', _format_labels(self.labelnames, labels), cumulative
+
+
+class RequestMetrics:
+    """The application's metric families."""
+
+    def __init__(self):
+        self.requests = Counter(
+            'feedback_http_requests_total', 'HTTP requests by endpoint, method and status.',
+            ('endpoint', 'method', 'status'))
+        self.latency = Histogram(
+            'feedback_http_request_duration_seconds', 'Request wall time by endpoint.',
+            ('endpoint', 'method'))
+        self.sql_queries = Histogram(
+            'feedback_http_request_sql_queries', 'SQL statements executed per request.',
+            ('endpoint',), buckets=QUERY_COUNT_BUCKETS)
+        self.sql_time = Histogram(
+            'feedback_http_request_sql_duration_seconds', 'Time in SQL statements per request.',
+            ('endpoint',))
+        self.template_time = Histogram(
+            'feedback_template_render_seconds', 'Template render time by template.',
+            ('template',))
+        self.families = (self.requests, self.latency, self.sql_queries,
+                         self.sql_time, self.template_time)
+
+
+def _timing():
+    return g.get('_request_timing')
+
+
+def _before_request():
+    g._request_timing = {'start': time.perf_counter(), 'sql_count': 0,
+                         'sql_time': 0.0, 'template_time': 0.0, 'templates': []}
+
+
+def _after_request(response):
+    timing = _timing()
+    if timing is None:
+        return response
+
+    elapsed = time.perf_counter() - timing['start']
+    metrics = current_app.extensions['request_metrics']
+    endpoint = request.endpoint or 'unmatched'
+    metrics.requests.inc((endpoint, request.method, str(response.status_code)))
+    metrics.latency.observe((endpoint, request.method), elapsed)
+    metrics.sql_queries.observe((endpoint,), timing['sql_count'])
+    metrics.sql_time.observe((endpoint,), timing['sql_time'])
+
+    if current_app.config.get('SERVER_TIMING', True):
+        response.headers['Server-Timing'] = ', '.join((
+            f"app;dur={elapsed * 1000:.1f}",
+            f"db;dur={timing['sql_time'] * 1000:.1f};desc=\"{timing['sql_count']} queries\"",
+            f"tpl;dur={timing['template_time'] * 1000:.1f}",
+        ))
+    return response
+
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    # The start lives on the statement's execution context, which is
+    # discarded with it when the statement fails; internal statements run
+    # without a context (e.g. sequence pre-execution) are not timed
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    elapsed = time.perf_counter() - context._query_start
+    for observer in _query_observers.get(conn.engine, ()):
+        observer(statement, executemany, elapsed)
+
+
+def observe_queries(engine, observer):
+    """
+    Call ``observer(statement, executemany, elapsed)`` after every statement
+    on ``engine``; all observers share one pair of cursor event listeners.
+    """
+    if engine not in _query_observers:
+        _query_observers[engine] = []
+        db.event.listen(engine, 'before_cursor_execute', _query_started)
+        db.event.listen(engine, 'after_cursor_execute', _query_finished)
+    _query_observers[engine].append(observer)
+
+
+def _record_query(statement, executemany, elapsed):
+    # Statements from background threads run outside any request
+    timing = _timing() if has_app_context() else None
+    if timing is not None:
+        timing['sql_count'] += 1
+        timing['sql_time'] += elapsed
+
+
+def _template_starting(app, template, context):
+    timing = _timing()
+    if timing is not None:
+        timing['templates'].append(time.perf_counter())
+
+
+def _template_finished(app, template, context):
+    timing = _timing()
+    if timing is not None and timing['templates']:
+        elapsed = time.perf_counter() - timing['templates'].pop()
+        # Nested render_template calls are counted once, at the outermost level
+        if not timing['templates']:
+            timing['template_time'] += elapsed
+        app.extensions['request_metrics'].template_time.observe(
+            (template.name or 'string',), elapsed)
+
+
+def instrument_app(app, engine):
+    """Install request, SQL and template timing hooks on ``app``."""
+    app.extensions['request_metrics'] = RequestMetrics()
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    observe_queries(engine, _record_query)
+    before_render_template.connect(_template_starting, app)
+    template_rendered.connect(_template_finished, app)
+
+
+def render_metrics():
+    """Return all metric families in the Prometheus text exposition format."""
+    from app.pool import pool_metrics
+
+    lines = []
+    for family in current_app.extensions['request_metrics'].families:
+        lines.append(f'# HELP {family.name} {family.help}')
+        lines.append(f'# TYPE {family.name} {family.type}')
+        lines.extend(f'{name}{labels} {value}' for name, labels, value in family.samples())
+
+    handler = current_app.extensions.get('log_handler')
+    if handler is not None:
+        lines.append('# HELP feedback_log_records_dropped_total Log records dropped on a full queue.')
+        lines.append('# TYPE feedback_log_records_dropped_total counter')
+        lines.append(f'feedback_log_records_dropped_total {handler.dropped}')
+
+    pool = pool_metrics()
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if name in pool:
+            lines.append(f'# TYPE feedback_db_pool_{name} gauge')
+            lines.append(f'feedback_db_pool_{name} {pool[name]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,40 @@
+"""add indexes on feedback hot columns
+
+Revision ID: 12f37c70acc7
+Revises: 36006c423bf0
+Create Date: 2026-10-18 09:30:00.000000
+
+``(submitted_at, id)`` serves the newest-first listings (offset and keyset)
+and any ``submitted_at`` range filter, so no separate single-column
+``submitted_at`` index is created. On PostgreSQL the indexes are built
+``CONCURRENTLY`` so the table stays writable during the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '12f37c70acc7'
+down_revision = '36006c423bf0'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_feedback_submitted_at_id', ['submitted_at', 'id']),
+    ('ix_feedback_email', ['email']),
+    ('ix_feedback_rating', ['rating']),
+)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'feedback', columns, unique=False,
+                            if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='feedback',
+                          if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,51 @@
+"""initial schema
+
+Revision ID: 36006c423bf0
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+Databases created by ``db.create_all()`` before migrations were introduced
+already have these tables; mark them with ``flask db stamp 36006c423bf0``
+and then run ``flask db upgrade``.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '36006c423bf0'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'feedback',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('feedback_text', sa.Text(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=True),
+        sa.Column('submitted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'feedback_counter',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table(
+        'feedback_rating_rollup',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('rating', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'rating')
+    )
+
+
+def downgrade():
+    op.drop_table('feedback_rating_rollup')
+    op.drop_table('feedback_counter')
+    op.drop_table('feedback')
@@ -0,0 +1,32 @@
+"""add feedback.dedup_hash for duplicate detection
+
+Revision ID: 5b0e9f7d2c41
+Revises: 8cacf5756ca3
+Create Date: 2026-10-18 11:45:00.000000
+
+Existing rows keep a NULL hash (NULLs never collide in a unique index), so
+only submissions made after the upgrade are deduplicated.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b0e9f7d2c41'
+down_revision = '8cacf5756ca3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('feedback', sa.Column('dedup_hash', sa.String(length=64), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_feedback_dedup_hash', 'feedback', ['dedup_hash'], unique=True,
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_feedback_dedup_hash', table_name='feedback',
+                      if_exists=True, postgresql_concurrently=True)
+    op.drop_column('feedback', 'dedup_hash')
@@ -0,0 +1,33 @@
+"""add feedback.deleted_at for soft deletion
+
+Revision ID: 8cacf5756ca3
+Revises: 8d2e4b61f0a3
+Create Date: 2026-10-18 11:00:00.000000
+
+The column is nullable with no default, so adding it does not rewrite the
+table. Its index (built CONCURRENTLY on PostgreSQL) serves the purge job.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8cacf5756ca3'
+down_revision = '8d2e4b61f0a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('feedback', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index('ix_feedback_deleted_at', 'feedback', ['deleted_at'], unique=False,
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_feedback_deleted_at', table_name='feedback',
+                      if_exists=True, postgresql_concurrently=True)
+    # Native DROP COLUMN (SQLite 3.35+) keeps the FTS triggers on the table
+    op.drop_column('feedback', 'deleted_at')
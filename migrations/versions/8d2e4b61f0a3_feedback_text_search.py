@@ -0,0 +1,64 @@
+"""add full-text search over feedback_text
+
+Revision ID: 8d2e4b61f0a3
+Revises: 12f37c70acc7
+Create Date: 2026-10-18 10:15:00.000000
+
+PostgreSQL gets a GIN expression index on the english tsvector of
+feedback_text (built CONCURRENTLY). SQLite gets an external content FTS5
+table kept in sync by triggers and rebuilt from the existing rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b61f0a3'
+down_revision = '12f37c70acc7'
+branch_labels = None
+depends_on = None
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5("
+    "feedback_text, content='feedback', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_ai AFTER INSERT ON feedback BEGIN "
+    "INSERT INTO feedback_fts(rowid, feedback_text) VALUES (new.id, new.feedback_text); END",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_ad AFTER DELETE ON feedback BEGIN "
+    "INSERT INTO feedback_fts(feedback_fts, rowid, feedback_text) "
+    "VALUES ('delete', old.id, old.feedback_text); END",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_au AFTER UPDATE OF feedback_text ON feedback BEGIN "
+    "INSERT INTO feedback_fts(feedback_fts, rowid, feedback_text) "
+    "VALUES ('delete', old.id, old.feedback_text); "
+    "INSERT INTO feedback_fts(rowid, feedback_text) VALUES (new.id, new.feedback_text); END",
+    "INSERT INTO feedback_fts(feedback_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS feedback_fts_au",
+    "DROP TRIGGER IF EXISTS feedback_fts_ad",
+    "DROP TRIGGER IF EXISTS feedback_fts_ai",
+    "DROP TABLE IF EXISTS feedback_fts",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_feedback_text_search "
+                "ON feedback USING gin (to_tsvector('english', feedback_text))"
+            )
+    elif dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_feedback_text_search")
+    elif dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
@@ -0,0 +1,40 @@
+"""index only soft-deleted feedback rows
+
+Revision ID: c4a1e7d93b52
+Revises: 5b0e9f7d2c41
+Create Date: 2026-10-18 15:30:00.000000
+
+With a full index on deleted_at, SQLite serves the listings' implied
+``deleted_at IS NULL`` from it and sorts every visible row instead of
+walking ix_feedback_submitted_at_id. A partial index over the deleted rows
+still serves the purge job and leaves listings on the (submitted_at, id)
+index. MySQL has no partial indexes and keeps the full one.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a1e7d93b52'
+down_revision = '5b0e9f7d2c41'
+branch_labels = None
+depends_on = None
+
+DELETED = sa.text('deleted_at IS NOT NULL')
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_feedback_deleted_at', table_name='feedback',
+                      if_exists=True, postgresql_concurrently=True)
+        op.create_index('ix_feedback_deleted_at', 'feedback', ['deleted_at'], unique=False,
+                        if_not_exists=True, postgresql_concurrently=True,
+                        postgresql_where=DELETED, sqlite_where=DELETED)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_feedback_deleted_at', table_name='feedback',
+                      if_exists=True, postgresql_concurrently=True)
+        op.create_index('ix_feedback_deleted_at', 'feedback', ['deleted_at'], unique=False,
+                        if_not_exists=True, postgresql_concurrently=True)
@@ -3,32 +3,58 @@ Database models for the Feedback Application.
 """
 from app import db
 from datetime import datetime
+from sqlalchemy.orm import Session, with_loader_criteria
+
+# Text search configuration baked into the PostgreSQL full-text index
+TEXT_SEARCH_CONFIG = 'english'
 
 class Feedback(db.Model):
     """Feedback model for storing user feedback."""
 
     __tablename__ = 'feedback'
+    __table_args__ = (
+        # Newest-first listings (offset and keyset) and submitted_at ranges
+        db.Index('ix_feedback_submitted_at_id', 'submitted_at', 'id'),
+        # Purge job only: partial, so listings filtering deleted_at IS NULL
+        # are not planned through it on SQLite
+        db.Index('ix_feedback_deleted_at', 'deleted_at',
+                 postgresql_where=db.text('deleted_at IS NOT NULL'),
+                 sqlite_where=db.text('deleted_at IS NOT NULL')),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120), nullable=False)
+    email = db.Column(db.String(120), nullable=False, index=True)
     feedback_text = db.Column(db.Text, nullable=False)
-    rating = db.Column(db.Integer, nullable=True)  # 1-5 star rating
+    rating = db.Column(db.Integer, nullable=True, index=True)  # 1-5 star rating
     submitted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Set by moderation; hidden rows are hard-deleted later by the purge job
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    # Normalized content digest plus DEDUP_WINDOW bucket (see app.dedup)
+    dedup_hash = db.Column(db.String(64), nullable=True, index=True, unique=True)
 
     def __repr__(self):
         return f'<Feedback {self.id}: {self.name}>'
 
-    def to_dict(self):
-        """Convert feedback to dictionary."""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'feedback_text': self.feedback_text,
-            'rating': self.rating,
-            'submitted_at': self.submitted_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+    # Fields exposed by to_dict, in output order
+    FIELDS = ('id', 'name', 'email', 'feedback_text', 'rating', 'submitted_at')
+
+    def to_dict(self, fields=None):
+        """
+        Convert feedback to dictionary.
+
+        Args:
+            fields: Subset of FIELDS to include (default: all). Only these
+                attributes are read, so rows loaded with ``load_only`` are
+                serialized without extra queries.
+        """
+        data = {}
+        for field in fields or self.FIELDS:
+            value = getattr(self, field)
+            if field == 'submitted_at':
+                value = value.strftime('%Y-%m-%d %H:%M:%S')
+            data[field] = value
+        return data
 
     @staticmethod
     def validate_rating(rating):
@@ -36,3 +62,77 @@ class Feedback(db.Model):
         if rating is not None:
             return 1 <= rating <= 5
         return True
+
+
+@db.event.listens_for(Session, 'do_orm_execute')
+def _hide_deleted_feedback(execute_state):
+    """
+    Filter soft-deleted feedback out of every ORM query.
+
+    Pass ``execution_options(include_deleted=True)`` to see deleted rows.
+    """
+    if (execute_state.is_select
+            and not execute_state.is_column_load
+            and not execute_state.is_relationship_load
+            and not execute_state.execution_options.get('include_deleted', False)):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(Feedback, Feedback.deleted_at.is_(None), include_aliases=True)
+        )
+
+
+# Full-text search structures over feedback_text. SQLite keeps an external
+# content FTS5 table in sync through triggers; PostgreSQL uses a GIN
+# expression index, which the database maintains on every write.
+_SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5("
+    "feedback_text, content='feedback', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_ai AFTER INSERT ON feedback BEGIN "
+    "INSERT INTO feedback_fts(rowid, feedback_text) VALUES (new.id, new.feedback_text); END",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_ad AFTER DELETE ON feedback BEGIN "
+    "INSERT INTO feedback_fts(feedback_fts, rowid, feedback_text) "
+    "VALUES ('delete', old.id, old.feedback_text); END",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_au AFTER UPDATE OF feedback_text ON feedback BEGIN "
+    "INSERT INTO feedback_fts(feedback_fts, rowid, feedback_text) "
+    "VALUES ('delete', old.id, old.feedback_text); "
+    "INSERT INTO feedback_fts(rowid, feedback_text) VALUES (new.id, new.feedback_text); END",
+)
+
+_POSTGRES_FTS_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_feedback_text_search ON feedback "
+    f"USING gin (to_tsvector('{TEXT_SEARCH_CONFIG}', feedback_text))",
+)
+
+for _statement in _SQLITE_FTS_DDL:
+    db.event.listen(Feedback.__table__, 'after_create',
+                    db.DDL(_statement).execute_if(dialect='sqlite'))
+db.event.listen(Feedback.__table__, 'before_drop',
+                db.DDL('DROP TABLE IF EXISTS feedback_fts').execute_if(dialect='sqlite'))
+
+for _statement in _POSTGRES_FTS_DDL:
+    db.event.listen(Feedback.__table__, 'after_create',
+                    db.DDL(_statement).execute_if(dialect='postgresql'))
+
+
+class FeedbackCounter(db.Model):
+    """Summary table holding maintained row counts (one row per counter)."""
+
+    __tablename__ = 'feedback_counter'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<FeedbackCounter {self.name}={self.value}>'
+
+
+class FeedbackRatingRollup(db.Model):
+    """Per-day rating histogram, maintained incrementally (rating 0 = unrated)."""
+
+    __tablename__ = 'feedback_rating_rollup'
+
+    day = db.Column(db.Date, primary_key=True)
+    rating = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<FeedbackRatingRollup {self.day} rating={self.rating}: {self.count}>'
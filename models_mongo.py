@@ -2,49 +2,356 @@
 MongoDB models using PyMongo (Alternative to SQLAlchemy).
 To use this, install: pip install pymongo flask-pymongo
 """
+import time
+
+from flask import current_app
 from flask_pymongo import PyMongo
+from pymongo import ASCENDING, DESCENDING, IndexModel, DeleteOne
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
 from datetime import datetime
 from bson import ObjectId
+from bson.errors import InvalidId
+
+from app.pagination import InvalidCursor, encode_cursor, decode_cursor
 
 mongo = PyMongo()
 
+# Newest first, with _id breaking ties between equal timestamps
+PAGE_ORDER = [('submitted_at', DESCENDING), ('_id', DESCENDING)]
+
+INDEXES = [
+    IndexModel(PAGE_ORDER, name='submitted_at_id'),
+    IndexModel([('email', ASCENDING)], name='email'),
+    IndexModel([('rating', ASCENDING)], name='rating'),
+    # Rejects a repeated submission within DEDUP_WINDOW, as the SQL unique index does
+    IndexModel([('dedup_hash', ASCENDING)], name='dedup_hash', unique=True, sparse=True),
+]
+
+DUPLICATE_KEY = 11000
+
+# Maintained total for MONGO_COUNT_STRATEGY=counter, and a generation
+# number bumped by every write (keys page caches and ETags across workers)
+COUNTERS_COLLECTION = 'counters'
+FEEDBACK_COUNTER = 'feedback'
+FEEDBACK_GENERATION = 'generation'
+COUNT_STRATEGIES = ('exact', 'estimated', 'counter')
+
+
+def _object_id(value):
+    """Cursor id codec for ``decode_cursor``: the string form of an ObjectId."""
+    try:
+        return ObjectId(value)
+    except InvalidId as e:
+        raise ValueError(str(e)) from e
+
+
+def keyset_query(after=None):
+    """Filter for the documents that follow cursor ``after`` in PAGE_ORDER."""
+    if not after:
+        return {}
+    submitted_at, feedback_id = decode_cursor(after, parse_id=_object_id)
+    return {'$or': [
+        {'submitted_at': {'$lt': submitted_at}},
+        {'submitted_at': submitted_at, '_id': {'$lt': feedback_id}},
+    ]}
+
+
+def _bulk_options(batch_size, write_concern):
+    """Resolve the bulk batch size and WriteConcern, defaulting to the app config."""
+    config = current_app.config
+    if batch_size is None:
+        batch_size = config.get('MONGO_BULK_BATCH_SIZE', 1000)
+    if write_concern is None:
+        write_concern = config.get('MONGO_WRITE_CONCERN', 1)
+    if not isinstance(write_concern, WriteConcern):
+        if isinstance(write_concern, str) and write_concern.isdigit():
+            write_concern = int(write_concern)
+        write_concern = WriteConcern(w=write_concern)
+    return max(1, batch_size), write_concern
+
+
+def _bulk_collection(batch_size, write_concern):
+    """Return the collection with the bulk write concern, and the batch size."""
+    batch_size, write_concern = _bulk_options(batch_size, write_concern)
+    collection = mongo.db[FeedbackMongo.collection_name].with_options(write_concern=write_concern)
+    return collection, batch_size
+
+
+def _write_errors(error, offset):
+    """Per-document errors of a BulkWriteError, indexed into the whole input."""
+    return [{'index': offset + e['index'], 'code': e.get('code'), 'message': e.get('errmsg')}
+            for e in error.details.get('writeErrors', [])]
+
+
+def _delete_operations(feedback_ids):
+    """Return ``(index, DeleteOne)`` pairs for ``feedback_ids`` and errors for malformed ones."""
+    operations, errors = [], []
+    for index, feedback_id in enumerate(feedback_ids):
+        try:
+            operations.append((index, DeleteOne({'_id': ObjectId(feedback_id)})))
+        except (InvalidId, TypeError):
+            errors.append({'index': index, 'code': None,
+                           'message': f'Invalid id: {feedback_id!r}'})
+    return operations, errors
+
+
+def _projection(fields):
+    # The cursor needs submitted_at; _id is always returned
+    if not fields:
+        return None
+    return dict.fromkeys(set(fields) - {'id'} | {'submitted_at'}, 1)
+
+
+def _count_strategy():
+    strategy = current_app.config.get('MONGO_COUNT_STRATEGY', 'estimated')
+    if strategy not in COUNT_STRATEGIES:
+        raise ValueError(f'Unknown MONGO_COUNT_STRATEGY: {strategy!r}')
+    return strategy
+
+
+def _count_cache():
+    return current_app.extensions.setdefault('mongo_feedback_count', {})
+
+
+def _adjust_count(delta):
+    """Bump the generation, record ``delta`` in the counter and drop the cached total."""
+    if not delta:
+        return
+    _count_cache().clear()
+    mongo.db[COUNTERS_COLLECTION].update_one(
+        {'_id': FEEDBACK_GENERATION}, {'$inc': {'value': 1}}, upsert=True)
+    if _count_strategy() == 'counter':
+        result = mongo.db[COUNTERS_COLLECTION].update_one(
+            {'_id': FEEDBACK_COUNTER}, {'$inc': {'value': delta}})
+        if not result.matched_count:
+            # No counter yet (e.g. the strategy was just switched): seed it from
+            # a full count, which already includes this write
+            FeedbackMongo.sync_count()
+
+
+def init_mongo(app):
+    """
+    Connect ``mongo`` to ``app`` and, unless MONGO_ENSURE_INDEXES is off,
+    create the collection's indexes (a no-op when they already exist).
+    """
+    from config_mongo import MongoConfig
+
+    app.config.setdefault('MONGO_URI', MongoConfig.MONGO_URI)
+    app.config.setdefault('MONGO_ENSURE_INDEXES', MongoConfig.MONGO_ENSURE_INDEXES)
+    app.config.setdefault('MONGO_BULK_BATCH_SIZE', MongoConfig.MONGO_BULK_BATCH_SIZE)
+    app.config.setdefault('MONGO_WRITE_CONCERN', MongoConfig.MONGO_WRITE_CONCERN)
+    app.config.setdefault('MONGO_COUNT_STRATEGY', MongoConfig.MONGO_COUNT_STRATEGY)
+    # flask-pymongo swaps in a BSON JSON provider that drops the object_hook
+    # the session serializer needs, which breaks flash(); views only emit
+    # FeedbackDocument.to_dict() values, so keep the app's provider
+    json_provider = app.json
+    mongo.init_app(app)
+    app.json = json_provider
+    if app.config['MONGO_ENSURE_INDEXES']:
+        FeedbackMongo.ensure_indexes()
+
+
 class FeedbackMongo:
     """Feedback operations for MongoDB."""
 
     collection_name = 'feedback'
 
     @staticmethod
-    def create(name, email, feedback_text, rating=None):
-        """Create a new feedback entry."""
+    def ensure_indexes():
+        """Create the listing and lookup indexes; returns their names."""
+        return mongo.db[FeedbackMongo.collection_name].create_indexes(INDEXES)
+
+    @staticmethod
+    def create(name, email, feedback_text, rating=None, submitted_at=None, dedup_hash=None):
+        """
+        Create a new feedback entry.
+
+        Raises:
+            DuplicateKeyError: If ``dedup_hash`` is already stored
+        """
         feedback = {
             'name': name,
             'email': email,
             'feedback_text': feedback_text,
             'rating': rating,
-            'submitted_at': datetime.utcnow()
+            'submitted_at': submitted_at or datetime.utcnow()
         }
+        if dedup_hash is not None:
+            feedback['dedup_hash'] = dedup_hash
         result = mongo.db[FeedbackMongo.collection_name].insert_one(feedback)
+        _adjust_count(1)
         return result.inserted_id
 
+    @staticmethod
+    def create_many(documents, batch_size=None, write_concern=None):
+        """
+        Insert feedback documents with one unordered ``insert_many`` per batch.
+
+        A failing document (e.g. a duplicate ``dedup_hash``) is reported and
+        does not stop the others.
+
+        Args:
+            documents: List of feedback dicts; ``submitted_at`` defaults to now
+            batch_size: Documents per request (defaults to MONGO_BULK_BATCH_SIZE)
+            write_concern: ``w`` value or WriteConcern (defaults to MONGO_WRITE_CONCERN)
+
+        Returns:
+            Dict with ``inserted`` and per-document ``errors`` (``index`` into
+            ``documents``, server ``code`` and ``message``)
+        """
+        collection, batch_size = _bulk_collection(batch_size, write_concern)
+        result = {'inserted': 0, 'errors': []}
+        for offset in range(0, len(documents), batch_size):
+            batch = [dict(document) for document in documents[offset:offset + batch_size]]
+            for document in batch:
+                document.setdefault('submitted_at', datetime.utcnow())
+            try:
+                collection.insert_many(batch, ordered=False)
+                result['inserted'] += len(batch)
+            except BulkWriteError as e:
+                result['inserted'] += e.details.get('nInserted', 0)
+                result['errors'].extend(_write_errors(e, offset))
+        _adjust_count(result['inserted'])
+        return result
+
     @staticmethod
     def find_all(page=1, per_page=10):
-        """Get all feedback with pagination."""
+        """
+        Get all feedback with pagination.
+
+        Deep pages make the server walk and discard ``skip`` documents; use
+        :meth:`find_page` to page through large collections.
+        """
         skip = (page - 1) * per_page
         feedbacks = mongo.db[FeedbackMongo.collection_name].find().sort('submitted_at', -1).skip(skip).limit(per_page)
         return list(feedbacks)
 
     @staticmethod
-    def find_by_id(feedback_id):
+    def find_page(after=None, per_page=10, fields=None):
+        """
+        Get one page of feedback, newest first, starting after a cursor.
+
+        The page is a range scan of the ``(submitted_at, _id)`` index, so it
+        costs the same at any depth.
+
+        Args:
+            after: Cursor returned with the previous page, or None for the first
+            per_page: Documents per page
+            fields: Only return these fields (and ``_id``, ``submitted_at``)
+
+        Returns:
+            Tuple of (documents, cursor for the next page or None)
+
+        Raises:
+            InvalidCursor: If ``after`` is malformed
+        """
+        # One extra document tells whether another page follows
+        feedbacks = list(mongo.db[FeedbackMongo.collection_name]
+                         .find(keyset_query(after), _projection(fields))
+                         .sort(PAGE_ORDER).limit(per_page + 1))
+        if len(feedbacks) <= per_page:
+            return feedbacks, None
+        feedbacks = feedbacks[:per_page]
+        last = feedbacks[-1]
+        return feedbacks, encode_cursor(last['submitted_at'], last['_id'])
+
+    @staticmethod
+    def find_by_id(feedback_id, fields=None):
         """Find feedback by ID."""
-        return mongo.db[FeedbackMongo.collection_name].find_one({'_id': ObjectId(feedback_id)})
+        return mongo.db[FeedbackMongo.collection_name].find_one({'_id': ObjectId(feedback_id)},
+                                                                _projection(fields))
 
     @staticmethod
     def delete(feedback_id):
         """Delete feedback by ID."""
         result = mongo.db[FeedbackMongo.collection_name].delete_one({'_id': ObjectId(feedback_id)})
+        _adjust_count(-result.deleted_count)
         return result.deleted_count > 0
 
+    @staticmethod
+    def delete_many(feedback_ids, batch_size=None, write_concern=None):
+        """
+        Delete feedback by ID with one unordered ``bulk_write`` per batch.
+
+        Returns:
+            Dict with ``deleted`` and per-ID ``errors`` (``index`` into
+            ``feedback_ids``, ``code`` and ``message``); malformed IDs are
+            reported without a ``code``
+        """
+        collection, batch_size = _bulk_collection(batch_size, write_concern)
+        operations, errors = _delete_operations(feedback_ids)
+        result = {'deleted': 0, 'errors': errors}
+        for start in range(0, len(operations), batch_size):
+            batch = operations[start:start + batch_size]
+            try:
+                outcome = collection.bulk_write([op for _, op in batch], ordered=False)
+                if outcome.acknowledged:
+                    result['deleted'] += outcome.deleted_count
+            except BulkWriteError as e:
+                result['deleted'] += e.details.get('nRemoved', 0)
+                result['errors'].extend(
+                    dict(error, index=batch[error['index']][0])
+                    for error in _write_errors(e, 0))
+        _adjust_count(-result['deleted'])
+        return result
+
+    @staticmethod
+    def delete_matching(query):
+        """Delete every document matching ``query`` in one request; returns the count."""
+        result = mongo.db[FeedbackMongo.collection_name].delete_many(query)
+        _adjust_count(-result.deleted_count)
+        return result.deleted_count
+
+    @staticmethod
+    def has_dedup_hash(hashes, since):
+        """Return True when a document with one of ``hashes`` was stored since ``since``."""
+        return mongo.db[FeedbackMongo.collection_name].find_one(
+            {'dedup_hash': {'$in': list(hashes)}, 'submitted_at': {'$gte': since}},
+            {'_id': 1}) is not None
+
     @staticmethod
     def count():
-        """Count total feedback entries."""
-        return mongo.db[FeedbackMongo.collection_name].count_documents({})
+        """
+        Count total feedback entries, by MONGO_COUNT_STRATEGY:
+
+            exact      ``count_documents({})``, a scan of the collection
+            estimated  ``estimated_document_count()`` from collection metadata
+            counter    the counter document kept by this class's writes
+
+        The value is cached in-process for FEEDBACK_COUNT_MAX_AGE seconds.
+        """
+        cache = _count_cache()
+        max_age = current_app.config.get('FEEDBACK_COUNT_MAX_AGE', 5)
+        now = time.monotonic()
+        if 'value' in cache and now - cache['fetched_at'] < max_age:
+            return cache['value']
+
+        strategy = _count_strategy()
+        collection = mongo.db[FeedbackMongo.collection_name]
+        if strategy == 'estimated':
+            value = collection.estimated_document_count()
+        elif strategy == 'counter':
+            counter = mongo.db[COUNTERS_COLLECTION].find_one({'_id': FEEDBACK_COUNTER})
+            value = counter['value'] if counter else FeedbackMongo.sync_count()
+        else:
+            value = collection.count_documents({})
+
+        cache['value'] = value
+        cache['fetched_at'] = now
+        return value
+
+    @staticmethod
+    def generation():
+        """Return the number bumped by every write through this class."""
+        document = mongo.db[COUNTERS_COLLECTION].find_one({'_id': FEEDBACK_GENERATION})
+        return document['value'] if document else 0
+
+    @staticmethod
+    def sync_count():
+        """Reset the counter document from a full count; returns the total."""
+        total = mongo.db[FeedbackMongo.collection_name].count_documents({})
+        mongo.db[COUNTERS_COLLECTION].update_one(
+            {'_id': FEEDBACK_COUNTER}, {'$set': {'value': total}}, upsert=True)
+        _count_cache().clear()
+        return total
@@ -0,0 +1,300 @@
+"""
+Asyncio MongoDB operations for async views (PyMongo's AsyncMongoClient).
+To use this, install: pip install "pymongo>=4.13" flask-pymongo "flask[async]"
+
+``AsyncFeedbackMongo`` mirrors ``FeedbackMongo`` with coroutines:
+
+    @main_bp.route('/api/feedback/<feedback_id>')
+    async def feedback_json(feedback_id):
+        document = await AsyncFeedbackMongo.find_by_id(feedback_id)
+        ...
+
+Flask runs every async view in a new event loop, while an AsyncMongoClient
+belongs to the loop that first uses it. The client therefore lives on one
+``MongoLoop`` thread per process and views await its results, so every
+request shares one connection pool of MONGO_ASYNC_POOL_SIZE. Bulk writes
+send their batches concurrently instead of one after another.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from flask import current_app
+from pymongo.errors import BulkWriteError
+
+from app.models_mongo import (FeedbackMongo, INDEXES, PAGE_ORDER, COUNTERS_COLLECTION,
+                              FEEDBACK_COUNTER, FEEDBACK_GENERATION, keyset_query,
+                              encode_cursor, _bulk_options, _delete_operations, _write_errors,
+                              _count_strategy, _count_cache)
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # pymongo < 4.13
+    AsyncMongoClient = None
+
+_start_lock = threading.Lock()
+
+
+class MongoLoop(threading.Thread):
+    """Daemon thread running the event loop that owns the AsyncMongoClient."""
+
+    def __init__(self, app):
+        if AsyncMongoClient is None:
+            raise RuntimeError('Async MongoDB access requires: pip install "pymongo>=4.13"')
+        super().__init__(name='feedback-mongo-async', daemon=True)
+        from config_mongo import MongoConfig
+
+        self.loop = asyncio.new_event_loop()
+        self.client = AsyncMongoClient(
+            app.config.get('MONGO_URI', MongoConfig.MONGO_URI),
+            maxPoolSize=app.config.get('MONGO_ASYNC_POOL_SIZE', MongoConfig.MONGO_ASYNC_POOL_SIZE))
+        self.db = self.client.get_default_database()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def call(self, operation):
+        """Await ``operation(db)`` on this loop, from any event loop."""
+        if asyncio.get_running_loop() is self.loop:
+            return await operation(self.db)
+        future = asyncio.run_coroutine_threadsafe(operation(self.db), self.loop)
+        return await asyncio.wrap_future(future)
+
+    def stop(self, timeout=5):
+        """Close the client and stop the loop."""
+        if self.is_alive():
+            asyncio.run_coroutine_threadsafe(self.client.close(), self.loop).result(timeout)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.join(timeout)
+
+
+def get_mongo_loop(app=None):
+    """Return the app's MongoLoop, starting it on first use (once per process)."""
+    app = app or current_app._get_current_object()
+    with _start_lock:
+        runner = app.extensions.get('mongo_async')
+        if runner is None or not runner.is_alive():
+            runner = MongoLoop(app)
+            app.extensions['mongo_async'] = runner
+            runner.start()
+    return runner
+
+
+async def _on_mongo_loop(operation):
+    return await get_mongo_loop().call(operation)
+
+
+async def _adjust_count(db, delta, counted):
+    """Bump the generation and, under the counter strategy, record ``delta``."""
+    if not delta:
+        return
+    await db[COUNTERS_COLLECTION].update_one(
+        {'_id': FEEDBACK_GENERATION}, {'$inc': {'value': 1}}, upsert=True)
+    if counted:
+        result = await db[COUNTERS_COLLECTION].update_one(
+            {'_id': FEEDBACK_COUNTER}, {'$inc': {'value': delta}})
+        if not result.matched_count:
+            # No counter yet: seed it from a full count, which includes this write
+            await _sync_count(db)
+
+
+async def _sync_count(db):
+    """Reset the counter document from a full count; returns the total."""
+    total = await db[AsyncFeedbackMongo.collection_name].count_documents({})
+    await db[COUNTERS_COLLECTION].update_one(
+        {'_id': FEEDBACK_COUNTER}, {'$set': {'value': total}}, upsert=True)
+    return total
+
+
+class AsyncFeedbackMongo:
+    """Feedback operations for MongoDB, as coroutines."""
+
+    collection_name = FeedbackMongo.collection_name
+
+    @staticmethod
+    async def ensure_indexes():
+        """Create the listing and lookup indexes; returns their names."""
+        async def operation(db):
+            return await db[AsyncFeedbackMongo.collection_name].create_indexes(INDEXES)
+        return await _on_mongo_loop(operation)
+
+    @staticmethod
+    async def create(name, email, feedback_text, rating=None, submitted_at=None, dedup_hash=None):
+        """
+        Create a new feedback entry.
+
+        Raises:
+            DuplicateKeyError: If ``dedup_hash`` is already stored
+        """
+        feedback = {
+            'name': name,
+            'email': email,
+            'feedback_text': feedback_text,
+            'rating': rating,
+            'submitted_at': submitted_at or datetime.utcnow()
+        }
+        if dedup_hash is not None:
+            feedback['dedup_hash'] = dedup_hash
+        counted = _count_strategy() == 'counter'
+
+        async def operation(db):
+            result = await db[AsyncFeedbackMongo.collection_name].insert_one(feedback)
+            await _adjust_count(db, 1, counted)
+            return result.inserted_id
+
+        feedback_id = await _on_mongo_loop(operation)
+        _count_cache().clear()
+        return feedback_id
+
+    @staticmethod
+    async def create_many(documents, batch_size=None, write_concern=None):
+        """
+        Insert feedback documents with concurrent unordered ``insert_many`` batches.
+
+        Takes and returns the same values as ``FeedbackMongo.create_many``.
+        """
+        batch_size, write_concern = _bulk_options(batch_size, write_concern)
+        counted = _count_strategy() == 'counter'
+        batches = []
+        for offset in range(0, len(documents), batch_size):
+            batch = [dict(document) for document in documents[offset:offset + batch_size]]
+            for document in batch:
+                document.setdefault('submitted_at', datetime.utcnow())
+            batches.append((offset, batch))
+
+        async def insert(collection, offset, batch):
+            try:
+                await collection.insert_many(batch, ordered=False)
+                return len(batch), []
+            except BulkWriteError as e:
+                return e.details.get('nInserted', 0), _write_errors(e, offset)
+
+        async def operation(db):
+            collection = db[AsyncFeedbackMongo.collection_name].with_options(
+                write_concern=write_concern)
+            outcomes = await asyncio.gather(*(insert(collection, offset, batch)
+                                              for offset, batch in batches))
+            result = {'inserted': sum(inserted for inserted, _ in outcomes),
+                      'errors': [error for _, errors in outcomes for error in errors]}
+            await _adjust_count(db, result['inserted'], counted)
+            return result
+
+        result = await _on_mongo_loop(operation)
+        if result['inserted']:
+            _count_cache().clear()
+        return result
+
+    @staticmethod
+    async def find_page(after=None, per_page=10):
+        """
+        Get one page of feedback, newest first, starting after a cursor.
+
+        Returns:
+            Tuple of (documents, cursor for the next page or None)
+
+        Raises:
+            InvalidCursor: If ``after`` is malformed
+        """
+        query = keyset_query(after)
+
+        async def operation(db):
+            # One extra document tells whether another page follows
+            return await (db[AsyncFeedbackMongo.collection_name].find(query)
+                          .sort(PAGE_ORDER).limit(per_page + 1).to_list())
+
+        feedbacks = await _on_mongo_loop(operation)
+        if len(feedbacks) <= per_page:
+            return feedbacks, None
+        feedbacks = feedbacks[:per_page]
+        last = feedbacks[-1]
+        return feedbacks, encode_cursor(last['submitted_at'], last['_id'])
+
+    @staticmethod
+    async def find_by_id(feedback_id):
+        """Find feedback by ID."""
+        query = {'_id': ObjectId(feedback_id)}
+
+        async def operation(db):
+            return await db[AsyncFeedbackMongo.collection_name].find_one(query)
+        return await _on_mongo_loop(operation)
+
+    @staticmethod
+    async def delete(feedback_id):
+        """Delete feedback by ID."""
+        query = {'_id': ObjectId(feedback_id)}
+        counted = _count_strategy() == 'counter'
+
+        async def operation(db):
+            result = await db[AsyncFeedbackMongo.collection_name].delete_one(query)
+            await _adjust_count(db, -result.deleted_count, counted)
+            return result.deleted_count
+
+        deleted = await _on_mongo_loop(operation)
+        if deleted:
+            _count_cache().clear()
+        return deleted > 0
+
+    @staticmethod
+    async def delete_many(feedback_ids, batch_size=None, write_concern=None):
+        """
+        Delete feedback by ID with concurrent unordered ``bulk_write`` batches.
+
+        Takes and returns the same values as ``FeedbackMongo.delete_many``.
+        """
+        batch_size, write_concern = _bulk_options(batch_size, write_concern)
+        counted = _count_strategy() == 'counter'
+        operations, errors = _delete_operations(feedback_ids)
+        batches = [operations[start:start + batch_size]
+                   for start in range(0, len(operations), batch_size)]
+
+        async def remove(collection, batch):
+            try:
+                outcome = await collection.bulk_write([op for _, op in batch], ordered=False)
+                return (outcome.deleted_count if outcome.acknowledged else 0), []
+            except BulkWriteError as e:
+                return e.details.get('nRemoved', 0), [dict(error, index=batch[error['index']][0])
+                                                      for error in _write_errors(e, 0)]
+
+        async def operation(db):
+            collection = db[AsyncFeedbackMongo.collection_name].with_options(
+                write_concern=write_concern)
+            outcomes = await asyncio.gather(*(remove(collection, batch) for batch in batches))
+            result = {'deleted': sum(deleted for deleted, _ in outcomes),
+                      'errors': errors + [error for _, found in outcomes for error in found]}
+            await _adjust_count(db, -result['deleted'], counted)
+            return result
+
+        result = await _on_mongo_loop(operation)
+        if result['deleted']:
+            _count_cache().clear()
+        return result
+
+    @staticmethod
+    async def count():
+        """
+        Count total feedback entries by MONGO_COUNT_STRATEGY (see
+        ``FeedbackMongo.count``), sharing its in-process cache.
+        """
+        cache = _count_cache()
+        max_age = current_app.config.get('FEEDBACK_COUNT_MAX_AGE', 5)
+        now = time.monotonic()
+        if 'value' in cache and now - cache['fetched_at'] < max_age:
+            return cache['value']
+        strategy = _count_strategy()
+
+        async def operation(db):
+            collection = db[AsyncFeedbackMongo.collection_name]
+            if strategy == 'estimated':
+                return await collection.estimated_document_count()
+            if strategy == 'counter':
+                counter = await db[COUNTERS_COLLECTION].find_one({'_id': FEEDBACK_COUNTER})
+                return counter['value'] if counter else await _sync_count(db)
+            return await collection.count_documents({})
+
+        value = await _on_mongo_loop(operation)
+        cache['value'] = value
+        cache['fetched_at'] = now
+        return value
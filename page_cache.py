@@ -0,0 +1,143 @@
+"""
+Rendered fragment cache for the feedback listing.
+
+Rendered ``_feedback_list.html`` fragments are cached under a key made of
+the feedback generation and the page parameters, so a write makes every
+cached page unreachable at once instead of deleting entries one by one.
+
+Backends (``PAGE_CACHE``):
+    memory  Per-process LRU. Writes in this process bump a local generation
+            immediately; writes in other workers are picked up from the
+            storage backend's generation, polled at most every
+            ``PAGE_CACHE_GENERATION_TTL`` seconds.
+    redis   Shared store speaking the Redis protocol (``PAGE_CACHE_REDIS_URL``);
+            the generation lives in the store, so all workers see a write at
+            once. Requires ``pip install redis``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from markupsafe import Markup
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU cache."""
+
+    def __init__(self, maxsize=256, generation_ttl=1.0):
+        self.maxsize = maxsize
+        self.generation_ttl = generation_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_generation = 0
+        self._shared_generation = None
+        self._checked_at = 0.0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def bump(self):
+        with self._lock:
+            self._local_generation += 1
+            self._entries.clear()
+
+    def generation(self):
+        now = time.monotonic()
+        if self._shared_generation is None or now - self._checked_at >= self.generation_ttl:
+            # Deferred: app.storage imports this module
+            from app.storage import get_storage
+            self._shared_generation = get_storage().generation()
+            self._checked_at = now
+        return f'{self._shared_generation}.{self._local_generation}'
+
+
+class RedisBackend:
+    """Cache stored in a Redis-protocol server shared by all workers."""
+
+    def __init__(self, client=None, url=None, ttl=300, prefix='feedback:page:'):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError('PAGE_CACHE=redis requires: pip install redis') from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def bump(self):
+        self.client.incr(self.prefix + 'generation')
+
+    def generation(self):
+        value = self.client.get(self.prefix + 'generation')
+        return int(value or 0)
+
+
+def get_page_cache(app=None):
+    """Return the app's page cache backend, or None when caching is off."""
+    app = app or current_app._get_current_object()
+    if 'page_cache' not in app.extensions:
+        kind = app.config.get('PAGE_CACHE')
+        if kind == 'memory':
+            backend = MemoryBackend(
+                maxsize=app.config.get('PAGE_CACHE_SIZE', 256),
+                generation_ttl=app.config.get('PAGE_CACHE_GENERATION_TTL', 1.0)
+            )
+        elif kind == 'redis':
+            backend = RedisBackend(
+                url=app.config.get('PAGE_CACHE_REDIS_URL'),
+                ttl=app.config.get('PAGE_CACHE_TTL', 300)
+            )
+        elif not kind:
+            backend = None
+        else:
+            raise ValueError(f'Unknown PAGE_CACHE backend: {kind!r}')
+        app.extensions['page_cache'] = backend
+    return app.extensions['page_cache']
+
+
+def invalidate_pages():
+    """Make every cached page stale; call after writing feedback."""
+    cache = get_page_cache()
+    if cache is not None:
+        cache.bump()
+
+
+def cached_fragment(name, params, render):
+    """
+    Return the fragment for ``params``, rendering it with ``render()`` on a miss.
+
+    Args:
+        name: Fragment name, part of the cache key
+        params: Tuple of the parameters the fragment depends on
+        render: Callable producing the fragment HTML
+    """
+    cache = get_page_cache()
+    if cache is None:
+        return Markup(render())
+
+    key = f'{name}:{cache.generation()}:' + ':'.join('' if p is None else str(p) for p in params)
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html)
+    return Markup(html)
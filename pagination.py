@@ -0,0 +1,215 @@
+"""
+Pagination helpers for the Feedback Application.
+
+Keyset (seek) pages are addressed by opaque cursors built from
+``(submitted_at, id)`` instead of an OFFSET, so every page is a single index
+range scan regardless of depth and no ``COUNT(*)`` is needed.
+
+Streaming pages hand rows to the template as they are fetched
+(``yield_per``), so large pages are rendered without holding every row in
+memory.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from flask import current_app
+from app import db
+from config import Config
+
+
+def clamp_per_page(per_page):
+    """Bound a requested page size to ``1..MAX_ITEMS_PER_PAGE`` (None = default)."""
+    if per_page is None:
+        return current_app.config.get('ITEMS_PER_PAGE', Config.ITEMS_PER_PAGE)
+    return min(max(per_page, 1),
+               current_app.config.get('MAX_ITEMS_PER_PAGE', Config.MAX_ITEMS_PER_PAGE))
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(submitted_at, row_id):
+    """
+    Encode a ``(submitted_at, id)`` position as an opaque URL-safe token.
+
+    Integer ids are stored as numbers, any other id (e.g. an ObjectId) as
+    its string form.
+    """
+    if not isinstance(row_id, int):
+        row_id = str(row_id)
+    payload = json.dumps([submitted_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, parse_id=int):
+    """
+    Decode a token produced by :func:`encode_cursor`.
+
+    Args:
+        token: Cursor token
+        parse_id: Turns the stored id back into a key; raises ValueError or
+            TypeError for a malformed one
+
+    Raises:
+        InvalidCursor: If the token is malformed
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        submitted_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(submitted_at), parse_id(row_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid pagination cursor: {token!r}') from e
+
+
+class KeysetPage:
+    """One page of a keyset-paginated query, newest first."""
+
+    is_keyset = True
+
+    def __init__(self, items, per_page, has_next, has_prev):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.has_prev = has_prev
+
+    @property
+    def next_cursor(self):
+        """Cursor for the page after this one, or None."""
+        if not self.has_next or not self.items:
+            return None
+        last = self.items[-1]
+        return encode_cursor(last.submitted_at, last.id)
+
+    @property
+    def prev_cursor(self):
+        """Cursor for the page before this one, or None."""
+        if not self.has_prev or not self.items:
+            return None
+        first = self.items[0]
+        return encode_cursor(first.submitted_at, first.id)
+
+
+def keyset_paginate(query, model, per_page, after=None, before=None):
+    """
+    Paginate ``query`` newest first by ``(submitted_at, id)``.
+
+    Args:
+        query: Base query to paginate (unordered)
+        model: Mapped class exposing ``submitted_at`` and ``id`` columns
+        per_page: Number of items per page
+        after: Cursor token; return the rows older than this position
+        before: Cursor token; return the rows newer than this position
+
+    Returns:
+        KeysetPage instance
+    """
+    key = db.tuple_(model.submitted_at, model.id)
+
+    if before is not None:
+        position = decode_cursor(before)
+        rows = (query.filter(key > db.tuple_(*position))
+                .order_by(model.submitted_at.asc(), model.id.asc())
+                .limit(per_page + 1)
+                .all())
+        has_prev = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return KeysetPage(items, per_page, has_next=True, has_prev=has_prev)
+
+    if after is not None:
+        query = query.filter(key < db.tuple_(*decode_cursor(after)))
+
+    rows = (query.order_by(model.submitted_at.desc(), model.id.desc())
+            .limit(per_page + 1)
+            .all())
+    return KeysetPage(rows[:per_page], per_page,
+                      has_next=len(rows) > per_page,
+                      has_prev=after is not None)
+
+
+class _RowStream:
+    """Iterable over a page's rows that fetches them lazily."""
+
+    def __init__(self, page, rows):
+        self._page = page
+        self._rows = iter(rows)
+        # Peek one row so templates can test for an empty page
+        self._head = next(self._rows, None)
+
+    def __bool__(self):
+        return self._head is not None
+
+    def __iter__(self):
+        page = self._page
+        row = self._head
+        count = 0
+        while row is not None:
+            count += 1
+            if count > page.per_page:
+                page.has_next = True
+                return
+            if page.first is None:
+                page.first = row
+            page.last = row
+            yield row
+            row = next(self._rows, None)
+
+
+class StreamingPage:
+    """
+    Page whose items are streamed from the database.
+
+    ``has_next`` and ``next_cursor`` are only known once ``items`` has been
+    iterated, so templates must render navigation after the rows.
+    """
+
+    is_stream = True
+
+    def __init__(self, query, per_page, has_prev, page=None, keyset=False):
+        self.per_page = per_page
+        self.page = page
+        self.is_keyset = keyset
+        self.has_prev = has_prev
+        self.has_next = False
+        self.first = None
+        self.last = None
+        batch_size = current_app.config.get('STREAM_BATCH_SIZE', 100)
+        self.items = _RowStream(self, query.limit(per_page + 1).yield_per(batch_size))
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev and self.page else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next and self.page else None
+
+    @property
+    def next_cursor(self):
+        if not self.has_next or self.last is None:
+            return None
+        return encode_cursor(self.last.submitted_at, self.last.id)
+
+    @property
+    def prev_cursor(self):
+        if not self.has_prev or self.first is None:
+            return None
+        return encode_cursor(self.first.submitted_at, self.first.id)
+
+
+def stream_offset_page(query, model, page, per_page):
+    """Stream page ``page`` newest first without counting the table."""
+    page = max(page, 1)
+    query = (query.order_by(model.submitted_at.desc(), model.id.desc())
+             .offset((page - 1) * per_page))
+    return StreamingPage(query, per_page, has_prev=page > 1, page=page)
+
+
+def stream_keyset_page(query, model, per_page, after=None):
+    """Stream the page after cursor ``after`` (newest first)."""
+    if after is not None:
+        query = query.filter(db.tuple_(model.submitted_at, model.id) < db.tuple_(*decode_cursor(after)))
+    query = query.order_by(model.submitted_at.desc(), model.id.desc())
+    return StreamingPage(query, per_page, has_prev=after is not None, keyset=True)
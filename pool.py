@@ -0,0 +1,36 @@
+"""
+Connection pool metrics.
+
+Pool events are counted per application so monitoring can see checkouts,
+new connections and connections invalidated by pre-ping (e.g. after a
+database failover) next to the pool's current occupancy.
+"""
+from flask import current_app
+from app import db
+
+POOL_EVENTS = ('connect', 'checkout', 'checkin', 'invalidate')
+
+
+def instrument_pool(app, engine):
+    """Attach pool event counters for ``engine`` to ``app``."""
+    counters = app.extensions.setdefault('pool_metrics', dict.fromkeys(POOL_EVENTS, 0))
+
+    def counter(name):
+        def listener(*args):
+            counters[name] += 1
+        return listener
+
+    for name in POOL_EVENTS:
+        db.event.listen(engine, name, counter(name))
+
+
+def pool_metrics():
+    """Return the current pool occupancy and event counters."""
+    pool = db.engine.pool
+    metrics = {'pool_class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if method is not None:
+            metrics[name] = method()
+    metrics.update(current_app.extensions.get('pool_metrics', {}))
+    return metrics
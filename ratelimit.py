@@ -0,0 +1,149 @@
+"""
+Token-bucket rate limiting for feedback submissions.
+
+Every client IP and every submitted email address owns a bucket holding up
+to ``RATE_LIMIT_BURST`` tokens, refilled at ``RATE_LIMIT_PER_MINUTE``. A
+submission takes one token from each, and only when both have one; when
+either bucket is empty the request is answered with 429 before the form is
+validated or the database is touched.
+
+Backends (``RATE_LIMIT``):
+    memory  Per-process buckets in a bounded LRU; each gunicorn worker
+            enforces the limit separately.
+    redis   Buckets in a Redis-protocol store shared by all workers, updated
+            atomically by a server-side script using the server clock.
+            Requires ``pip install redis``.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+_REDIS_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local allowed = 1
+local retry_ms = 0
+for i, key in ipairs(KEYS) do
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < cost then
+        allowed = 0
+        retry_ms = math.max(retry_ms, math.ceil((cost - tokens) / rate * 1000))
+    end
+    levels[i] = tokens
+end
+for i, key in ipairs(KEYS) do
+    local tokens = levels[i]
+    if allowed == 1 then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(burst / rate * 1000))
+end
+return {allowed, retry_ms}
+"""
+
+
+class MemoryLimiter:
+    """Thread-safe in-process token buckets, at most ``maxsize`` keys."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, *keys, rate, burst, cost=1):
+        """
+        Take ``cost`` tokens from every bucket in ``keys``, or from none of
+        them when any bucket is short.
+
+        Returns:
+            Tuple of (allowed, seconds until enough tokens are available)
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key in keys:
+                tokens, updated = self._buckets.pop(key, (burst, now))
+                levels.append(min(burst, tokens + (now - updated) * rate))
+            short = [tokens for tokens in levels if tokens < cost]
+            allowed = not short
+            retry_after = max((cost - tokens) / rate for tokens in short) if short else 0.0
+            for key, tokens in zip(keys, levels):
+                self._buckets[key] = (tokens - cost if allowed else tokens, now)
+            while len(self._buckets) > self.maxsize:
+                # Evicting the least recently used bucket only forgets a
+                # client that has been quiet the longest
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class RedisLimiter:
+    """Token buckets in a Redis-protocol server shared by all workers."""
+
+    def __init__(self, client=None, url=None, prefix='feedback:ratelimit:'):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError('RATE_LIMIT=redis requires: pip install redis') from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, *keys, rate, burst, cost=1):
+        allowed, retry_ms = self.client.eval(_REDIS_SCRIPT, len(keys),
+                                             *(self.prefix + key for key in keys),
+                                             rate, burst, cost)
+        return bool(allowed), int(retry_ms) / 1000
+
+
+def get_rate_limiter(app=None):
+    """Return the app's limiter backend, or None when rate limiting is off."""
+    app = app or current_app._get_current_object()
+    if 'rate_limiter' not in app.extensions:
+        kind = app.config.get('RATE_LIMIT')
+        if kind == 'memory':
+            limiter = MemoryLimiter(maxsize=app.config.get('RATE_LIMIT_MEMORY_SIZE', 10000))
+        elif kind == 'redis':
+            limiter = RedisLimiter(url=app.config.get('RATE_LIMIT_REDIS_URL'))
+        elif not kind:
+            limiter = None
+        else:
+            raise ValueError(f'Unknown RATE_LIMIT backend: {kind!r}')
+        app.extensions['rate_limiter'] = limiter
+    return app.extensions['rate_limiter']
+
+
+def check_submission(ip, email=None):
+    """
+    Charge one submission to the IP and email buckets, checking both first.
+
+    Returns:
+        None when allowed, otherwise the whole seconds to wait (Retry-After)
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return None
+
+    rate = current_app.config.get('RATE_LIMIT_PER_MINUTE', 6) / 60
+    burst = current_app.config.get('RATE_LIMIT_BURST', 5)
+    keys = [f'ip:{ip}']
+    if email:
+        keys.append(f'email:{email.strip().lower()}')
+
+    # All or nothing: a throttled IP cannot keep draining the email buckets
+    # it names, and a refused email costs the sender's IP no token
+    allowed, retry_after = limiter.take(*keys, rate=rate, burst=burst)
+    if not allowed:
+        return max(1, math.ceil(retry_after))
+    return None
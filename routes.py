@@ -1,89 +1,358 @@
 """
 Routes for the Feedback Application.
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+import hmac
+from datetime import datetime, timedelta
+
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, abort,
+                   current_app, jsonify, Response, stream_with_context, stream_template)
 from app import db
 from app.models import Feedback
 from app.forms import FeedbackForm
+from app.pagination import stream_offset_page, stream_keyset_page, clamp_per_page, InvalidCursor
+from app.ingest import bulk_insert, iter_ndjson
+from app.export import stream_export, parse_timestamp, FORMATS
+from app.analytics import rating_stats, BUCKETS
+from app.search import search_feedback
+from app.pool import pool_metrics
+from app.metrics import render_metrics
+from app.write_queue import get_write_queue
+from app.page_cache import cached_fragment
+from app.storage import get_storage, DuplicateFeedback
+from app.dedup import is_duplicate, remember, content_digest, dedup_hash
+from app.ratelimit import check_submission
+from app.lazy import URL_RULES, ERROR_HANDLERS
 
 main_bp = Blueprint('main', __name__)
 
-@main_bp.route('/')
 def index():
     """Home page with welcome message."""
-    feedback_count = Feedback.query.count()
+    feedback_count = get_storage().count()
     return render_template('index.html', feedback_count=feedback_count)
 
-@main_bp.route('/feedback/submit', methods=['GET', 'POST'])
 def submit_feedback():
     """Submit feedback form."""
+    if request.method == 'POST':
+        # Throttle before any validation or database work
+        retry_after = check_submission(request.remote_addr, request.form.get('email'))
+        if retry_after is not None:
+            return current_app.response_class(
+                'Too many submissions. Please try again later.\n',
+                status=429, mimetype='text/plain',
+                headers={'Retry-After': str(retry_after)}
+            )
+
     form = FeedbackForm()
 
     if form.validate_on_submit():
+        if is_duplicate(form.email.data, form.feedback_text.data):
+            flash('This feedback has already been submitted.', 'error')
+            return redirect(url_for('main.submit_feedback'))
+
+        if current_app.config.get('WRITE_BEHIND'):
+            # Spool locally; the background flusher writes to the database
+            token = get_write_queue().enqueue({
+                'name': form.name.data,
+                'email': form.email.data,
+                'feedback_text': form.feedback_text.data,
+                'rating': form.rating.data
+            })
+            remember(form.email.data, form.feedback_text.data)
+            flash('Thank you for your feedback! Your response has been recorded.', 'success')
+            response = redirect(url_for('main.submit_feedback'))
+            response.headers['X-Feedback-Receipt'] = token
+            return response
+
         # Create new feedback entry
-        feedback = Feedback(
-            name=form.name.data,
-            email=form.email.data,
-            feedback_text=form.feedback_text.data,
-            rating=form.rating.data
-        )
+        values = {
+            'name': form.name.data,
+            'email': form.email.data,
+            'feedback_text': form.feedback_text.data,
+            'rating': form.rating.data,
+            'submitted_at': datetime.utcnow()
+        }
+        window = current_app.config.get('DEDUP_WINDOW')
+        if window:
+            values['dedup_hash'] = dedup_hash(
+                content_digest(values['email'], values['feedback_text']),
+                values['submitted_at'], window
+            )
 
         try:
-            db.session.add(feedback)
-            db.session.commit()
+            get_storage().create(values)
+            remember(values['email'], values['feedback_text'])
             flash('Thank you for your feedback! Your response has been recorded.', 'success')
             return redirect(url_for('main.submit_feedback'))
-        except Exception as e:
-            db.session.rollback()
+        except DuplicateFeedback:
+            # Same submission stored concurrently by another worker
+            remember(values['email'], values['feedback_text'])
+            flash('This feedback has already been submitted.', 'error')
+            return redirect(url_for('main.submit_feedback'))
+        except Exception:
             flash('An error occurred while submitting your feedback. Please try again.', 'error')
-            print(f"Error: {e}")
+            current_app.logger.exception('Feedback submission failed')
 
     return render_template('feedback_form.html', form=form)
 
-@main_bp.route('/feedback/view')
+def write_queue_status():
+    """Write-behind queue depth and lag."""
+    if not current_app.config.get('WRITE_BEHIND'):
+        abort(404)
+    return jsonify(get_write_queue().stats())
+
+def submission_status(token):
+    """Whether a write-behind submission is still queued or already stored."""
+    if not current_app.config.get('WRITE_BEHIND'):
+        abort(404)
+    status = get_write_queue().status(token)
+    if status is None:
+        abort(404)
+    return jsonify(token=token, status=status)
+
+def bulk_submit_feedback():
+    """Bulk-ingest feedback from a JSON array or NDJSON body (admin function)."""
+    # Imports skip the per-client rate limit, so they need the admin token
+    if not _is_admin():
+        return jsonify(error='Bulk import requires the admin token'), 403
+    # A declared length bounds the body, and with it the rows, before any is read
+    if request.content_length is None:
+        return jsonify(error='Content-Length is required'), 411
+    if request.content_length > current_app.config.get('BULK_INGEST_MAX_BYTES', 10 * 1024 * 1024):
+        return jsonify(error='Request body too large'), 413
+
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows = iter_ndjson(request.stream)
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get('items')
+        if not isinstance(payload, list):
+            return jsonify(error='Expected a JSON array of feedback objects or NDJSON body'), 400
+        rows = payload
+
+    chunk_size = request.args.get('chunk_size', type=int)
+    result = bulk_insert(rows, chunk_size=chunk_size if chunk_size and chunk_size > 0 else None)
+    return jsonify(result)
+
 def view_feedback():
     """View all submitted feedback with pagination."""
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
+    after = request.args.get('after')
+    before = request.args.get('before')
+    mode = request.args.get('mode', current_app.config.get('PAGINATION_MODE', 'offset'))
+    storage = get_storage()
+    # Numbered pages and streaming need SQL; other backends page by cursor
+    keyset = bool(after or before or mode == 'keyset' or not storage.offset_pages)
+
+    large = per_page > current_app.config.get('STREAM_PAGE_THRESHOLD', 100)
+    if large and storage.offset_pages and not before:
+        # Large page: render rows as they are fetched instead of buffering
+        # the page (and caching its HTML) in this worker
+        try:
+            if keyset:
+                pagination = stream_keyset_page(Feedback.query, Feedback, per_page, after=after)
+            else:
+                pagination = stream_offset_page(Feedback.query, Feedback, page, per_page)
+        except InvalidCursor:
+            abort(400)
+        return Response(stream_template(
+            'view_feedback.html',
+            feedbacks=pagination.items,
+            pagination=pagination
+        ))
+
+    def render_list():
+        if keyset:
+            # Cursor-based pagination: one index range scan per page, no COUNT(*)
+            try:
+                pagination = storage.page(after=after, before=before, per_page=per_page)
+            except InvalidCursor:
+                abort(400)
+        else:
+            # Get feedback with pagination, ordered by most recent first; the id
+            # tiebreak keeps pages stable and matches ix_feedback_submitted_at_id
+            pagination = Feedback.query.order_by(
+                Feedback.submitted_at.desc(), Feedback.id.desc()
+            ).paginate(
+                page=page,
+                per_page=per_page,
+                error_out=False
+            )
+
+        return render_template(
+            '_feedback_list.html',
+            feedbacks=pagination.items,
+            pagination=pagination
+        )
+
+    params = ('keyset', per_page, after, before) if keyset else ('offset', page, per_page)
+    feedback_list = cached_fragment('feedback_list', params, render_list)
+
+    return render_template('view_feedback.html', feedback_list=feedback_list)
+
+def search():
+    """Ranked full-text search over feedback text."""
+    text = request.args.get('q', '')
+    page = request.args.get('page', 1, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
 
-    # Get feedback with pagination, ordered by most recent first
-    pagination = Feedback.query.order_by(Feedback.submitted_at.desc()).paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
+    results = search_feedback(text, page=page, per_page=per_page)
+    return jsonify(
+        query=text,
+        page=results.page,
+        per_page=results.per_page,
+        has_next=results.has_next,
+        has_prev=results.has_prev,
+        items=[feedback.to_dict() for feedback in results.items]
     )
 
-    feedbacks = pagination.items
+def export_feedback():
+    """Stream all feedback as CSV or NDJSON with optional date/rating filters."""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        abort(400)
 
-    return render_template(
-        'view_feedback.html',
-        feedbacks=feedbacks,
-        pagination=pagination
+    try:
+        filters = {
+            'start': parse_timestamp(request.args.get('start')),
+            'end': parse_timestamp(request.args.get('end')),
+            'min_rating': request.args.get('min_rating', type=int),
+            'max_rating': request.args.get('max_rating', type=int),
+        }
+    except ValueError:
+        abort(400)
+
+    return Response(
+        stream_with_context(stream_export(fmt, **filters)),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=feedback.{fmt}'}
     )
 
-@main_bp.route('/feedback/delete/<int:id>', methods=['POST'])
+def feedback_stats():
+    """Rating histograms and averages per day or week, served from the rollup."""
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        abort(400)
+
+    try:
+        start = parse_timestamp(request.args.get('start'))
+        end = parse_timestamp(request.args.get('end'))
+    except ValueError:
+        abort(400)
+
+    return jsonify(rating_stats(
+        bucket=bucket,
+        start=start.date() if start else None,
+        end=end.date() if end else None
+    ))
+
+def _is_admin():
+    """Whether the request carries ``Authorization: Bearer <ADMIN_TOKEN>``."""
+    expected = current_app.config.get('ADMIN_TOKEN')
+    auth = request.authorization
+    if not expected or auth is None or auth.type != 'bearer' or not auth.token:
+        return False
+    return hmac.compare_digest(auth.token.encode('utf-8'), expected.encode('utf-8'))
+
+def bulk_delete_feedback():
+    """Delete feedback by id list and/or filters in one statement (admin function)."""
+    # A bearer token is never sent by a browser on its own, so a cross-site
+    # form cannot trigger this endpoint
+    if not _is_admin():
+        return jsonify(error='Bulk delete requires the admin token'), 403
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error='Expected a JSON object with ids and/or filters'), 400
+
+    storage = get_storage()
+    ids = payload.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(
+                isinstance(i, storage.id_type) and not isinstance(i, bool) for i in ids):
+            kind = 'integers' if storage.id_type is int else 'strings'
+            return jsonify(error=f'ids must be a list of {kind}'), 400
+        if len(ids) > current_app.config.get('BULK_DELETE_MAX_IDS', 10000):
+            return jsonify(error='Too many ids'), 400
+
+    email = payload.get('email')
+    if email is not None and not isinstance(email, str):
+        return jsonify(error='email must be a string'), 400
+    for key in ('min_rating', 'max_rating'):
+        value = payload.get(key)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            return jsonify(error=f'{key} must be an integer'), 400
+
+    try:
+        filters = {
+            'ids': ids,
+            'email': email,
+            'start': parse_timestamp(payload.get('start')),
+            'end': parse_timestamp(payload.get('end')),
+            'min_rating': payload.get('min_rating'),
+            'max_rating': payload.get('max_rating'),
+        }
+    except (ValueError, TypeError):
+        return jsonify(error='start and end must be ISO 8601 dates or datetimes'), 400
+
+    # Without ids or an email, only a bounded time window may be deleted
+    if ids is None and email is None:
+        max_days = current_app.config.get('BULK_DELETE_MAX_DAYS', 31)
+        start, end = filters['start'], filters['end']
+        if start is None or end is None or end - start > timedelta(days=max_days):
+            return jsonify(error=f'Without ids or email, start and end must span '
+                                 f'at most {max_days} days'), 400
+
+    try:
+        outcome = storage.delete_matching(**filters)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    if outcome['errors']:
+        return jsonify(deleted=outcome['deleted'], errors=outcome['errors'])
+    return jsonify(deleted=outcome['deleted'])
+
 def delete_feedback(id):
     """Delete a specific feedback entry (admin function)."""
-    feedback = Feedback.query.get_or_404(id)
+    storage = get_storage()
+    try:
+        feedback_id = storage.parse_id(id)
+    except ValueError:
+        abort(404)
+    if storage.get(feedback_id) is None:
+        abort(404)
 
     try:
-        db.session.delete(feedback)
-        db.session.commit()
+        storage.delete(feedback_id)
         flash('Feedback deleted successfully.', 'success')
-    except Exception as e:
-        db.session.rollback()
+    except Exception:
         flash('An error occurred while deleting the feedback.', 'error')
-        print(f"Error: {e}")
+        current_app.logger.exception('Feedback deletion failed', extra={'feedback_id': id})
 
     return redirect(url_for('main.view_feedback'))
 
-@main_bp.errorhandler(404)
+def metrics():
+    """Request latency, SQL and template timings in the Prometheus text format."""
+    if 'request_metrics' not in current_app.extensions:
+        abort(404)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+def pool_status():
+    """Database connection pool occupancy and event counters."""
+    return jsonify(pool_metrics())
+
 def not_found_error(error):
     """Handle 404 errors."""
     return render_template('404.html'), 404
 
-@main_bp.errorhandler(500)
 def internal_error(error):
     """Handle 500 errors."""
     db.session.rollback()
     return render_template('500.html'), 500
+
+# One table of rules serves this blueprint and the lazy one (app.lazy)
+for rule, name, methods in URL_RULES:
+    main_bp.add_url_rule(rule, endpoint=name, view_func=globals()[name], methods=methods)
+for code, name in ERROR_HANDLERS:
+    main_bp.register_error_handler(code, globals()[name])
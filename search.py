@@ -0,0 +1,100 @@
+"""
+Full-text search over feedback_text.
+
+The backend is chosen by ``SEARCH_BACKEND``: ``postgres`` (tsvector matched
+against the GIN expression index, ranked with ``ts_rank``), ``sqlite`` (FTS5
+table ranked with ``bm25``), ``like`` (unindexed substring fallback) or
+``auto`` to pick from the database dialect.
+"""
+import re
+
+from flask import current_app
+from app import db
+from app.models import Feedback, TEXT_SEARCH_CONFIG
+
+BACKENDS = ('auto', 'postgres', 'sqlite', 'like')
+
+_AUTO_BACKENDS = {
+    'postgresql': 'postgres',
+    'sqlite': 'sqlite',
+}
+
+
+class SearchPage:
+    """One page of ranked search results."""
+
+    def __init__(self, items, page, per_page, has_next):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+
+def get_search_backend():
+    """Resolve the configured backend name for the current database."""
+    backend = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown SEARCH_BACKEND: {backend!r}')
+    if backend == 'auto':
+        backend = _AUTO_BACKENDS.get(db.engine.dialect.name, 'like')
+    return backend
+
+
+def _fts5_query(text):
+    """Quote every word so user input never reaches FTS5 query syntax."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', text))
+
+
+def _postgres_query(text):
+    vector = db.func.to_tsvector(db.literal_column(f"'{TEXT_SEARCH_CONFIG}'"), Feedback.feedback_text)
+    tsquery = db.func.websearch_to_tsquery(db.literal_column(f"'{TEXT_SEARCH_CONFIG}'"), text)
+    return (Feedback.query
+            .filter(vector.op('@@')(tsquery))
+            .order_by(db.func.ts_rank(vector, tsquery).desc(), Feedback.id.desc()))
+
+
+def _sqlite_query(text):
+    fts = db.table('feedback_fts', db.column('rowid'))
+    return (Feedback.query
+            .join(fts, fts.c.rowid == Feedback.id)
+            .filter(db.text('feedback_fts MATCH :match'))
+            .params(match=_fts5_query(text))
+            .order_by(db.func.bm25(db.literal_column('feedback_fts')), Feedback.id.desc()))
+
+
+def _like_query(text):
+    return (Feedback.query
+            .filter(Feedback.feedback_text.icontains(text, autoescape=True))
+            .order_by(Feedback.submitted_at.desc(), Feedback.id.desc()))
+
+
+_QUERIES = {
+    'postgres': _postgres_query,
+    'sqlite': _sqlite_query,
+    'like': _like_query,
+}
+
+
+def search_feedback(text, page=1, per_page=10):
+    """
+    Search feedback_text, best matches first.
+
+    Args:
+        text: User-entered search terms
+        page: 1-based page number
+        per_page: Results per page
+
+    Returns:
+        SearchPage instance (empty when ``text`` has no searchable words)
+    """
+    page = max(page, 1)
+    if not re.search(r'\w', text or ''):
+        return SearchPage([], page, per_page, has_next=False)
+
+    query = _QUERIES[get_search_backend()](text.strip())
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return SearchPage(rows[:per_page], page, per_page, has_next=len(rows) > per_page)
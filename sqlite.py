@@ -0,0 +1,97 @@
+"""
+SQLite engine profile for multi-worker deployments.
+
+With the default rollback journal a writer needs the whole database to
+itself, so concurrent gunicorn workers submitting feedback time out with
+"database is locked". ``SQLITE_PROFILE=production`` sets, on every new
+connection:
+
+    journal_mode=WAL     readers and the writer no longer block each other
+    synchronous=NORMAL   fsync at checkpoints instead of every commit
+                         (a power loss can lose the last commits, never
+                         corrupt the file)
+    mmap_size            read pages through a memory map
+    busy_timeout         wait for another worker's write instead of failing
+
+and serializes write transactions within the process: the first write
+statement of a transaction waits on a process-wide lock, held until the
+transaction has ended, so threads queue in Python rather than polling
+SQLite's lock, and only one writer per worker contends for the file.
+"""
+import threading
+
+from app import db
+
+_WRITE_LOCK = 'sqlite_write_lock'
+_READ_PREFIXES = ('SELECT', 'WITH', 'PRAGMA', 'EXPLAIN')
+
+
+class WriterLock:
+    """Process-wide lock held by the connection whose transaction writes."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.waits = 0
+
+    def acquire(self, info):
+        if info.get(_WRITE_LOCK):
+            return
+        if not self._lock.acquire(blocking=False):
+            self.waits += 1
+            # On timeout carry on unlocked and let busy_timeout decide
+            if not self._lock.acquire(timeout=self.timeout):
+                return
+        info[_WRITE_LOCK] = True
+
+    def release(self, info):
+        if info.pop(_WRITE_LOCK, False):
+            self._lock.release()
+
+
+def _is_write(statement):
+    return not statement.lstrip().upper().startswith(_READ_PREFIXES)
+
+
+def configure_sqlite(app, engine):
+    """Apply the ``SQLITE_PROFILE`` pragmas and writer lock to ``engine``."""
+    if engine.dialect.name != 'sqlite' or app.config.get('SQLITE_PROFILE') != 'production':
+        return
+
+    busy_timeout = app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)
+    pragmas = (
+        f'PRAGMA busy_timeout={int(busy_timeout)}',
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={int(app.config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    )
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    lock = WriterLock(busy_timeout / 1000)
+    app.extensions['sqlite_writer_lock'] = lock
+
+    def take_lock(conn, cursor, statement, parameters, context, executemany):
+        if _is_write(statement):
+            lock.acquire(conn.info)
+
+    # The commit event fires before COMMIT runs, so the lock is released
+    # once the transaction is over: when the next one begins on the same
+    # connection, or when the connection goes back to the pool
+    def release_on_begin(conn):
+        lock.release(conn.info)
+
+    def release_on_return(dbapi_connection, connection_record, *args):
+        lock.release(connection_record.info)
+
+    db.event.listen(engine, 'connect', set_pragmas)
+    db.event.listen(engine, 'before_cursor_execute', take_lock)
+    db.event.listen(engine, 'begin', release_on_begin)
+    db.event.listen(engine, 'checkin', release_on_return)
+    db.event.listen(engine, 'invalidate', release_on_return)
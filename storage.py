@@ -0,0 +1,365 @@
+"""
+Feedback storage backends.
+
+The submission, listing, counting and moderation paths reach the feedback
+store through the backend selected by ``STORAGE_BACKEND``:
+
+    sqlalchemy  ``models.Feedback`` in SQLALCHEMY_DATABASE_URI, with the
+                maintained counter, soft delete and numbered or cursor pages
+    mongo       ``models_mongo.FeedbackMongo`` in MONGO_URI, with cursor
+                pages only and hard deletes (requires pymongo, flask-pymongo)
+
+Both return records exposing ``id``, ``name``, ``email``, ``feedback_text``,
+``rating``, ``submitted_at`` and ``to_dict()``, so templates and the JSON
+API do not depend on the backend. Write methods invalidate this worker's
+rendered page cache themselves and bump the backend's ``generation()``,
+which other workers' caches and API ETags are keyed on. Search, export
+and rating stats remain SQL features; write-behind spooling flushes into
+SQL, so ``create_app`` rejects it together with ``mongo``.
+
+``test_routes.TestStorage`` runs the same conformance tests against every
+backend and ``bench_storage.py`` compares their throughput.
+"""
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
+from app import db
+from app.models import Feedback
+from app.pagination import KeysetPage, InvalidCursor, keyset_paginate
+from app.counters import get_feedback_count, get_feedback_generation, invalidate_feedback_count
+from app.deletion import soft_delete
+from app.dedup import partition_duplicates, assign_dedup_hashes
+from app.page_cache import invalidate_pages
+
+DUPLICATE_ERRORS = {'feedback_text': ['Duplicate submission']}
+
+
+class DuplicateFeedback(Exception):
+    """The submission is already stored within ``DEDUP_WINDOW``."""
+
+
+def _is_dedup_violation(error):
+    # The driver message names the column (SQLite: feedback.dedup_hash) or
+    # the unique index (PostgreSQL, MySQL: ix_feedback_dedup_hash)
+    return 'dedup_hash' in str(error.orig)
+
+
+def _projected_query(fields=None):
+    query = Feedback.query
+    if fields:
+        # Cursor pagination always needs the (submitted_at, id) key
+        columns = dict.fromkeys(tuple(fields) + ('id', 'submitted_at'))
+        query = query.options(load_only(*(getattr(Feedback, c) for c in columns)))
+    return query
+
+
+class SQLAlchemyStorage:
+    """Feedback rows in the SQLAlchemy database."""
+
+    name = 'sqlalchemy'
+    id_type = int
+    offset_pages = True
+
+    def parse_id(self, value):
+        """Return ``value`` as a feedback id; raises ValueError if malformed."""
+        return int(value)
+
+    def create(self, values):
+        """
+        Store one validated submission and return its id.
+
+        Raises:
+            DuplicateFeedback: If its ``dedup_hash`` is already stored
+        """
+        feedback = Feedback(**values)
+        try:
+            db.session.add(feedback)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            # Other constraint failures are real errors, not duplicates
+            if not _is_dedup_violation(e):
+                raise
+            raise DuplicateFeedback() from e
+        except Exception:
+            db.session.rollback()
+            raise
+        invalidate_pages()
+        return feedback.id
+
+    def create_many(self, rows):
+        """
+        Store validated submissions with one executemany INSERT.
+
+        Returns:
+            Dict with ``inserted`` and ``errors`` (``index`` into ``rows``
+            and a form-style ``errors`` dict)
+        """
+        # Deferred: app.ingest imports this module
+        from app.ingest import insert_rows
+
+        fresh, duplicates = partition_duplicates(rows)
+        errors = [{'index': position, 'errors': DUPLICATE_ERRORS} for position in duplicates]
+        if not fresh:
+            return {'inserted': 0, 'errors': errors}
+
+        try:
+            insert_rows([rows[position] for position in fresh])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error('Bulk insert chunk failed: %s', e)
+            errors.extend({'index': position, 'errors': {'database': ['Insert failed']}}
+                          for position in fresh)
+            return {'inserted': 0, 'errors': errors}
+        invalidate_feedback_count()
+        invalidate_pages()
+        return {'inserted': len(fresh), 'errors': errors}
+
+    def get(self, feedback_id, fields=None):
+        """Return the visible feedback with ``feedback_id``, or None."""
+        # A query rather than session.get: an identity-map hit would skip the
+        # deleted_at filter
+        return _projected_query(fields).filter(Feedback.id == feedback_id).first()
+
+    def page(self, after=None, before=None, per_page=10, fields=None):
+        """
+        Return a KeysetPage, newest first (see ``keyset_paginate``), loading
+        only ``fields`` when given.
+        """
+        return keyset_paginate(_projected_query(fields), Feedback, per_page,
+                               after=after, before=before)
+
+    def count(self):
+        """Return the number of visible feedback entries."""
+        return get_feedback_count()
+
+    def generation(self):
+        """Return a number that changes on every write, in any worker."""
+        return get_feedback_generation()
+
+    def delete(self, feedback_id):
+        """Hide one feedback entry; returns False if it does not exist."""
+        return soft_delete(ids=[feedback_id]) > 0
+
+    def delete_matching(self, **filters):
+        """
+        Hide feedback by ids and/or filters (see ``build_delete_criteria``).
+
+        Returns:
+            Dict with ``deleted`` and per-id ``errors``
+        """
+        return {'deleted': soft_delete(**filters), 'errors': []}
+
+    def has_dedup_hash(self, hashes, since):
+        """Return True when one of ``hashes`` was stored since ``since``, hidden rows included."""
+        query = (db.session.query(Feedback.id)
+                 .filter(Feedback.dedup_hash.in_(hashes), Feedback.submitted_at >= since)
+                 .execution_options(include_deleted=True))
+        return query.first() is not None
+
+
+class FeedbackDocument:
+    """Read-only view of a MongoDB feedback document."""
+
+    FIELDS = Feedback.FIELDS
+
+    def __init__(self, document):
+        self.id = str(document['_id'])
+        self.name = document.get('name')
+        self.email = document.get('email')
+        self.feedback_text = document.get('feedback_text')
+        self.rating = document.get('rating')
+        self.submitted_at = document.get('submitted_at')
+
+    def to_dict(self, fields=None):
+        """Convert to the same dictionary as ``Feedback.to_dict``."""
+        data = {}
+        for field in fields or self.FIELDS:
+            value = getattr(self, field)
+            if field == 'submitted_at':
+                value = value.strftime('%Y-%m-%d %H:%M:%S')
+            data[field] = value
+        return data
+
+
+class MongoPage(KeysetPage):
+    """KeysetPage whose next cursor comes from ``FeedbackMongo.find_page``."""
+
+    def __init__(self, items, per_page, next_cursor, has_prev):
+        super().__init__(items, per_page, has_next=next_cursor is not None, has_prev=has_prev)
+        self._next_cursor = next_cursor
+
+    @property
+    def next_cursor(self):
+        return self._next_cursor
+
+    @property
+    def prev_cursor(self):
+        return None
+
+
+class MongoStorage:
+    """Feedback documents in MongoDB."""
+
+    name = 'mongo'
+    id_type = str
+    offset_pages = False
+
+    def __init__(self):
+        try:
+            from app.models_mongo import FeedbackMongo
+        except ImportError as e:
+            raise RuntimeError('STORAGE_BACKEND=mongo requires: pip install pymongo flask-pymongo') from e
+        self.model = FeedbackMongo
+
+    def parse_id(self, value):
+        """Return ``value`` as a feedback id; raises ValueError if malformed."""
+        from bson import ObjectId
+
+        if not ObjectId.is_valid(value):
+            raise ValueError(f'Invalid id: {value!r}')
+        return str(value)
+
+    def create(self, values):
+        """
+        Store one validated submission and return its id.
+
+        Raises:
+            DuplicateFeedback: If its ``dedup_hash`` is already stored
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        try:
+            feedback_id = self.model.create(**values)
+        except DuplicateKeyError as e:
+            raise DuplicateFeedback() from e
+        invalidate_pages()
+        return str(feedback_id)
+
+    def create_many(self, rows):
+        """
+        Store validated submissions with unordered ``insert_many`` batches.
+
+        Returns:
+            Dict with ``inserted`` and ``errors`` (``index`` into ``rows``
+            and a form-style ``errors`` dict)
+        """
+        from app.models_mongo import DUPLICATE_KEY
+
+        assign_dedup_hashes(rows)
+        try:
+            outcome = self.model.create_many(rows)
+        except Exception as e:
+            current_app.logger.error('Bulk insert chunk failed: %s', e)
+            return {'inserted': 0, 'errors': [
+                {'index': position, 'errors': {'database': ['Insert failed']}}
+                for position in range(len(rows))]}
+
+        errors = []
+        for error in outcome['errors']:
+            if error['code'] == DUPLICATE_KEY:
+                errors.append({'index': error['index'], 'errors': DUPLICATE_ERRORS})
+            else:
+                errors.append({'index': error['index'],
+                               'errors': {'database': [error['message'] or 'Insert failed']}})
+        if outcome['inserted']:
+            invalidate_pages()
+        return {'inserted': outcome['inserted'], 'errors': errors}
+
+    def get(self, feedback_id, fields=None):
+        """Return the feedback with ``feedback_id``, or None."""
+        document = self.model.find_by_id(feedback_id, fields=fields)
+        return FeedbackDocument(document) if document else None
+
+    def page(self, after=None, before=None, per_page=10, fields=None):
+        """Return a MongoPage, newest first; only forward (``after``) cursors exist."""
+        if before is not None:
+            raise InvalidCursor('The mongo backend pages forward only')
+        documents, next_cursor = self.model.find_page(after=after, per_page=per_page,
+                                                      fields=fields)
+        return MongoPage([FeedbackDocument(d) for d in documents], per_page,
+                         next_cursor, has_prev=after is not None)
+
+    def count(self):
+        """Return the number of feedback documents (by MONGO_COUNT_STRATEGY)."""
+        return self.model.count()
+
+    def generation(self):
+        """Return a number that changes on every write, in any worker."""
+        return self.model.generation()
+
+    def delete(self, feedback_id):
+        """Delete one feedback document; returns False if it does not exist."""
+        deleted = self.model.delete(feedback_id)
+        if deleted:
+            invalidate_pages()
+        return deleted
+
+    def delete_matching(self, ids=None, email=None, start=None, end=None,
+                        min_rating=None, max_rating=None):
+        """
+        Delete feedback by ids and/or filters.
+
+        An id list alone goes through one unordered ``bulk_write`` per batch;
+        with filters the documents are removed by one ``delete_many``.
+
+        Returns:
+            Dict with ``deleted`` and per-id ``errors``
+
+        Raises:
+            ValueError: When no criterion is given
+        """
+        filters = {}
+        if email is not None:
+            filters['email'] = email
+        if start is not None or end is not None:
+            filters['submitted_at'] = {k: v for k, v in (('$gte', start), ('$lt', end))
+                                       if v is not None}
+        if min_rating is not None or max_rating is not None:
+            filters['rating'] = {k: v for k, v in (('$gte', min_rating), ('$lte', max_rating))
+                                 if v is not None}
+        if ids is None and not filters:
+            raise ValueError('Refusing to delete without ids or filters')
+
+        if not filters:
+            outcome = self.model.delete_many(ids)
+        else:
+            from bson import ObjectId
+
+            outcome = {'deleted': 0, 'errors': []}
+            if ids is not None:
+                valid = []
+                for index, feedback_id in enumerate(ids):
+                    if ObjectId.is_valid(feedback_id):
+                        valid.append(ObjectId(feedback_id))
+                    else:
+                        outcome['errors'].append({'index': index, 'code': None,
+                                                  'message': f'Invalid id: {feedback_id!r}'})
+                filters['_id'] = {'$in': valid}
+            outcome['deleted'] = self.model.delete_matching(filters)
+
+        if outcome['deleted']:
+            invalidate_pages()
+        return outcome
+
+    def has_dedup_hash(self, hashes, since):
+        """Return True when one of ``hashes`` was stored since ``since``."""
+        return self.model.has_dedup_hash(hashes, since)
+
+
+BACKENDS = {
+    'sqlalchemy': SQLAlchemyStorage,
+    'mongo': MongoStorage,
+}
+
+
+def get_storage(app=None):
+    """Return the app's feedback storage backend."""
+    app = app or current_app._get_current_object()
+    if 'feedback_storage' not in app.extensions:
+        kind = app.config.get('STORAGE_BACKEND', 'sqlalchemy')
+        if kind not in BACKENDS:
+            raise ValueError(f'Unknown STORAGE_BACKEND: {kind!r}')
+        app.extensions['feedback_storage'] = BACKENDS[kind]()
+    return app.extensions['feedback_storage']
@@ -3,7 +3,7 @@ Unit tests for application routes.
 """
 import pytest
 from app.models import Feedback
-from app import db
+from app import create_app, db
 
 class TestRoutes:
     """Test class for application routes."""
@@ -39,6 +39,36 @@ class TestRoutes:
             assert feedback.name == 'John Doe'
             assert feedback.rating == 5
 
+    def test_submit_duplicate_rejected(self, client, app):
+        """Test a repeated submission within DEDUP_WINDOW is not stored twice."""
+        data = {
+            'name': 'John Doe',
+            'email': 'john.doe@example.com',
+            'feedback_text': 'This is a great service! Keep up the good work.',
+            'rating': 5
+        }
+        client.post('/feedback/submit', data=data)
+        repeat = dict(data, email='John.Doe@Example.com',
+                      feedback_text='this is a great  service! keep up the good work.')
+        response = client.post('/feedback/submit', data=repeat, follow_redirects=True)
+        assert b'already been submitted' in response.data
+
+        client.post('/feedback/submit', data=dict(data, email='jane@example.com'))
+        with app.app_context():
+            assert Feedback.query.count() == 2
+
+    def test_dedup_index_has_no_false_negatives(self):
+        """Test the rotating Bloom index remembers every added digest."""
+        from app.dedup import RecentIndex, content_digest
+
+        index = RecentIndex(window=3600, capacity=1000, error_rate=0.01)
+        digests = [content_digest(f'user{i}@example.com', 'text') for i in range(1000)]
+        for digest in digests:
+            index.add(digest)
+        assert all(digest in index for digest in digests)
+        unseen = [content_digest(f'other{i}@example.com', 'text') for i in range(1000)]
+        assert sum(digest in index for digest in unseen) < 50
+
     def test_submit_feedback_post_invalid_email(self, client):
         """Test POST request with invalid email."""
         data = {
@@ -113,6 +143,122 @@ class TestRoutes:
         response = client.get('/feedback/view?page=2')
         assert response.status_code == 200
 
+    def test_keyset_pagination(self, client, app):
+        """Test cursor-based pagination walks every row exactly once."""
+        from app.pagination import keyset_paginate
+
+        with app.app_context():
+            for i in range(15):
+                db.session.add(Feedback(
+                    name=f"User {i}",
+                    email=f"user{i}@example.com",
+                    feedback_text=f"Test feedback number {i} with sufficient length.",
+                    rating=5
+                ))
+            db.session.commit()
+
+            first = keyset_paginate(Feedback.query, Feedback, per_page=10)
+            assert len(first.items) == 10
+            assert first.has_next and not first.has_prev
+
+            second = keyset_paginate(Feedback.query, Feedback, per_page=10,
+                                     after=first.next_cursor)
+            assert len(second.items) == 5
+            assert second.has_prev and not second.has_next
+            seen = {f.id for f in first.items} | {f.id for f in second.items}
+            assert len(seen) == 15
+
+            back = keyset_paginate(Feedback.query, Feedback, per_page=10,
+                                   before=second.prev_cursor)
+            assert [f.id for f in back.items] == [f.id for f in first.items]
+
+        response = client.get('/feedback/view?mode=keyset&per_page=10')
+        assert response.status_code == 200
+        assert b'after=' in response.data
+
+    def test_keyset_invalid_cursor(self, client):
+        """Test a malformed cursor is rejected."""
+        response = client.get('/feedback/view?after=not-a-cursor')
+        assert response.status_code == 400
+
+    def test_per_page_cap_defaults_to_config(self, app):
+        """Test the fallback cap is the MAX_ITEMS_PER_PAGE default from config."""
+        from config import Config
+        from app.pagination import clamp_per_page
+
+        del app.config['MAX_ITEMS_PER_PAGE']
+        assert clamp_per_page(10 ** 6) == Config.MAX_ITEMS_PER_PAGE
+
+    def test_per_page_is_clamped(self, client, app):
+        """Test an oversized per_page is capped at MAX_ITEMS_PER_PAGE."""
+        app.config['MAX_ITEMS_PER_PAGE'] = 5
+        with app.app_context():
+            for i in range(8):
+                db.session.add(Feedback(
+                    name=f"User {i}",
+                    email=f"user{i}@example.com",
+                    feedback_text=f"Test feedback number {i} with sufficient length.",
+                    rating=4
+                ))
+            db.session.commit()
+
+        response = client.get('/feedback/view?per_page=1000000')
+        assert response.status_code == 200
+        assert response.data.count(b'card feedback-card') == 5
+
+        response = client.get('/feedback/search?q=feedback&per_page=1000000')
+        assert response.get_json()['per_page'] == 5
+
+    def test_offset_pages_break_ties_by_id(self, client, app):
+        """Test numbered pages order rows sharing submitted_at by id, newest first."""
+        import re
+        from datetime import datetime
+
+        with app.app_context():
+            for i in range(6):
+                db.session.add(Feedback(
+                    name=f"Tied User {i}",
+                    email=f"tied{i}@example.com",
+                    feedback_text=f"Test feedback number {i} with sufficient length.",
+                    submitted_at=datetime(2024, 1, 1)
+                ))
+            db.session.commit()
+
+        names = []
+        for page in (1, 2):
+            html = client.get(f'/feedback/view?per_page=4&page={page}').get_data(as_text=True)
+            names += re.findall(r'Tied User (\d)', html)
+        assert names == ['5', '4', '3', '2', '1', '0']
+
+    def test_large_page_is_streamed(self, client, app):
+        """Test pages above STREAM_PAGE_THRESHOLD are streamed."""
+        app.config['STREAM_PAGE_THRESHOLD'] = 5
+        app.config['STREAM_BATCH_SIZE'] = 2
+        with app.app_context():
+            for i in range(15):
+                db.session.add(Feedback(
+                    name=f"User {i}",
+                    email=f"user{i}@example.com",
+                    feedback_text=f"Test feedback number {i} with sufficient length.",
+                    rating=3
+                ))
+            db.session.commit()
+
+        response = client.get('/feedback/view?per_page=10')
+        assert response.is_streamed
+        html = response.get_data()
+        assert html.count(b'card feedback-card') == 10
+        assert b'page=2' in html
+
+        response = client.get('/feedback/view?per_page=10&page=2')
+        html = response.get_data()
+        assert html.count(b'card feedback-card') == 5
+        assert b'page=1' in html and b'page=3' not in html
+
+        response = client.get('/feedback/view?mode=keyset&per_page=10')
+        assert response.is_streamed
+        assert b'after=' in response.get_data()
+
     def test_delete_feedback(self, client, app, sample_feedback):
         """Test deleting feedback."""
         with app.app_context():
@@ -170,6 +316,1542 @@ class TestModels:
         assert Feedback.validate_rating(0) == False
         assert Feedback.validate_rating(6) == False
 
+class TestAPI:
+    """Test class for the JSON REST API."""
+
+    def _seed(self, app, count=3):
+        with app.app_context():
+            for i in range(count):
+                db.session.add(Feedback(
+                    name=f"API User {i}",
+                    email=f"api{i}@example.com",
+                    feedback_text=f"Feedback number {i} for the API tests.",
+                    rating=4
+                ))
+            db.session.commit()
+
+    def test_list_with_projection(self, client, app):
+        """Test fields= limits the returned attributes."""
+        self._seed(app)
+        response = client.get('/api/feedback?fields=name,rating')
+        assert response.status_code == 200
+        assert len(response.json['items']) == 3
+        assert set(response.json['items'][0]) == {'name', 'rating'}
+
+    def test_list_cursor_pagination(self, client, app):
+        """Test cursors page through every row."""
+        self._seed(app, count=5)
+        first = client.get('/api/feedback?per_page=3&fields=id').json
+        second = client.get(f"/api/feedback?per_page=3&fields=id&after={first['next_cursor']}").json
+        ids = [f['id'] for f in first['items'] + second['items']]
+        assert sorted(ids) == [1, 2, 3, 4, 5]
+        assert not second['has_next']
+
+    def test_conditional_get(self, client, app):
+        """Test If-None-Match returns 304 until feedback changes."""
+        self._seed(app)
+        response = client.get('/api/feedback')
+        etag = response.headers['ETag']
+
+        cached = client.get('/api/feedback', headers={'If-None-Match': etag})
+        assert cached.status_code == 304
+        assert cached.data == b''
+
+        self._seed(app, count=1)
+        changed = client.get('/api/feedback', headers={'If-None-Match': etag})
+        assert changed.status_code == 200
+        assert changed.headers['ETag'] != etag
+
+    def test_get_single(self, client, app):
+        """Test fetching a single entry and a missing one."""
+        self._seed(app, count=1)
+        assert client.get('/api/feedback/1?fields=email').json == {'email': 'api0@example.com'}
+        assert client.get('/api/feedback/99').status_code == 404
+
+    def test_unknown_field(self, client):
+        """Test unknown projection fields are rejected."""
+        response = client.get('/api/feedback?fields=password')
+        assert response.status_code == 400
+        assert 'password' in response.json['error']
+
+class TestPageCache:
+    """Test class for the rendered feedback list cache."""
+
+    def test_listing_is_cached_until_write(self, client, app, sample_feedback):
+        """Test repeated reads reuse the fragment and writes invalidate it."""
+        from app.page_cache import get_page_cache
+
+        assert b'Test User' in client.get('/feedback/view').data
+        cache = get_page_cache(app)
+        assert len(cache._entries) == 1
+        client.get('/feedback/view')
+        assert len(cache._entries) == 1
+
+        client.post('/feedback/submit', data={
+            'name': 'Fresh User',
+            'email': 'fresh@example.com',
+            'feedback_text': 'Submitted after the page was cached.',
+            'rating': 5
+        })
+        assert b'Fresh User' in client.get('/feedback/view').data
+
+    def test_redis_backend(self):
+        """Test the Redis-protocol backend against a local stand-in."""
+        from app.page_cache import RedisBackend
+
+        class LocalRedis:
+            def __init__(self):
+                self.data = {}
+
+            def get(self, key):
+                return self.data.get(key)
+
+            def set(self, key, value, ex=None):
+                self.data[key] = value.encode('utf-8')
+
+            def incr(self, key):
+                self.data[key] = int(self.data.get(key, 0)) + 1
+                return self.data[key]
+
+        backend = RedisBackend(client=LocalRedis())
+        assert backend.generation() == 0
+        backend.set('k', '<p>cached</p>')
+        assert backend.get('k') == '<p>cached</p>'
+        backend.bump()
+        assert backend.generation() == 1
+
+class TestBulkIngest:
+    """Test class for bulk feedback ingestion."""
+
+    valid_row = {
+        'name': 'Kiosk User',
+        'email': 'kiosk@example.com',
+        'feedback_text': 'Submitted from the lobby kiosk.',
+        'rating': 4
+    }
+
+    @pytest.fixture(autouse=True)
+    def admin_client(self, app, client):
+        app.config['ADMIN_TOKEN'] = 'importer'
+        client.environ_base['HTTP_AUTHORIZATION'] = 'Bearer importer'
+
+    def test_bulk_requires_admin_token(self, client, app):
+        """Test bulk import is refused without the admin token."""
+        del client.environ_base['HTTP_AUTHORIZATION']
+        assert client.post('/feedback/bulk', json=[self.valid_row]).status_code == 403
+        with app.app_context():
+            assert Feedback.query.count() == 0
+
+    def test_bulk_rejects_large_body(self, client, app):
+        """Test a body over BULK_INGEST_MAX_BYTES is refused before any row is read."""
+        app.config['BULK_INGEST_MAX_BYTES'] = 100
+        response = client.post('/feedback/bulk', json=[self.valid_row] * 5)
+        assert response.status_code == 413
+        with app.app_context():
+            assert Feedback.query.count() == 0
+
+    def test_bulk_json(self, client, app):
+        """Test a JSON array is inserted and bad rows are reported."""
+        rows = [self.valid_row, dict(self.valid_row, email='bad'),
+                dict(self.valid_row, feedback_text='Submitted from the second kiosk.')]
+        response = client.post('/feedback/bulk?chunk_size=2', json=rows)
+        assert response.status_code == 200
+        assert response.json['inserted'] == 2
+        assert response.json['failed'] == 1
+        assert response.json['errors'][0]['row'] == 1
+        assert 'email' in response.json['errors'][0]['errors']
+
+        with app.app_context():
+            assert Feedback.query.count() == 2
+
+    def test_bulk_ndjson(self, client, app):
+        """Test an NDJSON body with a malformed line."""
+        import json
+        second = dict(self.valid_row, email='kiosk2@example.com')
+        body = '\n'.join([json.dumps(self.valid_row), '{not json', json.dumps(second)])
+        response = client.post('/feedback/bulk', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        assert response.json['inserted'] == 2
+        assert response.json['errors'][0]['row'] == 1
+
+    def test_bulk_ndjson_invalid_utf8(self, client, app):
+        """Test a line that is not UTF-8 is reported without losing the other rows."""
+        import json
+        second = dict(self.valid_row, email='kiosk2@example.com')
+        body = b'\n'.join([json.dumps(self.valid_row).encode(), b'{"name": "\xff\xfe"}',
+                           json.dumps(second).encode()])
+        response = client.post('/feedback/bulk', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        assert response.json['inserted'] == 2
+        assert response.json['errors'][0]['row'] == 1
+        assert response.json['errors'][0]['errors']['row'][0].startswith('Invalid UTF-8')
+
+    def test_bulk_offset_timestamp_stored_as_utc(self, client, app):
+        """Test a submitted_at with a UTC offset is stored as naive UTC."""
+        from datetime import datetime
+        row = dict(self.valid_row, submitted_at='2024-01-01T10:00:00+05:00')
+        assert client.post('/feedback/bulk', json=[row]).json['inserted'] == 1
+        with app.app_context():
+            assert Feedback.query.one().submitted_at == datetime(2024, 1, 1, 5, 0)
+
+    def test_bulk_skips_duplicates(self, client, app):
+        """Test repeats within a batch and of stored rows are reported."""
+        repeat = dict(self.valid_row, email='KIOSK@example.com',
+                      feedback_text='Submitted  from the lobby KIOSK.')
+        response = client.post('/feedback/bulk', json=[self.valid_row, repeat])
+        assert response.json['inserted'] == 1
+        assert response.json['errors'] == [
+            {'row': 1, 'errors': {'feedback_text': ['Duplicate submission']}}
+        ]
+
+        response = client.post('/feedback/bulk', json=[self.valid_row])
+        assert response.json['inserted'] == 0
+
+        with app.app_context():
+            assert Feedback.query.count() == 1
+
+    def test_bulk_rejects_non_list(self, client):
+        """Test a body that is not a list of rows is rejected."""
+        response = client.post('/feedback/bulk', json={'name': 'x'})
+        assert response.status_code == 400
+
+    def test_import_cli(self, app, runner, tmp_path):
+        """Test the flask feedback import command."""
+        import json
+        source = tmp_path / 'rows.ndjson'
+        source.write_text('\n'.join(
+            json.dumps(dict(self.valid_row, name=f'Kiosk {i}', email=f'kiosk{i}@example.com'))
+            for i in range(3)
+        ))
+
+        result = runner.invoke(args=['feedback', 'import', str(source), '--chunk-size', '2'])
+        assert 'Imported 3 rows, 0 failed.' in result.output
+
+        with app.app_context():
+            assert Feedback.query.count() == 3
+
+class TestSearch:
+    """Test class for full-text search."""
+
+    def _seed(self, app):
+        with app.app_context():
+            texts = [
+                "The checkout page was slow and crashed twice.",
+                "Delivery was fast, the courier was friendly.",
+                "Slow delivery, slow support, slow everything.",
+            ]
+            for i, text in enumerate(texts):
+                db.session.add(Feedback(
+                    name=f"Searcher {i}",
+                    email=f"searcher{i}@example.com",
+                    feedback_text=text,
+                    rating=3
+                ))
+            db.session.commit()
+
+    def test_search_ranks_matches(self, client, app):
+        """Test matching rows are returned best match first."""
+        self._seed(app)
+        response = client.get('/feedback/search?q=slow')
+        assert response.status_code == 200
+        items = response.json['items']
+        assert len(items) == 2
+        assert items[0]['name'] == 'Searcher 2'
+
+    def test_search_paginates(self, client, app):
+        """Test search results are paginated."""
+        self._seed(app)
+        first = client.get('/feedback/search?q=slow&per_page=1').json
+        assert len(first['items']) == 1 and first['has_next']
+        second = client.get('/feedback/search?q=slow&per_page=1&page=2').json
+        assert len(second['items']) == 1 and not second['has_next']
+
+    def test_search_index_follows_deletes(self, client, app):
+        """Test deleted rows drop out of the search index."""
+        self._seed(app)
+        with app.app_context():
+            db.session.delete(Feedback.query.filter_by(name='Searcher 1').one())
+            db.session.commit()
+        assert client.get('/feedback/search?q=courier').json['items'] == []
+
+    def test_search_ignores_query_syntax(self, client, app):
+        """Test FTS operators in user input are treated as plain words."""
+        self._seed(app)
+        response = client.get('/feedback/search?q=slow%22%20OR%20(')
+        assert response.status_code == 200
+        assert client.get('/feedback/search?q=%22%22').json['items'] == []
+
+class TestWriteQueue:
+    """Test class for write-behind submissions."""
+
+    @pytest.fixture()
+    def queued_app(self, app, tmp_path, monkeypatch):
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'testing-write-behind', type(
+            'WriteBehindTestingConfig', (TestingConfig,), {
+                'WRITE_BEHIND': True,
+                'WRITE_QUEUE_WORKER': False,
+                'WRITE_QUEUE_PATH': str(tmp_path / 'queue.db'),
+            }))
+        return create_app('testing-write-behind')
+
+    def test_submit_is_spooled_then_flushed(self, queued_app):
+        """Test a submission is queued, then stored by a flush."""
+        from app.write_queue import flush
+
+        client = queued_app.test_client()
+        response = client.post('/feedback/submit', data={
+            'name': 'Queued User',
+            'email': 'queued@example.com',
+            'feedback_text': 'This submission goes through the write queue.',
+            'rating': 4
+        })
+        assert response.status_code == 302
+        token = response.headers['X-Feedback-Receipt']
+        assert client.get(f'/feedback/queue/{token}').json['status'] == 'queued'
+
+        with queued_app.app_context():
+            assert Feedback.query.count() == 0
+            assert flush() == 1
+            assert Feedback.query.filter_by(email='queued@example.com').count() == 1
+
+        assert client.get(f'/feedback/queue/{token}').json['status'] == 'stored'
+        assert client.get('/feedback/queue').json['pending'] == 0
+
+    def test_expired_claims_are_retried(self, tmp_path):
+        """Test rows claimed by a dead worker are delivered again."""
+        from app.write_queue import WriteQueue
+
+        path = str(tmp_path / 'queue.db')
+        dead = WriteQueue(path, lease=0)
+        dead.enqueue({'name': 'A', 'email': 'a@example.com', 'feedback_text': 'x' * 10, 'rating': None})
+        assert len(dead.claim(10)) == 1
+
+        survivor = WriteQueue(path, lease=0)
+        claimed = survivor.claim(10)
+        assert len(claimed) == 1
+        survivor.mark_flushed([row_id for row_id, _ in claimed])
+        assert survivor.claim(10) == []
+
+    def test_rejected_row_is_isolated_then_dead_lettered(self, queued_app):
+        """Test a bad row neither blocks its batch nor is retried forever."""
+        from app.write_queue import flush, get_write_queue
+
+        queued_app.config.update(WRITE_QUEUE_LEASE=0, WRITE_QUEUE_MAX_ATTEMPTS=2)
+        with queued_app.app_context():
+            queue = get_write_queue()
+            good = queue.enqueue({'name': 'Good', 'email': 'good@example.com',
+                                  'feedback_text': 'This row is fine to store.', 'rating': 5})
+            bad = queue.enqueue({'name': 'Bad', 'email': 'bad@example.com',
+                                 'feedback_text': None, 'rating': 1})
+
+            assert flush() == 2
+            assert Feedback.query.filter_by(email='good@example.com').count() == 1
+            assert queue.status(good) == 'stored'
+            assert queue.status(bad) == 'queued'
+
+            assert flush() == 1
+            assert queue.status(bad) == 'failed'
+            assert flush() == 0
+            assert queue.stats()['pending'] == 0
+            assert queue.stats()['dead'] == 1
+
+    def test_flush_worker_starts_on_first_request(self, monkeypatch, tmp_path):
+        """Test the flusher starts in the serving process, not in create_app."""
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'testing-write-behind-worker', type(
+            'WriteBehindWorkerTestingConfig', (TestingConfig,), {
+                'WRITE_BEHIND': True,
+                'WRITE_QUEUE_PATH': str(tmp_path / 'queue.db'),
+            }))
+        app = create_app('testing-write-behind-worker')
+        assert 'write_queue_worker' not in app.extensions
+
+        app.test_client().get('/feedback/queue')
+        worker = app.extensions['write_queue_worker']
+        try:
+            assert worker.is_alive()
+
+            # Later requests see the live worker without taking the start lock
+            class NoLock:
+                def __enter__(self):
+                    raise AssertionError('start lock taken for a live worker')
+
+                def __exit__(self, *exc):
+                    return False
+
+            monkeypatch.setattr('app.write_queue._start_lock', NoLock())
+            app.test_client().get('/feedback/queue')
+            assert app.extensions['write_queue_worker'] is worker
+        finally:
+            worker.stop()
+            worker.join(5)
+
+class TestExport:
+    """Test class for streaming feedback export."""
+
+    def _seed(self, app):
+        with app.app_context():
+            for rating in (1, 3, 5):
+                db.session.add(Feedback(
+                    name=f"Rater {rating}",
+                    email=f"rater{rating}@example.com",
+                    feedback_text="Feedback written for the export tests.",
+                    rating=rating
+                ))
+            db.session.commit()
+
+    def test_export_csv(self, client, app):
+        """Test CSV export streams a header and every row."""
+        self._seed(app)
+        response = client.get('/feedback/export?format=csv')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        lines = response.data.decode().strip().splitlines()
+        assert lines[0] == 'id,name,email,feedback_text,rating,submitted_at'
+        assert len(lines) == 4
+
+    def test_export_ndjson_rating_filter(self, client, app):
+        """Test NDJSON export honours rating filters."""
+        import json
+        self._seed(app)
+        response = client.get('/feedback/export?format=ndjson&min_rating=3')
+        rows = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert sorted(row['rating'] for row in rows) == [3, 5]
+
+    def test_export_offset_filter_is_utc(self, client, app):
+        """Test a start bound with a UTC offset is compared as UTC."""
+        import json
+        from datetime import datetime
+        with app.app_context():
+            db.session.add(Feedback(name='Early', email='early@example.com', rating=4,
+                                    feedback_text='Feedback written for the export tests.',
+                                    submitted_at=datetime(2024, 1, 1, 6, 0)))
+            db.session.commit()
+        # 10:00+05:00 is 05:00 UTC, before the row
+        response = client.get('/feedback/export?format=ndjson&end=2024-01-01T10:00:00%2B05:00')
+        assert response.data.decode().strip() == ''
+        response = client.get('/feedback/export?format=ndjson&end=2024-01-01T12:00:00%2B05:00')
+        assert [json.loads(line)['name'] for line in response.data.decode().splitlines()] == ['Early']
+
+    def test_export_bad_filter(self, client):
+        """Test invalid filters are rejected."""
+        assert client.get('/feedback/export?format=xml').status_code == 400
+        assert client.get('/feedback/export?start=yesterday').status_code == 400
+
+    def test_export_cli(self, app, runner):
+        """Test the flask feedback export command."""
+        self._seed(app)
+        result = runner.invoke(args=['feedback', 'export', '--format', 'ndjson', '--max-rating', '1'])
+        assert result.exit_code == 0
+        assert result.output.count('\n') == 1
+        assert 'rater1@example.com' in result.output
+
+class TestAnalytics:
+    """Test class for precomputed rating analytics."""
+
+    def _add(self, rating, submitted_at):
+        feedback = Feedback(
+            name="Stats User",
+            email="stats@example.com",
+            feedback_text="Feedback written for the stats tests.",
+            rating=rating,
+            submitted_at=submitted_at
+        )
+        db.session.add(feedback)
+        return feedback
+
+    def test_stats_follow_inserts_and_deletes(self, client, app):
+        """Test the rollup is maintained on insert and delete."""
+        from datetime import datetime
+
+        with app.app_context():
+            self._add(5, datetime(2024, 1, 1, 9))
+            self._add(3, datetime(2024, 1, 1, 17))
+            doomed = self._add(None, datetime(2024, 1, 3, 12))
+            db.session.commit()
+            db.session.delete(doomed)
+            self._add(1, datetime(2024, 1, 8, 12))
+            db.session.commit()
+
+        stats = client.get('/feedback/stats').json
+        assert [b['start'] for b in stats['buckets']] == ['2024-01-01', '2024-01-08']
+        assert stats['buckets'][0]['average'] == 4.0
+        assert stats['buckets'][0]['histogram']['5'] == 1
+        assert stats['overall']['count'] == 3
+
+        weekly = client.get('/feedback/stats?bucket=week&start=2024-01-02').json
+        assert [b['start'] for b in weekly['buckets']] == ['2024-01-08']
+        assert weekly['overall']['average'] == 1.0
+
+    def test_backfill_matches_incremental(self, app, runner):
+        """Test the backfill command rebuilds the same rollup."""
+        from datetime import datetime
+        from app.analytics import rating_stats
+
+        with app.app_context():
+            self._add(4, datetime(2024, 2, 1))
+            self._add(None, datetime(2024, 2, 2))
+            db.session.commit()
+            before = rating_stats()
+
+            result = runner.invoke(args=['feedback', 'backfill-stats'])
+            assert 'Rebuilt 2 rating buckets.' in result.output
+            assert rating_stats() == before
+
+    def test_stats_bad_bucket(self, client):
+        """Test an unknown bucket is rejected."""
+        assert client.get('/feedback/stats?bucket=year').status_code == 400
+
+class TestCounters:
+    """Test class for the maintained feedback counter."""
+
+    def test_counter_tracks_inserts_and_deletes(self, app):
+        """Test the summary counter follows ORM inserts and deletes."""
+        from app.counters import get_feedback_count
+
+        with app.app_context():
+            assert get_feedback_count() == 0
+
+            feedback = Feedback(
+                name="Counter Test",
+                email="counter@test.com",
+                feedback_text="Testing the maintained counter.",
+                rating=3
+            )
+            db.session.add(feedback)
+            db.session.commit()
+            assert get_feedback_count() == 1
+
+            db.session.delete(feedback)
+            db.session.commit()
+            assert get_feedback_count() == 0
+
+    def test_counter_seeds_from_existing_rows(self, app, sample_feedback):
+        """Test the counter is seeded from rows written before first use."""
+        from app.counters import get_feedback_count
+
+        with app.app_context():
+            assert get_feedback_count() == 1
+
+    def test_concurrent_seed_rereads_counter(self, app, sample_feedback, monkeypatch):
+        """Test losing the race to seed the counter re-reads the winner's row."""
+        from app.counters import get_feedback_count, sync_feedback_count
+        from app.models import FeedbackCounter
+
+        with app.app_context():
+            assert get_feedback_count() == 1
+            get = db.session.get
+            # Another worker inserted the row after this one looked for it
+            monkeypatch.setattr(db.session, 'get', lambda model, key: None
+                                if model is FeedbackCounter else get(model, key))
+            assert sync_feedback_count() == 1
+
+    def test_index_shows_count(self, client, sample_feedback):
+        """Test the home page renders the maintained count."""
+        response = client.get('/')
+        assert response.status_code == 200
+        assert b'>1</h2>' in response.data
+
+class TestDeletion:
+    """Test class for soft deletion, bulk deletion and purging."""
+
+    def _seed(self, app):
+        with app.app_context():
+            for i in range(6):
+                db.session.add(Feedback(
+                    name=f"User {i}",
+                    email="spam@example.com" if i % 2 else f"user{i}@example.com",
+                    feedback_text=f"Feedback number {i} with sufficient length.",
+                    rating=1 if i % 2 else 5
+                ))
+            db.session.commit()
+            return [f.id for f in Feedback.query.order_by(Feedback.id)]
+
+    def test_bulk_delete_hides_rows(self, client, app):
+        """Test bulk delete by filter hides rows and adjusts the summaries."""
+        from app.counters import get_feedback_count
+        from app.analytics import rating_stats
+
+        ids = self._seed(app)
+        app.config['ADMIN_TOKEN'] = 'moderator'
+        headers = {'Authorization': 'Bearer moderator'}
+        response = client.post('/feedback/delete', json={'email': 'spam@example.com'},
+                               headers=headers)
+        assert response.get_json() == {'deleted': 3}
+
+        response = client.post('/feedback/delete', json={'ids': ids[:2]}, headers=headers)
+        assert response.get_json() == {'deleted': 1}
+
+        with app.app_context():
+            assert get_feedback_count() == 2
+            assert Feedback.query.count() == 2
+            assert db.session.get(Feedback, ids[1]) is None
+            hidden = Feedback.query.execution_options(include_deleted=True).count()
+            assert hidden == 6
+            assert rating_stats()['overall']['count'] == 2
+
+        response = client.get('/api/feedback')
+        assert len(response.get_json()['items']) == 2
+
+    def test_bulk_delete_requires_criteria(self, client, app):
+        """Test bulk delete refuses an empty, malformed or unbounded request."""
+        app.config['ADMIN_TOKEN'] = 'moderator'
+
+        def delete(payload):
+            return client.post('/feedback/delete', json=payload,
+                               headers={'Authorization': 'Bearer moderator'}).status_code
+
+        assert delete({}) == 400
+        assert delete({'ids': 'all'}) == 400
+        assert delete({'ids': [True]}) == 400
+        assert delete({'email': ['spam@example.com']}) == 400
+        assert delete({'start': 'yesterday'}) == 400
+        assert delete({'start': '1970-01-01'}) == 400
+        assert delete({'start': '1970-01-01', 'end': '2100-01-01'}) == 400
+        assert delete({'start': '2024-01-01', 'end': '2024-02-08T00:00:00+00:00'}) == 400
+        assert delete({'start': '2024-01-01', 'end': '2024-01-08T05:00:00+05:00'}) == 200
+
+    def test_bulk_delete_requires_admin_token(self, client, app):
+        """Test bulk delete is refused without the configured bearer token."""
+        ids = self._seed(app)
+        payload = {'ids': ids}
+        assert client.post('/feedback/delete', json=payload).status_code == 403
+
+        app.config['ADMIN_TOKEN'] = 'moderator'
+        assert client.post('/feedback/delete', json=payload).status_code == 403
+        assert client.post('/feedback/delete', json=payload,
+                           headers={'Authorization': 'Bearer guess'}).status_code == 403
+        with app.app_context():
+            assert Feedback.query.count() == 6
+
+    def test_purge_removes_old_deleted_rows(self, app, runner):
+        """Test the purge job hard-deletes hidden rows in batches."""
+        from app.deletion import soft_delete, purge_deleted
+        from app.counters import get_feedback_count
+
+        ids = self._seed(app)
+        with app.app_context():
+            soft_delete(ids=ids[:4])
+            assert purge_deleted(retention=3600) == 0
+            assert purge_deleted(retention=0, batch_size=3, max_batches=1) == 3
+
+            result = runner.invoke(args=['feedback', 'purge', '--retention', '0'])
+            assert 'Purged 1 deleted rows.' in result.output
+
+            remaining = Feedback.query.execution_options(include_deleted=True).count()
+            assert remaining == 2
+            assert get_feedback_count() == 2
+
+    def test_listing_is_planned_on_submitted_at_index(self, app):
+        """Test the soft-delete filter does not steer listings onto ix_feedback_deleted_at."""
+        from sqlalchemy import event
+
+        self._seed(app)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', capture)
+            try:
+                Feedback.query.order_by(Feedback.submitted_at.desc(), Feedback.id.desc()).limit(10).all()
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', capture)
+            statement, parameters = statements[-1]
+            assert 'deleted_at IS NULL' in statement
+            plan = db.session.connection().exec_driver_sql(
+                'EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+        details = ' '.join(row[-1] for row in plan)
+        assert 'ix_feedback_submitted_at_id' in details
+        assert 'TEMP B-TREE' not in details
+
+class TestRateLimit:
+    """Test class for submission rate limiting."""
+
+    def _submit(self, client, i, email='flood@example.com', ip='10.0.0.1'):
+        return client.post('/feedback/submit', environ_base={'REMOTE_ADDR': ip}, data={
+            'name': 'Flooder',
+            'email': email,
+            'feedback_text': f'Automated submission number {i}.',
+        })
+
+    def test_ip_bucket(self, client, app):
+        """Test an IP is throttled after the burst without touching the database."""
+        app.config['RATE_LIMIT_BURST'] = 3
+        statuses = [self._submit(client, i, email=f'u{i}@example.com').status_code
+                    for i in range(4)]
+        assert statuses == [302, 302, 302, 429]
+
+        response = self._submit(client, 9, email='x@example.com')
+        assert int(response.headers['Retry-After']) >= 1
+        assert self._submit(client, 10, email='y@example.com', ip='10.0.0.2').status_code == 302
+
+        with app.app_context():
+            assert Feedback.query.count() == 4
+
+    def test_email_bucket(self, client, app):
+        """Test one email is throttled across client IPs, case-insensitively."""
+        app.config['RATE_LIMIT_BURST'] = 2
+        assert self._submit(client, 0, ip='10.0.0.1').status_code == 302
+        assert self._submit(client, 1, ip='10.0.0.2').status_code == 302
+        response = self._submit(client, 2, email='FLOOD@example.com', ip='10.0.0.3')
+        assert response.status_code == 429
+
+    def test_refused_submission_is_not_charged(self, client, app):
+        """Test a request refused by one bucket spends no token from the other."""
+        app.config['RATE_LIMIT_BURST'] = 2
+        assert self._submit(client, 0, email='victim@example.com', ip='10.0.0.1').status_code == 302
+        assert self._submit(client, 1, email='victim@example.com', ip='10.0.0.2').status_code == 302
+        # The email bucket is empty; 10.0.0.1 keeps its remaining token
+        assert self._submit(client, 2, email='victim@example.com', ip='10.0.0.1').status_code == 429
+        assert self._submit(client, 3, email='other@example.com', ip='10.0.0.1').status_code == 302
+
+    def test_client_ip_behind_proxy(self, app, monkeypatch):
+        """Test clients behind a trusted proxy get their own IP buckets."""
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'testing-proxy', type('ProxyTestingConfig', (TestingConfig,), {
+            'PROXY_FIX_HOPS': 1,
+            'RATE_LIMIT_BURST': 1,
+        }))
+        client = create_app('testing-proxy').test_client()
+
+        def submit(i, forwarded_for):
+            return client.post('/feedback/submit', environ_base={'REMOTE_ADDR': '10.0.0.254'},
+                               headers={'X-Forwarded-For': forwarded_for}, data={
+                'name': 'Proxied',
+                'email': f'u{i}@example.com',
+                'feedback_text': f'Submission through the router {i}.',
+            })
+
+        assert submit(0, '203.0.113.1').status_code == 302
+        assert submit(1, '203.0.113.2').status_code == 302
+        assert submit(2, '203.0.113.1').status_code == 429
+        # Only the last hop is trusted: a spoofed first entry does not help
+        assert submit(3, '198.51.100.7, 203.0.113.1').status_code == 429
+
+    def test_memory_limiter_refills(self):
+        """Test tokens are refilled at the configured rate."""
+        from app.ratelimit import MemoryLimiter
+
+        limiter = MemoryLimiter(maxsize=2)
+        assert limiter.take('a', rate=1000, burst=1) == (True, 0.0)
+        allowed, retry_after = limiter.take('a', rate=0.5, burst=1)
+        assert not allowed and 0 < retry_after <= 2
+        limiter.take('b', rate=1, burst=1)
+        limiter.take('c', rate=1, burst=1)
+        assert 'a' not in limiter._buckets
+
+    def test_redis_limiter(self):
+        """Test the shared-store backend's script on a Lua-capable fake Redis server."""
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        from app.ratelimit import RedisLimiter
+
+        client = fakeredis.FakeRedis()
+        limiter = RedisLimiter(client=client)
+        assert limiter.take('ip:1', rate=0.1, burst=2) == (True, 0.0)
+        assert limiter.take('ip:1', rate=0.1, burst=2)[0]
+        allowed, retry_after = limiter.take('ip:1', rate=0.1, burst=2)
+        assert not allowed and 9 < retry_after <= 10
+        assert 0 < client.pttl('feedback:ratelimit:ip:1') <= 20000
+
+        # Both buckets are checked before either is charged
+        assert limiter.take('ip:2', 'email:a', rate=0.1, burst=2) == (True, 0.0)
+        assert not limiter.take('ip:1', 'email:a', rate=0.1, burst=2)[0]
+        assert limiter.take('email:a', rate=0.1, burst=2)[0]
+
+class TestPool:
+    """Test class for connection pool configuration and metrics."""
+
+    def test_engine_options_from_environment(self, monkeypatch):
+        """Test pool settings are read from the environment."""
+        from config import build_engine_options
+
+        monkeypatch.setenv('DB_POOL_SIZE', '8')
+        monkeypatch.setenv('DB_STATEMENT_TIMEOUT_MS', '5000')
+        options = build_engine_options('postgresql://db.internal/feedback')
+        assert options['pool_size'] == 8
+        assert options['pool_pre_ping'] is True
+        assert options['connect_args'] == {'options': '-c statement_timeout=5000'}
+
+    def test_engine_options_pgbouncer(self, monkeypatch):
+        """Test PgBouncer mode disables client-side pooling and startup options."""
+        from sqlalchemy.pool import NullPool
+        from config import build_engine_options
+
+        monkeypatch.setenv('DB_PGBOUNCER', 'true')
+        options = build_engine_options('postgresql://db.internal/feedback')
+        assert options['poolclass'] is NullPool
+        assert 'connect_args' not in options
+
+    def test_production_config_on_sqlite(self, monkeypatch, tmp_path):
+        """Test the production config works with a SQLite DATABASE_URL."""
+        import importlib
+        import config as config_module
+
+        monkeypatch.setenv('DATABASE_URL', f'sqlite:///{tmp_path}/feedback.db')
+        monkeypatch.setenv('DB_STATEMENT_TIMEOUT_MS', '5000')
+        try:
+            importlib.reload(config_module)
+            assert config_module.ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS == {}
+            app = create_app('production')
+            with app.app_context():
+                db.create_all()
+                assert db.session.execute(db.text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert app.test_client().get('/').status_code == 200
+        finally:
+            monkeypatch.undo()
+            importlib.reload(config_module)
+
+    def test_pool_metrics(self, client, sample_feedback):
+        """Test pool metrics are exposed."""
+        client.get('/feedback/view')
+        metrics = client.get('/metrics/pool').json
+        assert metrics['checkout'] >= 1
+        assert 'pool_class' in metrics
+
+class TestMetrics:
+    """Test class for request, SQL and template instrumentation."""
+
+    def test_server_timing_header(self, client, sample_feedback):
+        """Test responses carry app, db and template timings."""
+        response = client.get('/feedback/view')
+        timing = response.headers['Server-Timing']
+        assert timing.startswith('app;dur=')
+        assert 'db;dur=' in timing and 'tpl;dur=' in timing
+        assert ' 0 queries' not in timing
+
+    def test_prometheus_endpoint(self, client, sample_feedback):
+        """Test per-endpoint histograms are exposed in the text format."""
+        client.get('/feedback/view')
+        client.get('/feedback/view')
+        response = client.get('/metrics')
+        assert response.mimetype == 'text/plain'
+        text = response.get_data(as_text=True)
+        assert '# TYPE feedback_http_request_duration_seconds histogram' in text
+        assert ('feedback_http_request_duration_seconds_count'
+                '{endpoint="main.view_feedback",method="GET"} 2') in text
+        assert ('feedback_http_requests_total'
+                '{endpoint="main.view_feedback",method="GET",status="200"} 2') in text
+        assert 'feedback_http_request_sql_queries_bucket{endpoint="main.view_feedback",le="+Inf"} 2' in text
+        assert 'feedback_template_render_seconds_count{template="view_feedback.html"} 2' in text
+
+    def test_query_timing_shares_one_listener_pair(self, app):
+        """Test metrics and slow-query logging time statements through one listener pair."""
+        from sqlalchemy.exc import OperationalError
+        from app.metrics import observe_queries
+
+        assert len(list(db.engine.dispatch.before_cursor_execute)) == 1
+        assert len(list(db.engine.dispatch.after_cursor_execute)) == 1
+
+        seen = []
+        observe_queries(db.engine, lambda statement, executemany, elapsed: seen.append(statement))
+        with pytest.raises(OperationalError):
+            db.session.execute(db.text('SELECT * FROM no_such_table'))
+        db.session.rollback()
+        db.session.execute(db.text('SELECT 1'))
+        assert seen == ['SELECT 1']
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test bucket counts include every smaller observation."""
+        from app.metrics import Histogram
+
+        histogram = Histogram('h', 'help', ('endpoint',), buckets=(1, 5))
+        for value in (0.5, 1, 3, 7):
+            histogram.observe(('e',), value)
+        samples = {f'{name}{labels}': value for name, labels, value in histogram.samples()}
+        assert samples['h_bucket{endpoint="e",le="1"}'] == 2
+        assert samples['h_bucket{endpoint="e",le="5"}'] == 3
+        assert samples['h_bucket{endpoint="e",le="+Inf"}'] == 4
+        assert samples['h_sum{endpoint="e"}'] == 11.5
+
+class TestLogging:
+    """Test class for structured logging."""
+
+    def _configure(self, app):
+        import io
+        from app.logs import configure_logging
+
+        stream = io.StringIO()
+        handler = configure_logging(app, stream=stream)
+        return stream, handler
+
+    def _records(self, app, stream):
+        import json
+        from app.logs import stop_logging
+
+        stop_logging(app)  # flushes the queue
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    def test_errors_are_logged_as_json_with_request_id(self, client, app, monkeypatch):
+        """Test a failed submission is logged with its request id and traceback."""
+        stream, _ = self._configure(app)
+
+        def fail():
+            raise RuntimeError('database is down')
+        monkeypatch.setattr(db.session, 'commit', fail)
+
+        response = client.post('/feedback/submit', headers={'X-Request-ID': 'req-123'}, data={
+            'name': 'John Doe',
+            'email': 'john.doe@example.com',
+            'feedback_text': 'This is a great service! Keep up the good work.',
+        })
+        assert response.headers['X-Request-ID'] == 'req-123'
+
+        records = self._records(app, stream)
+        assert records[-1]['message'] == 'Feedback submission failed'
+        assert records[-1]['level'] == 'ERROR'
+        assert records[-1]['request_id'] == 'req-123'
+        assert 'RuntimeError: database is down' in records[-1]['exception']
+
+    def test_request_id_is_generated(self, client):
+        """Test a missing or malformed request id is replaced."""
+        response = client.get('/', headers={'X-Request-ID': 'bad id; with spaces'})
+        assert len(response.headers['X-Request-ID']) == 32
+
+    def test_full_queue_drops_records(self, app):
+        """Test logging never blocks while the listener is stalled on its output."""
+        import threading
+        from app.logs import configure_logging, stop_logging
+
+        class StalledStream:
+            def __init__(self):
+                self.writing = threading.Event()
+                self.resume = threading.Event()
+
+            def write(self, text):
+                self.writing.set()
+                self.resume.wait(5)
+
+            def flush(self):
+                pass
+
+        app.config['LOG_QUEUE_SIZE'] = 1
+        stream = StalledStream()
+        handler = configure_logging(app, stream=stream)
+        app.logger.warning('first')  # taken by the listener, which then stalls
+        assert stream.writing.wait(5)
+        app.logger.warning('second')  # fills the queue
+        app.logger.warning('third')
+        assert handler.dropped == 1
+
+        stream.resume.set()
+        stop_logging(app)
+        assert handler.queue.empty()
+
+    def test_listener_is_per_app(self, app):
+        """Test configuring a second app leaves the first app's listener running."""
+        import io
+        import logging
+        from app.logs import configure_logging, stop_logging
+
+        other = create_app('testing')
+        first, handler = self._configure(app)
+        configure_logging(other, stream=io.StringIO())
+        try:
+            assert app.extensions['log_listener'] is not other.extensions['log_listener']
+            handler.handle(logging.makeLogRecord({'msg': 'still logging', 'levelno': logging.WARNING,
+                                                  'levelname': 'WARNING'}))
+            assert self._records(app, first)[-1]['message'] == 'still logging'
+        finally:
+            stop_logging(other)
+
+    def test_slow_queries_are_logged(self, monkeypatch):
+        """Test statements over SLOW_QUERY_MS are logged."""
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'slow_queries', type('SlowQueryConfig', (TestingConfig,), {
+            'SLOW_QUERY_MS': 0, 'SLOW_QUERY_SAMPLE_RATE': 1.0,
+        }))
+        app = create_app('slow_queries')
+        stream, _ = self._configure(app)
+        with app.app_context():
+            db.session.execute(db.text('SELECT 1'))
+        records = self._records(app, stream)
+        assert any(r['message'] == 'Slow query' and r['statement'] == 'SELECT 1' for r in records)
+
+class TestSQLiteProfile:
+    """Test class for the SQLite production profile."""
+
+    def _app(self, tmp_path, monkeypatch):
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'sqlite-production', type(
+            'SQLiteProductionConfig', (TestingConfig,), {
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'feedback.db'}",
+                'SQLITE_PROFILE': 'production',
+                'RATE_LIMIT': '',
+            }))
+        return create_app('sqlite-production')
+
+    def test_pragmas_are_applied(self, tmp_path, monkeypatch):
+        """Test new connections use WAL, NORMAL sync, mmap and a busy timeout."""
+        app = self._app(tmp_path, monkeypatch)
+        with app.app_context():
+            pragma = lambda name: db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1
+            assert pragma('busy_timeout') == 5000
+            assert pragma('mmap_size') == 256 * 1024 * 1024
+
+    def test_concurrent_writers_are_serialized(self, tmp_path, monkeypatch):
+        """Test threads submitting at once all succeed and release the writer lock."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        app = self._app(tmp_path, monkeypatch)
+
+        def submit(i):
+            return app.test_client().post('/feedback/submit', data={
+                'name': 'Writer',
+                'email': f'writer{i}@example.com',
+                'feedback_text': f'Concurrent submission number {i} for the writer lock.',
+            }).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert set(pool.map(submit, range(32))) == {302}
+
+        lock = app.extensions['sqlite_writer_lock']
+        assert not lock._lock.locked()
+        with app.app_context():
+            assert Feedback.query.count() == 32
+
+class TestMongo:
+    """Test class for the MongoDB feedback model (needs pymongo and mongomock)."""
+
+    @pytest.fixture()
+    def collection(self, monkeypatch):
+        mongomock = pytest.importorskip('mongomock')
+        models_mongo = pytest.importorskip('app.models_mongo')
+
+        monkeypatch.setattr(models_mongo.mongo, 'db', mongomock.MongoClient().feedback_test)
+        return models_mongo.mongo.db[models_mongo.FeedbackMongo.collection_name]
+
+    def test_ensure_indexes(self, collection):
+        """Test the listing and lookup indexes are created idempotently."""
+        from app.models_mongo import FeedbackMongo
+
+        FeedbackMongo.ensure_indexes()
+        FeedbackMongo.ensure_indexes()
+        assert {'submitted_at_id', 'email', 'rating'} <= set(collection.index_information())
+
+    def test_find_page_walks_all_documents(self, collection):
+        """Test cursor pages cover every document once, ties included, newest first."""
+        from datetime import datetime
+        from app.models_mongo import FeedbackMongo
+
+        # Three documents per timestamp exercise the _id tie-break
+        collection.insert_many([
+            {'name': f'User {i}', 'email': f'user{i}@example.com', 'feedback_text': 'Text',
+             'rating': 5, 'submitted_at': datetime(2024, 1, 1, 0, 0, i // 3)}
+            for i in range(25)
+        ])
+
+        seen, after = [], None
+        while True:
+            documents, after = FeedbackMongo.find_page(after=after, per_page=4)
+            seen.extend(documents)
+            if after is None:
+                break
+        assert len(seen) == 25
+        assert len({d['_id'] for d in seen}) == 25
+        keys = [(d['submitted_at'], d['_id']) for d in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_find_page_rejects_bad_cursor(self, collection):
+        """Test a malformed cursor raises InvalidCursor."""
+        from datetime import datetime
+        from app.models_mongo import FeedbackMongo
+        from app.pagination import InvalidCursor, encode_cursor
+
+        with pytest.raises(InvalidCursor):
+            FeedbackMongo.find_page(after='not-a-cursor')
+        # A SQL row cursor carries an integer id, not an ObjectId
+        with pytest.raises(InvalidCursor):
+            FeedbackMongo.find_page(after=encode_cursor(datetime(2024, 1, 1), 5))
+
+    @pytest.fixture()
+    def mongo_app(self, collection, monkeypatch):
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'testing-mongo', type('MongoTestingConfig', (TestingConfig,), {
+            'STORAGE_BACKEND': 'mongo',
+            'MONGO_ENSURE_INDEXES': False,
+            'MONGO_BULK_BATCH_SIZE': 2,
+        }))
+        app = create_app('testing-mongo')
+        from app.models_mongo import mongo, FeedbackMongo
+        mongo.db = collection.database
+        FeedbackMongo.ensure_indexes()
+        return app
+
+    def test_bulk_ingest_reports_duplicates_per_row(self, mongo_app, collection):
+        """Test bulk ingestion uses unordered batches and reports failing rows."""
+        rows = [{'name': f'User {i}', 'email': f'user{i}@example.com',
+                 'feedback_text': f'Bulk document number {i} with enough text.', 'rating': 4}
+                for i in range(5)]
+        rows.append(dict(rows[1]))  # duplicate of row 1
+        rows.append({'name': 'X', 'email': 'bad', 'feedback_text': 'short'})
+
+        mongo_app.config['ADMIN_TOKEN'] = 'importer'
+        response = mongo_app.test_client().post('/feedback/bulk', json=rows,
+                                                headers={'Authorization': 'Bearer importer'})
+        assert response.json['inserted'] == 5
+        errors = {e['row']: e['errors'] for e in response.json['errors']}
+        assert errors[5] == {'feedback_text': ['Duplicate submission']}
+        assert 6 in errors
+        assert collection.count_documents({}) == 5
+
+    def test_bulk_delete_by_ids(self, mongo_app, collection):
+        """Test bulk deletion removes documents in batches and flags bad ids."""
+        ids = collection.insert_many([{'name': f'U{i}', 'rating': 3} for i in range(5)]).inserted_ids
+        mongo_app.config['ADMIN_TOKEN'] = 'moderator'
+        client = mongo_app.test_client()
+        headers = {'Authorization': 'Bearer moderator'}
+
+        response = client.post('/feedback/delete', headers=headers,
+                               json={'ids': [str(i) for i in ids[:3]] + ['nope']})
+        assert response.json['deleted'] == 3
+        assert response.json['errors'] == [{'index': 3, 'code': None, 'message': "Invalid id: 'nope'"}]
+        assert collection.count_documents({}) == 2
+
+        assert client.post('/feedback/delete', json={'ids': [1, 2]},
+                           headers=headers).status_code == 400
+
+    @pytest.mark.parametrize('strategy', ['exact', 'estimated', 'counter'])
+    def test_count_strategies(self, mongo_app, collection, strategy):
+        """Test every counting strategy tracks single and bulk writes."""
+        from app.models_mongo import FeedbackMongo
+
+        mongo_app.config['MONGO_COUNT_STRATEGY'] = strategy
+        with mongo_app.app_context():
+            collection.insert_one({'name': 'Existing', 'rating': 1})  # before the counter exists
+            assert FeedbackMongo.count() == 1
+            feedback_id = FeedbackMongo.create('A', 'a@example.com', 'Some feedback text.', 3)
+            FeedbackMongo.create_many([{'name': f'B{i}', 'rating': 2} for i in range(3)])
+            assert FeedbackMongo.count() == 5
+            FeedbackMongo.delete(feedback_id)
+            assert FeedbackMongo.count() == 4
+
+            response = mongo_app.test_client().get('/')
+            assert b'>4</h2>' in response.data
+
+    def test_counter_seeded_on_first_write(self, mongo_app, collection):
+        """Test switching to the counter strategy counts documents written before it."""
+        from app.models_mongo import FeedbackMongo
+
+        mongo_app.config['MONGO_COUNT_STRATEGY'] = 'counter'
+        collection.insert_many([{'name': f'Old {i}', 'rating': 1} for i in range(10)])
+        with mongo_app.app_context():
+            FeedbackMongo.create('A', 'a@example.com', 'Some feedback text.', 3)
+            assert FeedbackMongo.count() == 11
+
+    def test_count_is_cached(self, mongo_app, collection):
+        """Test the total is cached for FEEDBACK_COUNT_MAX_AGE seconds."""
+        from app.models_mongo import FeedbackMongo
+
+        mongo_app.config['FEEDBACK_COUNT_MAX_AGE'] = 60
+        with mongo_app.app_context():
+            assert FeedbackMongo.count() == 0
+            collection.insert_one({'name': 'Written elsewhere'})
+            assert FeedbackMongo.count() == 0
+            FeedbackMongo.create('A', 'a@example.com', 'Some feedback text.', 3)
+            assert FeedbackMongo.count() == 2
+
+    class AsyncStandIn:
+        """Awaitable facade over a mongomock object, standing in for PyMongo's async API."""
+
+        CHAINED = {'find', 'sort', 'limit', 'with_options'}
+
+        def __init__(self, target):
+            self.target = target
+
+        def __getitem__(self, name):
+            return type(self)(self.target[name])
+
+        def __getattr__(self, name):
+            attr = getattr(self.target, name)
+            if name in self.CHAINED:
+                return lambda *args, **kwargs: type(self)(attr(*args, **kwargs))
+
+            async def call(*args, **kwargs):
+                return attr(*args, **kwargs)
+            return call
+
+        async def to_list(self, length=None):
+            return list(self.target)
+
+    @pytest.fixture()
+    def async_app(self, mongo_app, collection):
+        models_mongo_async = pytest.importorskip('app.models_mongo_async')
+        if models_mongo_async.AsyncMongoClient is None:
+            pytest.skip('pymongo has no AsyncMongoClient')
+
+        runner = models_mongo_async.get_mongo_loop(mongo_app)
+        runner.db = self.AsyncStandIn(collection.database)
+        yield mongo_app
+        runner.stop()
+
+    async def _async_scenario(self):
+        """Run every AsyncFeedbackMongo operation; returns the final count (3)."""
+        from app.models_mongo_async import AsyncFeedbackMongo
+
+        await AsyncFeedbackMongo.ensure_indexes()
+        feedback_id = await AsyncFeedbackMongo.create('A', 'a@example.com', 'Some text.', 3)
+        assert (await AsyncFeedbackMongo.find_by_id(feedback_id))['name'] == 'A'
+
+        documents = [{'name': f'B{i}', 'rating': 2, 'dedup_hash': f'h{i}'} for i in range(5)]
+        documents.append(dict(documents[0]))  # duplicate dedup_hash
+        outcome = await AsyncFeedbackMongo.create_many(documents)
+        assert outcome['inserted'] == 5
+        assert [e['index'] for e in outcome['errors']] == [5]
+        assert await AsyncFeedbackMongo.count() == 6
+
+        seen, after = [], None
+        while True:
+            page, after = await AsyncFeedbackMongo.find_page(after=after, per_page=4)
+            seen.extend(page)
+            if after is None:
+                break
+        assert len({d['_id'] for d in seen}) == 6
+
+        assert await AsyncFeedbackMongo.delete(feedback_id) is True
+        others = [str(d['_id']) for d in seen if d['_id'] != feedback_id]
+        outcome = await AsyncFeedbackMongo.delete_many(others[:2] + ['nope'])
+        assert outcome['deleted'] == 2
+        assert outcome['errors'] == [{'index': 2, 'code': None, 'message': "Invalid id: 'nope'"}]
+        return await AsyncFeedbackMongo.count()
+
+    def test_async_operations(self, async_app, collection):
+        """Test the coroutines mirror FeedbackMongo, counter and batches included."""
+        import asyncio
+
+        async_app.config['MONGO_COUNT_STRATEGY'] = 'counter'
+        with async_app.app_context():
+            assert asyncio.run(self._async_scenario()) == 3
+        assert collection.count_documents({}) == 3
+
+    def test_async_operations_on_mongod(self, monkeypatch):
+        """
+        Test the coroutines against a real mongod through AsyncMongoClient.
+
+        Uses MONGO_TEST_URI (default mongodb://localhost:27017/feedback_async_test),
+        whose database is dropped; skipped when no server answers.
+        """
+        import asyncio
+        import os
+        from config import config, TestingConfig
+
+        models_mongo_async = pytest.importorskip('app.models_mongo_async')
+        if models_mongo_async.AsyncMongoClient is None:
+            pytest.skip('pymongo has no AsyncMongoClient')
+        from pymongo import MongoClient
+        from pymongo.errors import PyMongoError
+
+        uri = os.environ.get('MONGO_TEST_URI', 'mongodb://localhost:27017/feedback_async_test')
+        client = MongoClient(uri, serverSelectionTimeoutMS=500)
+        try:
+            client.admin.command('ping')
+        except PyMongoError:
+            client.close()
+            pytest.skip(f'No mongod at {uri}')
+        database = client.get_default_database()
+        client.drop_database(database.name)
+
+        monkeypatch.setitem(config, 'testing-mongod', type(
+            'MongodTestingConfig', (TestingConfig,), {
+                'STORAGE_BACKEND': 'mongo',
+                'MONGO_URI': uri,
+                'MONGO_ENSURE_INDEXES': False,
+                'MONGO_BULK_BATCH_SIZE': 2,
+                'MONGO_COUNT_STRATEGY': 'counter',
+            }))
+        app = create_app('testing-mongod')
+        runner = models_mongo_async.get_mongo_loop(app)
+        try:
+            with app.app_context():
+                assert asyncio.run(self._async_scenario()) == 3
+            assert database['feedback'].count_documents({}) == 3
+        finally:
+            runner.stop()
+            client.drop_database(database.name)
+            client.close()
+        assert not runner.is_alive()
+
+    def test_async_counter_seeded_on_first_write(self, async_app, collection):
+        """Test an async first write under the counter strategy counts earlier documents."""
+        import asyncio
+        from app.models_mongo_async import AsyncFeedbackMongo
+
+        async_app.config['MONGO_COUNT_STRATEGY'] = 'counter'
+        collection.insert_many([{'name': f'Old {i}', 'rating': 1} for i in range(10)])
+
+        async def scenario():
+            await AsyncFeedbackMongo.create('A', 'a@example.com', 'Some text.', 3)
+            return await AsyncFeedbackMongo.count()
+
+        with async_app.app_context():
+            assert asyncio.run(scenario()) == 11
+
+    def test_async_calls_from_separate_loops(self, async_app, collection):
+        """Test concurrent calls from different event loops share the one client loop."""
+        import asyncio
+        from app.models_mongo_async import AsyncFeedbackMongo
+
+        async def submit(n):
+            return await asyncio.gather(*(
+                AsyncFeedbackMongo.create(f'U{n}-{i}', 'u@example.com', 'Some text.', 4)
+                for i in range(10)))
+
+        with async_app.app_context():
+            for n in range(3):  # asyncio.run creates a new loop each time, like async views
+                assert len(asyncio.run(submit(n))) == 10
+        assert collection.count_documents({}) == 30
+
+    def test_async_view(self, async_app, collection):
+        """Test an async Flask view can await the coroutines."""
+        pytest.importorskip('asgiref')
+        from app.models_mongo_async import AsyncFeedbackMongo
+
+        async def latest():
+            await AsyncFeedbackMongo.create('Async', 'a@example.com', 'Some text.', 5)
+            documents, _ = await AsyncFeedbackMongo.find_page(per_page=1)
+            return {'name': documents[0]['name'], 'count': await AsyncFeedbackMongo.count()}
+
+        async_app.add_url_rule('/async-latest', 'async_latest', latest)
+        response = async_app.test_client().get('/async-latest')
+        assert response.json == {'name': 'Async', 'count': 1}
+
+class TestStorage:
+    """Conformance tests run against every storage backend."""
+
+    @pytest.fixture(params=['sqlalchemy', 'mongo'])
+    def storage(self, request, app, monkeypatch):
+        from app.storage import get_storage
+
+        self.config_name, self.database = 'testing', None
+        if request.param == 'mongo':
+            mongomock = pytest.importorskip('mongomock')
+            models_mongo = pytest.importorskip('app.models_mongo')
+            from config import config, TestingConfig
+
+            self.config_name = 'testing-mongo-storage'
+            monkeypatch.setitem(config, self.config_name, type('MongoStorageTestingConfig', (TestingConfig,), {
+                'STORAGE_BACKEND': 'mongo',
+                'MONGO_ENSURE_INDEXES': False,
+            }))
+            app = create_app(self.config_name)
+            self.database = mongomock.MongoClient().feedback_test
+            monkeypatch.setattr(models_mongo.mongo, 'db', self.database)
+            models_mongo.FeedbackMongo.ensure_indexes()
+
+        with app.app_context():
+            yield get_storage(app)
+
+    def test_write_behind_rejected_with_mongo(self, monkeypatch):
+        """Test the SQL-only write-behind spool cannot be combined with Mongo storage."""
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'testing-mongo-spool', type(
+            'MongoSpoolTestingConfig', (TestingConfig,), {
+                'STORAGE_BACKEND': 'mongo',
+                'WRITE_BEHIND': True,
+            }))
+        with pytest.raises(ValueError, match='WRITE_BEHIND'):
+            create_app('testing-mongo-spool')
+
+    def _another_worker(self, monkeypatch):
+        """A second app on the same store, like another gunicorn worker."""
+        app = create_app(self.config_name)
+        if self.database is not None:
+            # init_mongo points the shared client back at MONGO_URI
+            from app.models_mongo import mongo
+            monkeypatch.setattr(mongo, 'db', self.database)
+        return app
+
+    def _values(self, i, **overrides):
+        from datetime import datetime, timedelta
+
+        values = {
+            'name': f'User {i}',
+            'email': f'user{i}@example.com',
+            'feedback_text': f'Conformance feedback number {i} with enough text.',
+            'rating': i % 5 + 1,
+            'submitted_at': datetime(2024, 1, 1) + timedelta(minutes=i // 2),
+        }
+        values.update(overrides)
+        return values
+
+    def test_create_get_count_delete(self, storage):
+        """Test the single-record operations and their effect on the count."""
+        assert storage.count() == 0
+        feedback_id = storage.create(self._values(1))
+        assert isinstance(feedback_id, storage.id_type)
+        assert storage.count() == 1
+
+        record = storage.get(storage.parse_id(str(feedback_id)))
+        assert record.to_dict()['name'] == 'User 1'
+        assert set(record.to_dict()) == set(Feedback.FIELDS)
+
+        assert storage.delete(feedback_id) is True
+        assert storage.get(feedback_id) is None
+        assert storage.count() == 0
+        with pytest.raises(ValueError):
+            storage.parse_id('not-an-id')
+
+    def test_duplicate_create_is_rejected(self, storage):
+        """Test a second create with the same dedup_hash raises DuplicateFeedback."""
+        from app.storage import DuplicateFeedback
+
+        storage.create(self._values(1, dedup_hash='a' * 64))
+        with pytest.raises(DuplicateFeedback):
+            storage.create(self._values(2, dedup_hash='a' * 64))
+        assert storage.count() == 1
+
+    def test_other_integrity_errors_are_not_duplicates(self, app):
+        """Test only the dedup_hash index maps an IntegrityError to DuplicateFeedback."""
+        from sqlalchemy.exc import IntegrityError
+        from app.storage import get_storage
+
+        with pytest.raises(IntegrityError, match='feedback_text'):
+            get_storage(app).create(self._values(1, feedback_text=None))
+        assert get_storage(app).count() == 0
+
+    def test_pages_cover_every_record_newest_first(self, storage):
+        """Test cursor pages walk all records once, ties on submitted_at included."""
+        outcome = storage.create_many([self._values(i) for i in range(23)])
+        assert outcome == {'inserted': 23, 'errors': []}
+
+        seen, after = [], None
+        while True:
+            page = storage.page(after=after, per_page=5)
+            seen.extend(page.items)
+            if not page.has_next:
+                break
+            after = page.next_cursor
+        assert len({record.id for record in seen}) == 23
+        times = [record.submitted_at for record in seen]
+        assert times == sorted(times, reverse=True)
+
+    def test_create_many_reports_duplicates(self, storage):
+        """Test bulk creates store the fresh rows and flag repeated ones by position."""
+        rows = [self._values(i) for i in range(4)]
+        rows.insert(2, dict(rows[0]))
+        outcome = storage.create_many(rows)
+        assert outcome['inserted'] == 4
+        assert outcome['errors'] == [{'index': 2, 'errors': {'feedback_text': ['Duplicate submission']}}]
+        assert storage.count() == 4
+
+    def test_delete_matching(self, storage):
+        """Test bulk deletes by ids and by filters."""
+        ids = [storage.create(self._values(i)) for i in range(6)]
+        assert storage.delete_matching(ids=ids[:2])['deleted'] == 2
+        # Ratings of the remaining rows are 3, 4, 5, 1
+        assert storage.delete_matching(min_rating=4)['deleted'] == 2
+        assert storage.count() == 2
+        with pytest.raises(ValueError):
+            storage.delete_matching()
+
+    def test_routes_use_the_backend(self, storage):
+        """Test submission, listing, counting and deletion go through the backend."""
+        from flask import current_app
+
+        client = current_app.test_client()
+        client.post('/feedback/submit', data={
+            'name': 'Routed User',
+            'email': 'routed@example.com',
+            'feedback_text': 'Feedback stored through the storage backend.',
+            'rating': 4,
+        })
+        assert storage.count() == 1
+        assert b'>1</h2>' in client.get('/').data
+        assert b'Routed User' in client.get('/feedback/view').data
+
+        record = storage.page(per_page=1).items[0]
+        client.post(f'/feedback/delete/{record.id}')
+        assert storage.count() == 0
+
+    def test_page_cache_follows_other_workers(self, storage, monkeypatch):
+        """Test a write in one worker invalidates another worker's cached list."""
+        client = self._another_worker(monkeypatch).test_client()
+        assert b'Cached Row' not in client.get('/feedback/view').data
+
+        generation = storage.generation()
+        storage.create(self._values(1, name='Cached Row'))
+        assert storage.generation() != generation
+        assert b'Cached Row' in client.get('/feedback/view').data
+
+    def test_api_uses_the_backend(self, storage):
+        """Test the JSON API reads, projects and validates ETags through the backend."""
+        from flask import current_app
+
+        client = current_app.test_client()
+        feedback_id = storage.create(self._values(1))
+        response = client.get('/api/feedback?fields=name,rating')
+        assert response.json['items'] == [{'name': 'User 1', 'rating': 2}]
+        etag = {'If-None-Match': response.headers['ETag']}
+        assert client.get('/api/feedback?fields=name,rating', headers=etag).status_code == 304
+
+        assert client.get(f'/api/feedback/{feedback_id}').json['email'] == 'user1@example.com'
+        assert client.get('/api/feedback/not-an-id').status_code == 404
+
+        storage.create(self._values(2))
+        assert client.get('/api/feedback?fields=name,rating', headers=etag).status_code == 200
+
+class TestStartup:
+    """Test class for start-up modes of the app factory."""
+
+    def test_lazy_routes_match_blueprint(self):
+        """Test the lazy URL table mirrors the main blueprint."""
+        from flask import Flask
+        from app.lazy import create_lazy_blueprint
+        from app.routes import main_bp
+
+        def rules(blueprint):
+            app = Flask(__name__)
+            app.register_blueprint(blueprint)
+            return sorted((r.rule, r.endpoint, tuple(sorted(r.methods)))
+                          for r in app.url_map.iter_rules() if r.endpoint != 'static')
+
+        assert rules(create_lazy_blueprint()) == rules(main_bp)
+
+    def test_lazy_views_serve_requests(self, app, monkeypatch):
+        """Test an app built with lazy views answers requests."""
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'testing-lazy', type(
+            'LazyTestingConfig', (TestingConfig,), {'LAZY_VIEWS': True}))
+        lazy_app = create_app('testing-lazy')
+        response = lazy_app.test_client().get('/')
+        assert response.status_code == 200
+        assert b'Welcome to Feedback Collection System' in response.data
+
+    def test_init_db_command(self, runner):
+        """Test flask init-db creates the tables."""
+        result = runner.invoke(args=['init-db'])
+        assert 'Created database tables.' in result.output
+
+    def test_migrations_match_models(self, monkeypatch, tmp_path):
+        """Test autogenerate sees no drift once the migrations are applied."""
+        import os
+        from flask_migrate import check, upgrade
+        from config import config, TestingConfig
+
+        monkeypatch.setitem(config, 'testing-migrations', type(
+            'MigrationsTestingConfig', (TestingConfig,), {
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'migrations.db'}",
+                'AUTO_CREATE_TABLES': False}))
+        migrations_app = create_app('testing-migrations')
+        directory = os.path.join(os.path.dirname(migrations_app.root_path), 'migrations')
+        with migrations_app.app_context():
+            upgrade(directory)
+            # check() exits non-zero when autogenerate finds pending operations
+            check(directory)
+
 class TestForms:
     """Test class for form validation."""
 
@@ -0,0 +1,337 @@
+"""
+Write-behind queue for feedback submissions.
+
+With ``WRITE_BEHIND`` enabled, validated submissions are appended to a local
+SQLite spool (WAL journal) and the request returns immediately. A background
+thread in every worker claims batches from the spool, writes them to the main
+database with one executemany INSERT and marks them flushed.
+
+Delivery is at-least-once: claims are leases, so a batch claimed by a worker
+that dies, or written but not yet marked flushed, is retried once the lease
+expires. A batch the database rejects is retried row by row, so one bad row
+cannot hold back the rest; the bad row is retried after the lease, and once
+it has failed ``WRITE_QUEUE_MAX_ATTEMPTS`` times it is dead-lettered: kept in
+the spool for inspection but no longer claimed. Failing to reach the
+database at all counts against no row.
+
+The flusher is started by the first request a worker serves, so it runs in
+every gunicorn worker, including under ``--preload``.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from app import db
+
+_start_lock = threading.Lock()
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS spool ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " token TEXT NOT NULL UNIQUE,"
+    " payload TEXT NOT NULL,"
+    " enqueued_at REAL NOT NULL,"
+    " claimed_by TEXT,"
+    " claimed_at REAL,"
+    " attempts INTEGER NOT NULL DEFAULT 0,"
+    " flushed_at REAL)",
+    "CREATE INDEX IF NOT EXISTS ix_spool_pending ON spool (flushed_at, id)",
+)
+
+
+class WriteQueue:
+    """Durable local spool of pending feedback rows."""
+
+    def __init__(self, path, lease=30, retention=3600, max_attempts=5):
+        self.path = path
+        self.lease = lease
+        self.retention = retention
+        self.max_attempts = max_attempts
+        self.pid = os.getpid()
+        self.worker_id = f'{self.pid}-{uuid.uuid4().hex[:8]}'
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        with connection:
+            for statement in _SCHEMA:
+                connection.execute(statement)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def enqueue(self, values):
+        """Append one row of column values; returns its status token."""
+        token = uuid.uuid4().hex
+        payload = dict(values)
+        payload['submitted_at'] = payload.get('submitted_at', datetime.utcnow()).isoformat()
+        self._connection().execute(
+            'INSERT INTO spool (token, payload, enqueued_at) VALUES (?, ?, ?)',
+            (token, json.dumps(payload), time.time())
+        )
+        return token
+
+    def claim(self, limit):
+        """Lease up to ``limit`` pending rows that are not dead-lettered to this worker."""
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'UPDATE spool SET claimed_by = ?, claimed_at = ? '
+                'WHERE id IN (SELECT id FROM spool WHERE flushed_at IS NULL AND attempts < ? '
+                'AND (claimed_at IS NULL OR claimed_at < ?) ORDER BY id LIMIT ?)',
+                (self.worker_id, now, self.max_attempts, now - self.lease, limit)
+            )
+            rows = connection.execute(
+                'SELECT id, payload FROM spool WHERE claimed_by = ? AND claimed_at = ? '
+                'AND flushed_at IS NULL ORDER BY id',
+                (self.worker_id, now)
+            ).fetchall()
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+        claimed = []
+        for row_id, payload in rows:
+            values = json.loads(payload)
+            values['submitted_at'] = datetime.fromisoformat(values['submitted_at'])
+            claimed.append((row_id, values))
+        return claimed
+
+    def mark_flushed(self, ids):
+        """Record that the rows with ``ids`` are stored in the main database."""
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('UPDATE spool SET flushed_at = ? WHERE id = ?',
+                               [(now, row_id) for row_id in ids])
+        connection.execute('DELETE FROM spool WHERE flushed_at < ?', (now - self.retention,))
+        connection.execute('COMMIT')
+
+    def release(self, ids):
+        """Return claimed rows to the queue after a failed flush."""
+        self._connection().executemany(
+            'UPDATE spool SET claimed_by = NULL, claimed_at = NULL WHERE id = ?',
+            [(row_id,) for row_id in ids]
+        )
+
+    def fail(self, ids):
+        """
+        Count a failed attempt against claimed rows the database rejected.
+
+        The rows keep their claim, so they are retried once the lease
+        expires; a row reaching ``max_attempts`` is dead-lettered instead.
+
+        Returns:
+            IDs of the rows dead-lettered by this call
+        """
+        if not ids:
+            return []
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        connection.executemany('UPDATE spool SET attempts = attempts + 1 WHERE id = ?',
+                               [(row_id,) for row_id in ids])
+        dead = [row_id for row_id, in connection.execute(
+            f'SELECT id FROM spool WHERE attempts >= ? AND id IN ({", ".join("?" * len(ids))})',
+            (self.max_attempts, *ids)
+        )]
+        connection.execute('COMMIT')
+        return dead
+
+    def status(self, token):
+        """Return 'queued', 'stored', 'failed' or None for an unknown/expired token."""
+        row = self._connection().execute(
+            'SELECT flushed_at, attempts FROM spool WHERE token = ?', (token,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] is not None:
+            return 'stored'
+        return 'failed' if row[1] >= self.max_attempts else 'queued'
+
+    def stats(self):
+        """
+        Return pending/flushed/dead-lettered counts and the age of the oldest
+        pending row.
+        """
+        pending, oldest = self._connection().execute(
+            'SELECT count(*), min(enqueued_at) FROM spool '
+            'WHERE flushed_at IS NULL AND attempts < ?', (self.max_attempts,)
+        ).fetchone()
+        flushed = self._connection().execute(
+            'SELECT count(*) FROM spool WHERE flushed_at IS NOT NULL'
+        ).fetchone()[0]
+        dead = self._connection().execute(
+            'SELECT count(*) FROM spool WHERE flushed_at IS NULL AND attempts >= ?',
+            (self.max_attempts,)
+        ).fetchone()[0]
+        return {
+            'pending': pending,
+            'flushed': flushed,
+            'dead': dead,
+            'oldest_pending_age': round(time.time() - oldest, 3) if oldest else None,
+        }
+
+
+def get_write_queue(app=None):
+    """Return the app's WriteQueue, creating it on first use in each process."""
+    app = app or current_app._get_current_object()
+    queue = app.extensions.get('write_queue')
+    # A queue inherited across fork would share its SQLite connection and
+    # worker id with the parent
+    if queue is None or queue.pid != os.getpid():
+        path = app.config.get('WRITE_QUEUE_PATH') or \
+            os.path.join(app.instance_path, 'feedback_queue.db')
+        queue = WriteQueue(
+            path,
+            lease=app.config.get('WRITE_QUEUE_LEASE', 30),
+            retention=app.config.get('WRITE_QUEUE_RETENTION', 3600),
+            max_attempts=app.config.get('WRITE_QUEUE_MAX_ATTEMPTS', 5)
+        )
+        app.extensions['write_queue'] = queue
+    return queue
+
+
+def _store(rows):
+    """Insert spooled rows, dropping repeats, and commit."""
+    from app.ingest import insert_rows
+    from app.dedup import partition_duplicates
+
+    # Repeats (including rows a failed flush already stored) are dropped
+    fresh, _ = partition_duplicates(rows)
+    if fresh:
+        insert_rows([rows[position] for position in fresh])
+    db.session.commit()
+
+
+def flush(limit=None):
+    """
+    Move one batch from the spool into the main database.
+
+    When the batch is rejected, its rows are stored one at a time; the ones
+    that still fail have an attempt counted against them (see
+    ``WriteQueue.fail``).
+
+    Returns:
+        Number of spooled rows processed (stored, dropped as duplicates or
+        failed on their own)
+
+    Raises:
+        OperationalError: If the database cannot be reached; the batch is
+            released without counting an attempt against its rows
+    """
+    from app.counters import invalidate_feedback_count
+    from app.page_cache import invalidate_pages
+
+    if limit is None:
+        limit = current_app.config.get('WRITE_QUEUE_BATCH_SIZE', 500)
+
+    queue = get_write_queue()
+    claimed = queue.claim(limit)
+    if not claimed:
+        return 0
+
+    ids = [row_id for row_id, _ in claimed]
+    failed = []
+    try:
+        _store([values for _, values in claimed])
+    except OperationalError:
+        # The database is unreachable, which says nothing about the rows
+        db.session.rollback()
+        queue.release(ids)
+        raise
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning('Write queue batch of %d rows failed (%s); '
+                                   'retrying row by row', len(ids), e)
+        for row_id, values in claimed:
+            try:
+                _store([values])
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error('Write queue row %d failed: %s', row_id, e)
+                failed.append(row_id)
+
+    dead = queue.fail(failed)
+    if dead:
+        current_app.logger.error('Write queue rows dead-lettered after %d attempts: %s',
+                                 queue.max_attempts, ', '.join(map(str, dead)))
+    stored = [row_id for row_id in ids if row_id not in failed]
+    if stored:
+        queue.mark_flushed(stored)
+        invalidate_feedback_count()
+        invalidate_pages()
+    return len(ids)
+
+
+def drain():
+    """Flush until the spool has no claimable rows; returns rows written."""
+    total = 0
+    while True:
+        written = flush()
+        if not written:
+            return total
+        total += written
+
+
+class FlushWorker(threading.Thread):
+    """Daemon thread that periodically drains the spool for one app."""
+
+    def __init__(self, app):
+        super().__init__(name='feedback-write-queue', daemon=True)
+        self.app = app
+        self.interval = app.config.get('WRITE_QUEUE_FLUSH_INTERVAL', 0.5)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            written = 0
+            with self.app.app_context():
+                try:
+                    written = drain()
+                except Exception as e:
+                    self.app.logger.error('Write queue flush failed: %s', e)
+                finally:
+                    db.session.remove()
+            if not written:
+                self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_flush_worker(app):
+    """
+    Start the background flusher for ``app`` (once per process).
+
+    Safe to call on every request: threads do not survive fork, so a worker
+    forked from a preloaded master starts its own flusher here.
+    """
+    worker = app.extensions.get('write_queue_worker')
+    if worker is not None and worker.is_alive():
+        return worker
+    # Only the start-up path takes the lock; re-check under it so two
+    # requests racing here do not both start a flusher
+    with _start_lock:
+        worker = app.extensions.get('write_queue_worker')
+        if worker is None or not worker.is_alive():
+            get_write_queue(app)
+            worker = FlushWorker(app)
+            app.extensions['write_queue_worker'] = worker
+            worker.start()
+    return worker